@@ -0,0 +1,222 @@
+"""
+Single-pass aggregation behind risk_summary.json.
+
+RiskAggregate.update() takes the risk, cost, age and (when known) outcome
+arrays of a batch of scored patients. It bins each array once (searchsorted + bincount) and keeps
+only population counters and per-age-group and per-tier sums, plus the risk
+and cost of the >= 60% patients (needed for the exact median). Aggregates
+built from separate chunks or worker processes can be combined with merge(),
+and summary() produces the risk_summary.json fields.
+
+The high-risk totals are summed over each group's rows in their original
+order, so they match the earlier pandas version exactly however the input was
+split. The per-age-group means are merged sums and are rounded to 2 decimals.
+
+RiskAggregate(keep_high_risk=False) keeps no per-patient arrays at all, so its
+size does not grow with the input. Its high-risk totals are the running
+per-tier sums (equal to the exact ones up to float rounding), and summary()
+then needs the median from the caller (streaming.py takes it from its sorted
+high-risk runs).
+"""
+import numpy as np
+
+HIGH_RISK_THRESHOLD = 60
+
+# Histogram edges use pd.cut's right-closed (a, b] intervals
+RISK_BINS = [0, 20, 40, 60, 80, 100]
+RISK_LABELS = ['0-20%', '20-40%', '40-60%', '60-80%', '80-100%']
+HIGH_RISK_BINS = [60, 70, 80, 90, 100]
+HIGH_RISK_LABELS = ['60-70%', '70-80%', '80-90%', '90-100%']
+AGE_BINS = [0, 30, 50, 70, 100]
+AGE_LABELS = ['Under 30', '30-49', '50-69', '70+']
+
+# Cost tiers over the high-risk patients: lower bounds (left-closed), in
+# ascending order, and the names written to cost_by_tier (highest first)
+TIER_BOUNDS = [60, 70, 80]
+TIER_NAMES = ['High (60-70%)', 'Very High (70-80%)', 'Critical (80%+)']
+
+
+def bin_index(values: np.ndarray, edges: list) -> np.ndarray:
+    """Bin number for each value using pd.cut's right-closed (a, b] intervals; -1 if outside."""
+    idx = np.searchsorted(edges, values, side='left') - 1
+    idx[(idx < 0) | (idx >= len(edges) - 1)] = -1
+    return idx
+
+
+def bin_counts(values: np.ndarray, edges: list) -> np.ndarray:
+    """Histogram of values over edges with pd.cut semantics."""
+    idx = bin_index(values, edges)
+    return np.bincount(idx[idx >= 0], minlength=len(edges) - 1)
+
+
+def grouped_sums(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sum of values per group 0..n_groups-1 (negative groups are skipped).
+
+    Each group is summed as one contiguous slice in original row order, so the
+    result equals values[groups == g].sum() without building a mask per group.
+    """
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+    bounds = np.searchsorted(sorted_groups, np.arange(n_groups + 1), side='left')
+    return np.array([sorted_values[bounds[g]:bounds[g + 1]].sum() for g in range(n_groups)])
+
+
+def tier_index(risk: np.ndarray) -> np.ndarray:
+    """Index into TIER_NAMES of each >= 60% risk."""
+    return np.searchsorted(TIER_BOUNDS, risk, side='right') - 1
+
+
+class RiskAggregate:
+    """Mergeable partial aggregate of scored patients."""
+
+    def __init__(self, keep_high_risk: bool = True):
+        self.keep_high_risk = keep_high_risk
+        self.total = 0
+        self.labelled = 0
+        self.readmitted = 0
+        self.risk_counts = np.zeros(len(RISK_LABELS), dtype=np.int64)
+        self.age_count = np.zeros(len(AGE_LABELS), dtype=np.int64)
+        self.age_risk_sum = np.zeros(len(AGE_LABELS))
+        self.high_risk_counts = np.zeros(len(HIGH_RISK_LABELS), dtype=np.int64)
+        self.tier_count = np.zeros(len(TIER_NAMES), dtype=np.int64)
+        self.tier_risk_sum = np.zeros(len(TIER_NAMES))
+        self.tier_cost_sum = np.zeros(len(TIER_NAMES))
+        self._high_risk_parts = []
+
+    def update(self, risk: np.ndarray, cost: np.ndarray, age: np.ndarray, readmitted: np.ndarray = None):
+        """Fold one batch of scored patients into the aggregate (readmitted=None for unlabelled input)."""
+        risk = np.asarray(risk, dtype=np.float64)
+        cost = np.asarray(cost, dtype=np.float64)
+        age = np.asarray(age, dtype=np.float64)
+
+        self.total += len(risk)
+        if readmitted is not None:
+            self.labelled += len(risk)
+            self.readmitted += int(np.asarray(readmitted).sum())
+        self.risk_counts += bin_counts(risk, RISK_BINS)
+
+        age_idx = bin_index(age, AGE_BINS)
+        self.age_count += np.bincount(age_idx[age_idx >= 0], minlength=len(AGE_LABELS))
+        self.age_risk_sum += grouped_sums(risk, age_idx, len(AGE_LABELS))
+
+        high = risk >= HIGH_RISK_THRESHOLD
+        self.high_risk_counts += bin_counts(risk[high], HIGH_RISK_BINS)
+        tier = tier_index(risk[high])
+        self.tier_count += np.bincount(tier, minlength=len(TIER_NAMES))
+        self.tier_risk_sum += grouped_sums(risk[high], tier, len(TIER_NAMES))
+        self.tier_cost_sum += grouped_sums(cost[high], tier, len(TIER_NAMES))
+        if self.keep_high_risk:
+            self._high_risk_parts.append(np.stack([risk[high], cost[high]]))
+        return self
+
+    def merge(self, other: 'RiskAggregate') -> 'RiskAggregate':
+        """Add another partial aggregate (e.g. from a later chunk or another worker) into this one."""
+        self.total += other.total
+        self.labelled += other.labelled
+        self.readmitted += other.readmitted
+        self.risk_counts += other.risk_counts
+        self.age_count += other.age_count
+        self.age_risk_sum += other.age_risk_sum
+        self.high_risk_counts += other.high_risk_counts
+        self.tier_count += other.tier_count
+        self.tier_risk_sum += other.tier_risk_sum
+        self.tier_cost_sum += other.tier_cost_sum
+        # The merged aggregate keeps the high-risk rows only if both sides did
+        self.keep_high_risk = self.keep_high_risk and other.keep_high_risk
+        if self.keep_high_risk:
+            self._high_risk_parts.extend(other._high_risk_parts)
+        else:
+            self._high_risk_parts = []
+        return self
+
+    @classmethod
+    def combine(cls, parts) -> 'RiskAggregate':
+        """Merge an iterable of partial aggregates into a new one."""
+        combined = cls()
+        for part in parts:
+            combined.merge(part)
+        return combined
+
+    def high_risk(self):
+        """(risk, cost) arrays of all >= 60% patients seen so far, in update order."""
+        if not self.keep_high_risk:
+            raise ValueError("this aggregate was built with keep_high_risk=False")
+        if len(self._high_risk_parts) != 1:
+            self._high_risk_parts = [np.concatenate(self._high_risk_parts or [np.empty((2, 0))], axis=1)]
+        return self._high_risk_parts[0][0], self._high_risk_parts[0][1]
+
+    def avg_risk_by_age(self) -> dict:
+        """Mean risk per age group (groups with no patients are omitted)."""
+        return {
+            label: round(float(self.age_risk_sum[i] / self.age_count[i]), 2)
+            for i, label in enumerate(AGE_LABELS) if self.age_count[i] > 0
+        }
+
+    def cost_by_tier(self) -> list:
+        """Count, cost and mean risk per tier, highest tier first."""
+        if self.keep_high_risk:
+            risk, cost = self.high_risk()
+            tier = tier_index(risk)
+            counts = np.bincount(tier, minlength=len(TIER_NAMES))
+            risk_sums = grouped_sums(risk, tier, len(TIER_NAMES))
+            cost_sums = grouped_sums(cost, tier, len(TIER_NAMES))
+        else:
+            counts, risk_sums, cost_sums = self.tier_count, self.tier_risk_sum, self.tier_cost_sum
+
+        tiers = []
+        for i in reversed(range(len(TIER_NAMES))):
+            count = int(counts[i])
+            tiers.append({
+                'tier': TIER_NAMES[i],
+                'count': count,
+                'total_cost': float(cost_sums[i]),
+                'avg_cost': float(cost_sums[i] / count) if count > 0 else 0,
+                'avg_risk': float(risk_sums[i] / count) if count > 0 else 0
+            })
+        return tiers
+
+    def summary(self, model_auc: float = None, risk_factors: list = None,
+                median_risk: float = None) -> dict:
+        """The risk_summary.json fields, in the order run_analysis_v2.py writes them.
+
+        median_risk (the median risk of the >= 60% patients) is required when
+        the aggregate does not keep the high-risk rows.
+        """
+        if self.keep_high_risk:
+            risk, cost = self.high_risk()
+            high_count = len(risk)
+            total_cost = cost.sum()
+            avg_risk = risk.mean() if high_count else 0.0
+            median_risk = np.median(risk) if high_count else 0.0
+        else:
+            high_count = int(self.tier_count.sum())
+            total_cost = self.tier_cost_sum.sum()
+            avg_risk = self.tier_risk_sum.sum() / high_count if high_count else 0.0
+            if median_risk is None:
+                if high_count:
+                    raise ValueError("median_risk is required when the high-risk rows are not kept")
+                median_risk = 0.0
+        cost_by_tier = self.cost_by_tier()
+        summary = {
+            'total_patients': int(self.total),
+            'high_risk_count': int(high_count),
+            'total_cost_exposure': float(total_cost),
+            'avg_risk_score': float(avg_risk),
+            'median_risk_score': float(median_risk),
+            'risk_distribution': {label: int(n) for label, n in zip(RISK_LABELS, self.risk_counts)},
+            'high_risk_distribution': {label: int(n) for label, n in zip(HIGH_RISK_LABELS, self.high_risk_counts)},
+            'avg_risk_by_age': self.avg_risk_by_age(),
+        }
+        if model_auc is not None:
+            summary['model_auc'] = float(model_auc)
+        # Left out when no outcomes were given (scoring unlabelled encounters)
+        if self.labelled:
+            summary['readmission_rate_overall'] = float(self.readmitted / self.labelled * 100)
+        summary['critical_count'] = cost_by_tier[0]['count']
+        summary['very_high_count'] = cost_by_tier[1]['count']
+        summary['high_count'] = cost_by_tier[2]['count']
+        if risk_factors is not None:
+            summary['risk_factors'] = risk_factors
+        summary['cost_by_tier'] = cost_by_tier
+        return summary
@@ -0,0 +1,110 @@
+"""
+First-encounter-per-patient deduplication: the full-frame
+sort_values + drop_duplicates against dedup_patients(), which works on the
+two key columns and takes the surviving rows once, and the old chunked
+isin(set) filter against SeenPatients. Checks that each pair keeps the same
+rows and reports time and peak memory allocated (tracemalloc).
+
+Uses data/raw/diabetic_data.csv, tiled with fresh ids up to --rows.
+
+Usage:
+    python benchmarks/bench_dedup.py
+    python benchmarks/bench_dedup.py --rows 2000000 --chunk-size 100000
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from data_cache import load_uci_encounters  # noqa: E402
+from modeling import SeenPatients, dedup_patients  # noqa: E402
+
+
+def tiled(df: pd.DataFrame, rows: int, shuffle: bool) -> pd.DataFrame:
+    """df repeated up to rows, each copy with its own encounter and patient ids."""
+    copies = []
+    for i in range(-(-rows // len(df))):
+        copy = df.copy()
+        copy['encounter_id'] = copy['encounter_id'].astype(np.int64) + i * (int(df['encounter_id'].max()) + 1)
+        copy['patient_nbr'] = copy['patient_nbr'].astype(np.int64) + i * (int(df['patient_nbr'].max()) + 1)
+        copies.append(copy)
+    df = pd.concat(copies, ignore_index=True).head(rows)
+    if shuffle:
+        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
+    return df
+
+
+def measure(func, *args):
+    """(result, seconds, peak MB allocated) for one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / (1024 * 1024)
+
+
+def sort_dedup(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values('encounter_id').drop_duplicates(subset=['patient_nbr'], keep='first')
+
+
+def quiet_dedup(df: pd.DataFrame) -> pd.DataFrame:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return dedup_patients(df)
+
+
+def set_stream(df: pd.DataFrame, chunk_size: int) -> int:
+    seen, kept = set(), 0
+    for offset in range(0, len(df), chunk_size):
+        chunk = sort_dedup(df.iloc[offset:offset + chunk_size])
+        chunk = chunk[~chunk['patient_nbr'].isin(seen)]
+        seen.update(chunk['patient_nbr'].tolist())
+        kept += len(chunk)
+    return kept
+
+
+def seen_stream(df: pd.DataFrame, chunk_size: int) -> int:
+    seen, kept = SeenPatients(), 0
+    for offset in range(0, len(df), chunk_size):
+        kept += len(seen.first_encounters(df.iloc[offset:offset + chunk_size]))
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    base = load_uci_encounters()
+    print(f"\n{'case':<34} {'seconds':>9} {'peak MB':>9} {'kept':>10}")
+    for shuffle in (False, True):
+        df = tiled(base, args.rows, shuffle)
+        label = 'shuffled' if shuffle else 'in order'
+        expected, seconds, peak = measure(sort_dedup, df)
+        print(f"{'sort + drop_duplicates, ' + label:<34} {seconds:>9.3f} {peak:>9.1f} {len(expected):>10,}")
+        result, seconds, peak = measure(quiet_dedup, df)
+        print(f"{'dedup_patients, ' + label:<34} {seconds:>9.3f} {peak:>9.1f} {len(result):>10,}")
+        if not result.equals(expected):
+            raise SystemExit("dedup_patients() kept different rows")
+
+    df = tiled(base, args.rows, shuffle=False)
+    expected, seconds, peak = measure(set_stream, df, args.chunk_size)
+    print(f"{'stream, isin(set)':<34} {seconds:>9.3f} {peak:>9.1f} {expected:>10,}")
+    result, seconds, peak = measure(seen_stream, df, args.chunk_size)
+    print(f"{'stream, SeenPatients':<34} {seconds:>9.3f} {peak:>9.1f} {result:>10,}")
+    if result != expected:
+        raise SystemExit("SeenPatients kept a different number of rows")
+
+
+if __name__ == "__main__":
+    main()
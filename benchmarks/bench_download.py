@@ -0,0 +1,216 @@
+"""
+download_data.py against a local stand-in HTTP server: concurrent fetches,
+resuming after dropped connections, a file that changed between attempts,
+checksum failures falling back to the next source, and chunk-size throughput.
+
+The server keeps its files in memory and supports what the downloader relies
+on: Range / If-Range requests with ETags, 416 for ranges past the end, and
+keep-alive connections. It can cut every response after a fixed number of
+bytes to simulate a flaky link. Each scenario downloads into a fresh temporary
+directory and checks the bytes on disk.
+
+Usage:
+    python benchmarks/bench_download.py
+    python benchmarks/bench_download.py --rows 300000 --chunk-sizes 8192 65536 1048576
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+from download_data import download_all, make_session, download_file  # noqa: E402
+from synthetic_data import encounter_chunk, hospital_frame, patient_pool_size  # noqa: E402
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('Range'))
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+        body, etag = server.files[self.path]
+        start, status = 0, 200
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range') in (None, etag):
+            start = int(byte_range.removeprefix('bytes=').partition('-')[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        payload = memoryview(body)[start:]
+        if server.drop_after is not None and len(payload) > server.drop_after:
+            # Send part of the body, then hang up
+            self.wfile.write(payload[:server.drop_after])
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+
+@contextlib.contextmanager
+def stand_in_server(files: dict):
+    """Serve {path: bytes} on localhost; yields the server (base URL in server.base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.drop_after = None
+    server.files = {}
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    for path, body in files.items():
+        publish(server, path, body)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def publish(server, path: str, body: bytes):
+    server.files[path] = (body, f'"{hashlib.sha256(body).hexdigest()[:16]}"')
+
+
+def sha256(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def build_files(rows: int):
+    """(zip bytes, {member: bytes}, hospital csv bytes) shaped like the real downloads."""
+    encounters = encounter_chunk(0, rows, patient_pool_size(rows, 0.703), 42).to_csv(index=False).encode()
+    mapping = b"admission_type_id,description\n1,Emergency\n2,Urgent\n3,Elective\n"
+    members = {'diabetic_data.csv': encounters, 'IDS_mapping.csv': mapping}
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, body in members.items():
+            zf.writestr(f"dataset_diabetes/{name}", body)
+    hospitals = hospital_frame(3000).to_csv(index=False).encode()
+    return archive.getvalue(), members, hospitals
+
+
+def manifest_for(server, zip_body: bytes, members: dict, hospitals: bytes, bad_first_source: bool = False) -> dict:
+    cms_sources = [{'url': f"{server.base_url}/hrrp.csv", 'sha256': sha256(hospitals)}]
+    if bad_first_source:
+        cms_sources.insert(0, {'url': f"{server.base_url}/hrrp-old.csv", 'sha256': sha256(hospitals)})
+    return {
+        'uci_diabetes': {
+            'description': 'UCI Diabetes dataset',
+            'filename': 'diabetes_dataset.zip',
+            'sources': [{'url': f"{server.base_url}/uci.zip", 'sha256': sha256(zip_body)}],
+            'extract': {name: sha256(body) for name, body in members.items()},
+        },
+        'cms_hrrp': {
+            'description': 'CMS Hospital Readmissions data',
+            'filename': 'hospital_readmissions.csv',
+            'sources': cms_sources,
+        },
+    }
+
+
+def check_outputs(data_dir: Path, members: dict, hospitals: bytes):
+    for name, body in members.items():
+        if (data_dir / name).read_bytes() != body:
+            raise SystemExit(f"{name} differs from the served file")
+    if (data_dir / 'hospital_readmissions.csv').read_bytes() != hospitals:
+        raise SystemExit("hospital_readmissions.csv differs from the served file")
+    leftovers = [path.name for path in data_dir.iterdir() if path.suffix in ('.part', '.json', '.zip')]
+    if leftovers:
+        raise SystemExit(f"left behind: {leftovers}")
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help='encounters in the served zip')
+    parser.add_argument('--chunk-sizes', nargs='+', type=int, default=[8192, 65536, 1 << 20, 4 << 20])
+    args = parser.parse_args()
+
+    zip_body, members, hospitals = build_files(args.rows)
+    print(f"\nServing a {len(zip_body) / 1024 ** 2:.1f} MB zip and a {len(hospitals) / 1024 ** 2:.1f} MB CSV")
+    files = {'/uci.zip': zip_body, '/hrrp.csv': hospitals, '/hrrp-old.csv': hospitals[:-100] + b'x' * 100}
+
+    with stand_in_server(files) as server:
+        for jobs in (1, 2):
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                results = quiet(download_all, manifest_for(server, zip_body, members, hospitals), Path(tmp), jobs)
+                seconds = time.perf_counter() - start
+                assert all(result['ok'] for result in results.values())
+                check_outputs(Path(tmp), members, hospitals)
+            print(f"  clean download, jobs={jobs}: {seconds:.2f}s")
+
+        # Every response is cut after a third of the zip: three ranged resumes finish it
+        server.drop_after = len(zip_body) // 3 + 1
+        server.requests.clear()
+        with tempfile.TemporaryDirectory() as tmp:
+            results = quiet(download_all, manifest_for(server, zip_body, members, hospitals), Path(tmp), 2,
+                            retry_delay=0)
+            assert all(result['ok'] for result in results.values())
+            check_outputs(Path(tmp), members, hospitals)
+        ranged = sum(1 for header in server.requests if header)
+        print(f"  dropped connections: completed with {ranged} ranged resume request(s), bytes verified")
+        server.drop_after = None
+
+        # A partial download whose file then changes on the server must not be spliced
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = Path(tmp) / 'hospital_readmissions.csv'
+            server.drop_after = len(hospitals) // 2
+            with contextlib.suppress(Exception):
+                quiet(download_file, make_session(1), f"{server.base_url}/hrrp.csv", dest, 'hrrp', max_attempts=1)
+            server.drop_after = None
+            changed = hospitals.replace(b'07/01/2020', b'07/01/2021')
+            publish(server, '/hrrp.csv', changed)
+            digest = quiet(download_file, make_session(1), f"{server.base_url}/hrrp.csv", dest, 'hrrp')
+            assert digest == sha256(changed) and dest.read_bytes() == changed
+            publish(server, '/hrrp.csv', hospitals)
+        print("  file changed between attempts: If-Range restarted it, bytes verified")
+
+        # A source with the wrong checksum is rejected and the next one is used
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = manifest_for(server, zip_body, members, hospitals, bad_first_source=True)
+            results = quiet(download_all, manifest, Path(tmp), 2)
+            assert results['cms_hrrp']['url'].endswith('/hrrp.csv')
+            check_outputs(Path(tmp), members, hospitals)
+        print("  checksum mismatch: fell back to the next source")
+
+        print(f"\n{'chunk size':>12} {'seconds':>9} {'MB/s':>9}")
+        for chunk_size in args.chunk_sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                quiet(download_file, make_session(1), f"{server.base_url}/uci.zip", Path(tmp) / 'uci.zip',
+                      'uci', chunk_size)
+                seconds = time.perf_counter() - start
+            print(f"{chunk_size:>12,} {seconds:>9.3f} {len(zip_body) / 1024 ** 2 / seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Size and parse-time comparison of the patient table export formats in
+export_formats.py against the current indented patient_risks.json.
+
+Reads data/processed/patient_risks.json (or --input), optionally replicated
+to --rows, writes every format to a temporary directory and times loading
+each one back. When node is on PATH the browser-side parse (JSON.parse /
+TypedArray views) is timed too.
+
+Usage:
+    python benchmarks/bench_export_formats.py
+    python benchmarks/bench_export_formats.py --rows 1000000 --repeats 3
+"""
+import argparse
+import gzip
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from export_formats import (  # noqa: E402
+    FORMAT_SUFFIXES, PATIENT_PRECISION, decode_binary, read_columnar_json, write_patient_table
+)
+
+# Parses a file the way the dashboard would; prints milliseconds
+NODE_PARSE = r"""
+const fs = require('fs'), zlib = require('zlib');
+const [path, fmt, repeats] = [process.argv[1], process.argv[2], Number(process.argv[3])];
+let best = Infinity;
+for (let i = 0; i < repeats; i++) {
+  const start = process.hrtime.bigint();
+  let buf = fs.readFileSync(path);
+  if (fmt.endsWith('gzip')) buf = zlib.gunzipSync(buf);
+  if (fmt.startsWith('binary')) {
+    const view = new DataView(buf.buffer, buf.byteOffset, buf.byteLength);
+    const header = JSON.parse(buf.subarray(8, 8 + view.getUint32(4, true)).toString());
+    const types = {'|u1': Uint8Array, '|i1': Int8Array, '<u2': Uint16Array, '<i2': Int16Array,
+                   '<u4': Uint32Array, '<i4': Int32Array, '<i8': BigInt64Array, '<f8': Float64Array};
+    const ab = buf.buffer.slice(buf.byteOffset, buf.byteOffset + buf.byteLength);
+    for (const c of header.columns) new types[c.dtype](ab, c.offset, header.rows);
+  } else {
+    JSON.parse(buf.toString());
+  }
+  best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+}
+console.log(best);
+"""
+
+
+def load_python(path: Path, fmt: str):
+    if fmt == 'records':
+        with open(path, 'r') as f:
+            return pd.DataFrame(json.load(f))
+    if fmt.startswith('columnar'):
+        return read_columnar_json(path)
+    with open(path, 'rb') as f:
+        return decode_binary(f.read())
+
+
+def best_seconds(func, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def node_ms(path: Path, fmt: str, repeats: int):
+    if shutil.which('node') is None:
+        return None
+    result = subprocess.run(['node', '-e', NODE_PARSE, str(path), fmt, str(repeats)],
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', type=Path, default=ROOT / 'data' / 'processed' / 'patient_risks.json')
+    parser.add_argument('--rows', type=int, default=None, help='replicate the input to this many rows')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.input, 'r') as f:
+        df = pd.DataFrame(json.load(f))
+    if args.rows is not None:
+        df = df.iloc[np.arange(args.rows) % len(df)].reset_index(drop=True)
+        df['patient_id'] = np.arange(1, len(df) + 1)
+    print(f"Patient table: {len(df):,} rows x {df.shape[1]} columns")
+
+    print("=" * 60)
+    print("PATIENT EXPORT FORMATS")
+    print("=" * 60)
+    print(f"{'format':<15} {'size (KB)':>11} {'gzip (KB)':>10} {'ratio':>7} {'python (ms)':>12} {'node (ms)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for fmt in FORMAT_SUFFIXES:
+            path = write_patient_table(df, Path(tmp), fmt=fmt)
+            size = path.stat().st_size
+            baseline = baseline or size
+            raw = path.read_bytes()
+            gzipped = size if fmt.endswith('gzip') else len(gzip.compress(raw, compresslevel=9))
+
+            loaded = load_python(path, fmt)
+            for col, decimals in PATIENT_PRECISION.items():
+                np.testing.assert_allclose(loaded[col], df[col].round(decimals), atol=10 ** -decimals / 2)
+            pd.testing.assert_series_equal(loaded['patient_id'].astype('int64'), df['patient_id'].astype('int64'))
+
+            py_ms = best_seconds(lambda: load_python(path, fmt), args.repeats) * 1000
+            js_ms = node_ms(path, fmt, args.repeats)
+            js = f"{js_ms:>10.1f}" if js_ms is not None else f"{'n/a':>10}"
+            print(f"{fmt:<15} {size / 1024:>11,.0f} {gzipped / 1024:>10,.0f} "
+                  f"{baseline / size:>6.1f}x {py_ms:>12.1f} {js}")
+    print("\nratio = records size / format size; gzip = size as served with Content-Encoding: gzip")
+
+
+if __name__ == "__main__":
+    main()
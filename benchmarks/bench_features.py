@@ -0,0 +1,86 @@
+"""
+Benchmark the vectorized feature engineering in features.py against the
+original row-wise implementation (df.apply over the medication columns).
+
+Usage:
+    python benchmarks/bench_features.py
+    python benchmarks/bench_features.py --sizes 100000 1000000 --legacy-max-rows 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from features import AGE_MAPPING, MED_COLS, DERIVED_FEATURES, add_derived_features  # noqa: E402
+
+
+def make_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build an n_rows frame with the columns feature engineering reads."""
+    rng = np.random.default_rng(seed)
+    data = {
+        'age': rng.choice(list(AGE_MAPPING), n_rows),
+        'number_outpatient': rng.poisson(0.4, n_rows),
+        'number_emergency': rng.poisson(0.2, n_rows),
+        'number_inpatient': rng.poisson(0.6, n_rows),
+        'num_medications': rng.integers(1, 82, n_rows),
+        'time_in_hospital': rng.integers(1, 15, n_rows),
+        'A1Cresult': rng.choice(['None', '>8', 'Norm', '>7', np.nan], n_rows,
+                                p=[0.80, 0.08, 0.05, 0.04, 0.03]).astype(object),
+    }
+    for col in MED_COLS:
+        data[col] = rng.choice(['No', 'Steady', 'Up', 'Down'], n_rows, p=[0.80, 0.14, 0.03, 0.03])
+    return pd.DataFrame(data)
+
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    """The original run_patient_modeling() implementation, kept for comparison."""
+    df['age_numeric'] = df['age'].map(AGE_MAPPING)
+    df['total_visits'] = df['number_outpatient'] + df['number_emergency'] + df['number_inpatient']
+    df['medication_intensity'] = df['num_medications'] / (df['time_in_hospital'] + 1)
+
+    def count_med_changes(row):
+        return sum(1 for col in MED_COLS if col in row.index and row[col] in ['Up', 'Down'])
+
+    df['num_med_changes'] = df.apply(count_med_changes, axis=1)
+    df['A1Cresult_abnormal'] = df['A1Cresult'].apply(lambda x: 1 if x in ['>7', '>8'] else 0)
+    return df
+
+
+def time_call(func, df: pd.DataFrame):
+    """Run func on a copy of df and return (seconds, result)."""
+    frame = df.copy()
+    start = time.perf_counter()
+    result = func(frame)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=1_000_000,
+                        help='skip the row-wise implementation above this size')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FEATURE ENGINEERING BENCHMARK")
+    print("=" * 60)
+    print(f"{'rows':>12} {'vectorized (s)':>15} {'row-wise (s)':>13} {'speedup':>9}")
+
+    for n_rows in args.sizes:
+        df = make_frame(n_rows)
+        fast_s, fast = time_call(add_derived_features, df)
+
+        if n_rows <= args.legacy_max_rows:
+            slow_s, slow = time_call(legacy_features, df)
+            pd.testing.assert_frame_equal(fast[DERIVED_FEATURES], slow[DERIVED_FEATURES])
+            print(f"{n_rows:>12,} {fast_s:>15.3f} {slow_s:>13.3f} {slow_s / fast_s:>8.0f}x")
+        else:
+            print(f"{n_rows:>12,} {fast_s:>15.3f} {'skipped':>13} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
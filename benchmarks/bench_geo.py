@@ -0,0 +1,103 @@
+"""
+Geographic exports: builds geo/ from synthetic hospitals, then answers
+"hospitals near X" queries two ways. One scans every hospital, as the
+dashboard does with hospital_metrics.json. The other uses GeoIndex.near(),
+which reads only the grid cells around the point. Checks that both return
+the same hospitals, that each zoom's tiles account for every hospital, and
+that GeoIndex.tiles() for a box returns the tile of every hospital in it.
+
+Usage:
+    python benchmarks/bench_geo.py
+    python benchmarks/bench_geo.py --scale 100 --queries 200 --radius-km 50
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from geo import GEO_DIRNAME, GeoIndex, haversine_km, tile_xy, write_geo_exports  # noqa: E402
+from state_synthesis import synthetic_state_data  # noqa: E402
+
+
+def scan_near(hospitals: list, lat: float, lng: float, radius_km: float) -> list:
+    """Every hospital within radius_km, from a full pass over the list."""
+    distances = haversine_km(lat, lng, np.array([h['lat'] for h in hospitals]),
+                             np.array([h['lng'] for h in hospitals]))
+    return sorted(((float(d), h) for d, h in zip(distances, hospitals) if d <= radius_km),
+                  key=lambda pair: pair[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, default=10, help='synthetic hospitals per real hospital')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--radius-km', type=float, default=50.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    _, df_hospitals = synthetic_state_data(args.scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_geo_exports(df_hospitals, Path(tmp))
+        build = time.perf_counter() - start
+        geo_dir = Path(tmp) / GEO_DIRNAME
+        size_mb = sum(path.stat().st_size for path in geo_dir.rglob('*.json')) / 1024 ** 2
+        print(f"\n{len(df_hospitals):,} hospitals: geo/ written in {build:.2f}s ({size_mb:.1f} MB)")
+
+        index = GeoIndex(geo_dir)
+        for zoom in index.manifest['zooms']:
+            tiles = index.tiles(zoom)
+            if sum(tile['hospital_count'] for tile in tiles) != len(df_hospitals):
+                raise SystemExit(f"zoom {zoom} tiles do not cover every hospital")
+        zoom = index.manifest['zooms'][-1]
+        print(f"  tiles: every zoom accounts for all hospitals ({len(index.tiles(zoom)):,} tiles at zoom {zoom})")
+
+        # Query points next to random hospitals, so most searches find something
+        hospitals = df_hospitals[['facility_id', 'lat', 'lng']].to_dict('records')
+        rng = np.random.default_rng(args.seed)
+
+        # Map views: a 4 x 6 degree box around random hospitals at the finest zoom
+        lat, lng = df_hospitals['lat'].to_numpy(), df_hospitals['lng'].to_numpy()
+        index = GeoIndex(geo_dir)
+        tiles_read = 0
+        for i in rng.integers(0, len(hospitals), args.queries):
+            south, west, north, east = lat[i] - 2, lng[i] - 3, lat[i] + 2, lng[i] + 3
+            inside = (lat >= south) & (lat <= north) & (lng >= west) & (lng <= east)
+            needed = set(zip(*(axis.tolist() for axis in tile_xy(lat[inside], lng[inside], zoom))))
+            found = {(tile['x'], tile['y']) for tile in index.tiles(zoom, south, west, north, east)}
+            if not needed <= found:
+                raise SystemExit("GeoIndex.tiles() missed a tile inside the box")
+            tiles_read += len(found)
+        print(f"  {args.queries} map views at zoom {zoom}: every hospital's tile returned, "
+              f"{tiles_read / args.queries:.1f} tile files per view (of {len(index.tile_files[zoom]):,})")
+        points = [(hospitals[i]['lat'] + offset[0], hospitals[i]['lng'] + offset[1])
+                  for i, offset in zip(rng.integers(0, len(hospitals), args.queries),
+                                       rng.normal(0, 0.2, (args.queries, 2)))]
+
+        start = time.perf_counter()
+        scanned = [scan_near(hospitals, lat, lng, args.radius_km) for lat, lng in points]
+        scan_seconds = time.perf_counter() - start
+
+        index = GeoIndex(geo_dir)
+        start = time.perf_counter()
+        indexed = [index.near(lat, lng, args.radius_km) for lat, lng in points]
+        index_seconds = time.perf_counter() - start
+
+    for expected, found in zip(scanned, indexed):
+        if [h['facility_id'] for _, h in expected] != [h['facility_id'] for _, h in found]:
+            raise SystemExit("GeoIndex.near() and the full scan disagree")
+    found = sum(len(result) for result in indexed)
+    print(f"  {args.queries} queries within {args.radius_km:g} km: {found:,} hospitals found, results match")
+    print(f"\n{'method':<22} {'ms/query':>10} {'files read':>11}")
+    print(f"{'full scan':<22} {1000 * scan_seconds / args.queries:>10.2f} {'-':>11}")
+    print(f"{'GeoIndex.near':<22} {1000 * index_seconds / args.queries:>10.2f} {len(index._loaded):>11,}")
+    print("(GeoIndex time includes loading each cell file once)")
+
+
+if __name__ == "__main__":
+    main()
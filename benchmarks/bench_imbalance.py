@@ -0,0 +1,81 @@
+"""
+Compare the class-imbalance strategies of fit_readmission_model() side by
+side: training time, peak memory allocated while balancing and fitting, and
+held-out ROC-AUC / average precision.
+
+Peak memory is measured with tracemalloc (NumPy buffers included), so each
+strategy gets its own figure within one process; it slows the fits slightly.
+
+Usage:
+    python benchmarks/bench_imbalance.py
+    python benchmarks/bench_imbalance.py --strategies smote class_weight --repeats 3
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from modeling import (  # noqa: E402
+    IMBALANCE_STRATEGIES, split_train_test, resample_training, fit_scaled_model, evaluate_model
+)
+from tuning import load_training_matrix  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def run_strategy(X, y, imbalance: str) -> dict:
+    """Balance, fit and evaluate once; the split itself is not measured."""
+    X_train, X_test, y_train, y_test = split_train_test(X, y)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        start = time.perf_counter()
+        X_fit, y_fit = resample_training(X_train, y_train, imbalance)
+        scaler, model = fit_scaled_model(X_fit, y_fit, imbalance)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        roc_auc, avg_precision = evaluate_model(scaler, model, X_test, y_test)
+    return {
+        'train_rows': len(X_fit),
+        'seconds': seconds,
+        'peak_mb': peak / (1024 * 1024),
+        'roc_auc': roc_auc,
+        'avg_precision': avg_precision,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--strategies', nargs='+', choices=IMBALANCE_STRATEGIES, default=IMBALANCE_STRATEGIES)
+    parser.add_argument('--repeats', type=int, default=1, help='runs per strategy; the median time is reported')
+    args = parser.parse_args()
+
+    X, y = load_training_matrix()
+    print(f"\n{len(X):,} patients, {X.shape[1]} features, {np.mean(y) * 100:.1f}% positive")
+
+    print(f"\n{'strategy':<14} {'train rows':>11} {'seconds':>9} {'peak MB':>9} {'ROC-AUC':>8} {'AP':>8}")
+    baseline = None
+    for imbalance in args.strategies:
+        runs = [run_strategy(X, y, imbalance) for _ in range(args.repeats)]
+        result = dict(runs[-1], seconds=float(np.median([run['seconds'] for run in runs])))
+        print(f"{imbalance:<14} {result['train_rows']:>11,} {result['seconds']:>9.2f} {result['peak_mb']:>9.1f} "
+              f"{result['roc_auc']:>8.4f} {result['avg_precision']:>8.4f}")
+        if imbalance == 'smote':
+            baseline = result
+        elif baseline is not None:
+            print(f"{'':<14} {'':>11} {baseline['seconds'] / result['seconds']:>8.1f}x "
+                  f"{baseline['peak_mb'] / result['peak_mb']:>8.1f}x "
+                  f"{result['roc_auc'] - baseline['roc_auc']:>+8.4f} "
+                  f"{result['avg_precision'] - baseline['avg_precision']:>+8.4f}")
+
+
+if __name__ == "__main__":
+    main()
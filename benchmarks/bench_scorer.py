@@ -0,0 +1,152 @@
+"""
+Compare the sklearn scoring path (scaler.transform + predict_proba) with the
+NumPy-only CompiledScorer: probability parity and per-call latency on small
+batches. Also checks that streaming.score_stream() scores encounters without
+the readmitted column (unlabelled input) the same as labelled ones, leaving
+out only the outcome fields.
+
+Uses the latest artifact in models/ when one exists, otherwise fits a model on
+random data with the same width as the UCI feature matrix.
+
+Usage:
+    python benchmarks/bench_scorer.py
+    python benchmarks/bench_scorer.py --batch-sizes 1 16 256 --repeats 2000
+"""
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from compiled_scorer import CompiledScorer  # noqa: E402
+from model_artifact import ModelArtifact, PARITY_TOLERANCE  # noqa: E402
+from modeling import TARGET  # noqa: E402
+from streaming import score_stream, train_on_sample  # noqa: E402
+
+# Artifact scalers were fitted on DataFrames; plain arrays are fine here
+warnings.filterwarnings('ignore')
+
+N_FEATURES = 80
+ENCOUNTERS = ROOT / 'data' / 'raw' / 'diabetic_data.csv'
+
+
+def load_or_fit(model_path: Path = None):
+    """(scaler, model, n_features) from an artifact, or from a quick fit on random data."""
+    try:
+        artifact = ModelArtifact.load(model_path)
+        print(f"Using artifact {artifact.version}")
+        return artifact.scaler, artifact.model, len(artifact.feature_cols)
+    except FileNotFoundError:
+        print("No artifact found; fitting on random data")
+    rng = np.random.default_rng(42)
+    X = rng.normal(5, 3, size=(20_000, N_FEATURES))
+    y = (X[:, 0] + rng.normal(0, 3, len(X)) > 6).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression(max_iter=1000, C=0.1).fit(scaler.transform(X), y)
+    return scaler, model, N_FEATURES
+
+
+def per_call_us(func, X: np.ndarray, repeats: int) -> float:
+    """Median microseconds per call of func(X)."""
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        timings[i] = time.perf_counter() - start
+    return float(np.median(timings) * 1e6)
+
+
+def import_seconds(module: str) -> float:
+    """Wall time of a fresh interpreter importing module."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def check_unlabelled(model_path: Path, rows: int) -> bool:
+    """score_stream() on the head of the UCI file with and without the readmitted column."""
+    if not ENCOUNTERS.exists():
+        print(f"Unlabelled input: skipped ({ENCOUNTERS.name} not found)")
+        return True
+    try:
+        artifact = ModelArtifact.load(model_path)
+        encoder, scaler, model = artifact.encoder, artifact.scaler, artifact.model
+    except FileNotFoundError:
+        encoder, scaler, model, _ = train_on_sample(ENCOUNTERS, rows)
+
+    # Raw strings in and out, so both files hold the same values
+    df = pd.read_csv(ENCOUNTERS, nrows=rows, dtype=str, keep_default_na=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        df.to_csv(tmp / 'labelled.csv', index=False)
+        df.drop(columns=['readmitted']).to_csv(tmp / 'unlabelled.csv', index=False)
+        outputs = {}
+        for name in ('labelled', 'unlabelled'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary = score_stream(tmp / f'{name}.csv', encoder, scaler, model, tmp / name)
+            with open(tmp / name / 'patient_risks.json') as f:
+                risks = json.load(f)
+            outputs[name] = (summary, pd.read_csv(tmp / name / 'scored_patients.csv'), risks)
+
+    (summary, scored, risks), (bare_summary, bare_scored, bare_risks) = outputs['labelled'], outputs['unlabelled']
+    summary.pop('readmission_rate_overall')
+    ok = (bare_summary == summary
+          and bare_scored.equals(scored.drop(columns=[TARGET]))
+          and bare_risks == [{k: v for k, v in record.items() if k != TARGET} for record in risks])
+    print(f"Unlabelled input ({len(df):,} encounters): "
+          f"{'same scores, no outcome fields (OK)' if ok else 'outputs differ (FAILED)'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', type=Path, default=None)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=1000)
+    parser.add_argument('--unlabelled-rows', type=int, default=20_000,
+                        help='encounters scored with and without the readmitted column')
+    args = parser.parse_args()
+
+    scaler, model, n_features = load_or_fit(args.model)
+    compiled = CompiledScorer.from_fitted(scaler, model, [f'f{i}' for i in range(n_features)])
+
+    def sklearn_path(X):
+        return model.predict_proba(scaler.transform(X))[:, 1]
+
+    rng = np.random.default_rng(0)
+    X_parity = rng.normal(0, 5, size=(100_000, n_features))
+    max_diff = float(np.max(np.abs(compiled.predict_proba(X_parity) - sklearn_path(X_parity))))
+    status = 'OK' if max_diff <= PARITY_TOLERANCE else 'FAILED'
+    print(f"Parity on {len(X_parity):,} rows: max |diff| = {max_diff:.2e} ({status})")
+
+    print("=" * 60)
+    print("PER-CALL LATENCY (median)")
+    print("=" * 60)
+    print(f"{'batch':>8} {'sklearn (us)':>14} {'compiled (us)':>15} {'speedup':>9}")
+    for batch_size in args.batch_sizes:
+        X = rng.normal(0, 5, size=(batch_size, n_features))
+        slow = per_call_us(sklearn_path, X, args.repeats)
+        fast = per_call_us(compiled.predict_proba, X, args.repeats)
+        print(f"{batch_size:>8,} {slow:>14.1f} {fast:>15.1f} {slow / fast:>8.1f}x")
+
+    print(f"\nImport time: compiled_scorer {import_seconds('compiled_scorer'):.2f}s, "
+          f"sklearn path {import_seconds('sklearn.linear_model, sklearn.preprocessing'):.2f}s")
+    unlabelled_ok = check_unlabelled(args.model, args.unlabelled_rows)
+    if status != 'OK' or not unlabelled_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+High-risk and top-N selection: the pandas way (boolean filter + copy +
+sort_values, nlargest, and a sorted frame sliced per group) against
+selection.select_rows(), which partitions instead of sorting everything.
+Checks that every cut returns the same rows in the same order as a stable
+pandas sort. Also checks that StreamingSelection over chunks matches the
+in-memory result while buffering only a bounded number of rows.
+
+Scores are drawn from a beta distribution and rounded to 0.1, so there are
+plenty of ties to exercise the tie order.
+
+Usage:
+    python benchmarks/bench_selection.py
+    python benchmarks/bench_selection.py --rows 10000000 --top 1000 --chunk-size 250000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from selection import GROUPINGS, Cut, StreamingSelection, group_codes, select_frame, select_rows  # noqa: E402
+
+
+def scored_frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'patient_id': np.arange(1, rows + 1),
+        'age_numeric': rng.integers(5, 100, rows).astype(np.float64),
+        'risk_score': np.round(rng.beta(2, 4, rows) * 100, 1),
+    })
+
+
+def pandas_cuts(df: pd.DataFrame, cuts: list) -> dict:
+    """The same cuts from a full stable sort, filtered and sliced per group."""
+    ordered = df.sort_values('risk_score', ascending=False, kind='stable')
+    expected = {}
+    for cut in cuts:
+        rows = ordered if cut.threshold is None else ordered[ordered['risk_score'] >= cut.threshold]
+        if cut.by is None:
+            expected[cut.name] = rows.head(cut.top) if cut.top is not None else rows
+            continue
+        column, groups = GROUPINGS[cut.by]
+        labels = np.array([name for _, name in groups])[group_codes(rows[column].to_numpy(), groups)]
+        expected[cut.name] = {
+            name: (rows[labels == name].head(cut.top) if cut.top is not None else rows[labels == name])
+            for _, name in groups
+        }
+    return expected
+
+
+def same_rows(expected: dict, found: dict) -> bool:
+    for name, rows in expected.items():
+        pairs = rows.items() if isinstance(rows, dict) else [(None, rows)]
+        for group, frame in pairs:
+            other = found[name][group] if group is not None else found[name]
+            if frame['patient_id'].tolist() != other['patient_id'].tolist():
+                return False
+    return True
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--top', type=int, default=1000)
+    parser.add_argument('--per-group', type=int, default=100)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df = scored_frame(args.rows, args.seed)
+    scores = df['risk_score'].to_numpy()
+    cuts = [
+        Cut('high_risk', threshold=60),
+        Cut('top', top=args.top),
+        Cut('top_by_tier', top=args.per_group, by='tier'),
+        Cut('top_by_age_group', top=args.per_group, by='age_group'),
+        Cut('high_risk_top_by_age_group', top=args.per_group, threshold=60, by='age_group'),
+    ]
+    print(f"\n{args.rows:,} scored patients")
+    print(f"{'selection':<34} {'pandas s':>9} {'select s':>9}")
+
+    _, filter_sort = timed(lambda: df[df['risk_score'] >= 60].copy().sort_values('risk_score', ascending=False))
+    _, threshold = timed(select_rows, scores, cuts[:1])
+    print(f"{'>= 60% (filter+copy+sort)':<34} {filter_sort:>9.3f} {threshold:>9.3f}")
+
+    _, nlargest = timed(df.nlargest, args.top, 'risk_score')
+    _, top = timed(select_rows, scores, cuts[1:2])
+    print(f"{f'top {args.top:,} (nlargest)':<34} {nlargest:>9.3f} {top:>9.3f}")
+
+    expected, full_sort = timed(pandas_cuts, df, cuts)
+    found, all_cuts = timed(select_frame, df, cuts)
+    print(f"{f'all {len(cuts)} cuts (sort once, slice)':<34} {full_sort:>9.3f} {all_cuts:>9.3f}")
+    if not same_rows(expected, found):
+        raise SystemExit("select_frame() and the pandas sort disagree")
+    print("Every cut matches the stable pandas sort, ties included")
+
+    # Bounded cuts only: the >= 60% cut keeps every row it selects
+    bounded = cuts[1:4]
+    stream = StreamingSelection(bounded)
+    most_buffered = 0
+    start = time.perf_counter()
+    for offset in range(0, len(df), args.chunk_size):
+        stream.update(df.iloc[offset:offset + args.chunk_size])
+        most_buffered = max(most_buffered, stream.buffered_rows())
+    streamed = stream.result()
+    seconds = time.perf_counter() - start
+    if not same_rows(select_frame(df, bounded), streamed):
+        raise SystemExit("StreamingSelection and select_frame() disagree")
+    print(f"Streaming ({args.chunk_size:,}-row chunks, top-N cuts): {seconds:.2f}s, "
+          f"at most {most_buffered:,} rows buffered, same rows as in memory")
+
+
+if __name__ == "__main__":
+    main()
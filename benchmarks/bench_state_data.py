@@ -0,0 +1,96 @@
+"""
+Synthetic state/hospital generation: the old loop (one np.random.uniform call
+per value, one dict per hospital) against state_synthesis.synthetic_state_data,
+at the full hospital count and multiples of it. Checks that a second run
+reproduces the first exactly and that a larger scale keeps the smaller run's
+hospitals as each state's first rows.
+
+Usage:
+    python benchmarks/bench_state_data.py
+    python benchmarks/bench_state_data.py --scales 1 10 100 --repeats 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from state_synthesis import (  # noqa: E402
+    CITIES_BY_STATE, HOSPITAL_NAMES, STATE_DATA, synthetic_state_data
+)
+
+
+def loop_hospitals(scale: int) -> list:
+    """The pre-vectorized generator's hospital loop, without its 15-per-state cap."""
+    np.random.seed(42)
+    hospital_data = []
+    for state_code, info in STATE_DATA.items():
+        cities = CITIES_BY_STATE.get(state_code, ['City'])
+        for i in range(info['hospitals'] * scale):
+            city = cities[i % len(cities)]
+            rate = info['base_rate'] + np.random.uniform(-2, 2)
+            if rate > 15.5:
+                penalty = np.random.uniform(0.5, 2.5)
+            elif rate > 14.5:
+                penalty = np.random.uniform(0.1, 1.0)
+            else:
+                penalty = np.random.uniform(0, 0.4)
+            hospital_data.append({
+                'name': f"{city} {HOSPITAL_NAMES[i % len(HOSPITAL_NAMES)]}",
+                'state': state_code,
+                'city': city,
+                'readmission_rate': round(rate, 1),
+                'penalty_pct': round(penalty, 2)
+            })
+    return hospital_data
+
+
+def best_of(repeats: int, func, *args) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def check(scales: list):
+    states, hospitals = synthetic_state_data(1)
+    again_states, again_hospitals = synthetic_state_data(1)
+    pd.testing.assert_frame_equal(states, again_states)
+    pd.testing.assert_frame_equal(hospitals, again_hospitals)
+
+    larger = synthetic_state_data(max(scales))[1]
+    for state_code, group in hospitals.groupby('state', sort=False):
+        first = larger[larger['state'] == state_code].head(len(group))
+        pd.testing.assert_frame_equal(group.reset_index(drop=True), first.reset_index(drop=True))
+    print(f"Reproducible; scale {max(scales)} starts each state with the scale-1 hospitals "
+          f"({len(hospitals):,} rows checked)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--loop-max-scale', type=int, default=10,
+                        help='skip the old loop above this scale')
+    args = parser.parse_args()
+
+    print(f"\n{'scale':>6} {'hospitals':>11} {'loop s':>9} {'vectorized s':>13}")
+    for scale in args.scales:
+        hospitals = sum(info['hospitals'] for info in STATE_DATA.values()) * scale
+        loop = best_of(args.repeats, loop_hospitals, scale) if scale <= args.loop_max_scale else None
+        vectorized = best_of(args.repeats, synthetic_state_data, scale)
+        loop_text = f"{loop:>9.3f}" if loop is not None else f"{'-':>9}"
+        print(f"{scale:>6} {hospitals:>11,} {loop_text} {vectorized:>13.3f}")
+
+    print()
+    check(args.scales)
+
+
+if __name__ == "__main__":
+    main()
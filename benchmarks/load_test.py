@@ -0,0 +1,157 @@
+"""
+Load test for scoring_service.py against localhost.
+
+Each client thread holds one keep-alive connection and sends POST /score
+requests back to back; the script reports latency percentiles and throughput.
+Pass --spawn to start the service in a subprocess for the duration of the
+test (it must have a trained artifact in models/).
+
+Usage:
+    python benchmarks/load_test.py --spawn --concurrency 8 --requests 2000
+    python benchmarks/load_test.py --url http://127.0.0.1:8765 --batch-size 10
+"""
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from features import AGE_MAPPING, MED_COLS  # noqa: E402
+
+
+def sample_encounters(n: int, input_path: Path = None, seed: int = 42) -> list:
+    """n encounter dicts, read from a diabetic_data.csv-shaped file or generated."""
+    if input_path is not None:
+        import pandas as pd
+        df = pd.read_csv(input_path, nrows=n, dtype=str, keep_default_na=False)
+        return df.to_dict('records')
+
+    rng = np.random.default_rng(seed)
+    encounters = []
+    for _ in range(n):
+        encounter = {
+            'race': str(rng.choice(['Caucasian', 'AfricanAmerican', 'Hispanic', 'Other', '?'])),
+            'gender': str(rng.choice(['Female', 'Male'])),
+            'age': str(rng.choice(list(AGE_MAPPING))),
+            'admission_type_id': int(rng.integers(1, 9)),
+            'discharge_disposition_id': int(rng.integers(1, 29)),
+            'admission_source_id': int(rng.integers(1, 26)),
+            'time_in_hospital': int(rng.integers(1, 15)),
+            'num_lab_procedures': int(rng.integers(1, 133)),
+            'num_procedures': int(rng.integers(0, 7)),
+            'num_medications': int(rng.integers(1, 82)),
+            'number_outpatient': int(rng.poisson(0.4)),
+            'number_emergency': int(rng.poisson(0.2)),
+            'number_inpatient': int(rng.poisson(0.6)),
+            'number_diagnoses': int(rng.integers(1, 17)),
+            'A1Cresult': str(rng.choice(['None', '>8', 'Norm', '>7'])),
+            'change': str(rng.choice(['No', 'Ch'])),
+            'diabetesMed': str(rng.choice(['Yes', 'No'])),
+        }
+        for col in MED_COLS:
+            encounter[col] = str(rng.choice(['No', 'Steady', 'Up', 'Down'], p=[0.80, 0.14, 0.03, 0.03]))
+        encounters.append(encounter)
+    return encounters
+
+
+def wait_until_ready(host: str, port: int, timeout: float = 60.0):
+    """Poll GET /health until the service answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"scoring service on {host}:{port} did not start within {timeout:.0f}s")
+
+
+def client(host: str, port: int, bodies: list, latencies: list, errors: list):
+    """Send each body over one keep-alive connection, recording per-request seconds."""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    headers = {'Content-Type': 'application/json'}
+    for body in bodies:
+        start = time.perf_counter()
+        conn.request('POST', '/score', body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--spawn', action='store_true', help='start scoring_service.py for the test')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000, help='total requests across all clients')
+    parser.add_argument('--batch-size', type=int, default=1, help='encounters per request')
+    parser.add_argument('--input', type=Path, default=None, help='diabetic_data.csv to sample encounters from')
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--max-p99-ms', type=float, default=None, help='exit non-zero if p99 exceeds this')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    host, port = url.hostname, url.port or 80
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, str(ROOT / 'scoring_service.py'), '--host', host, '--port', str(port)],
+            stdout=subprocess.DEVNULL
+        )
+    try:
+        wait_until_ready(host, port)
+
+        encounters = sample_encounters(max(args.batch_size * 64, 256), args.input)
+        bodies = []
+        for i in range(args.requests + args.warmup):
+            start = (i * args.batch_size) % (len(encounters) - args.batch_size + 1)
+            bodies.append(json.dumps({'encounters': encounters[start:start + args.batch_size]}))
+
+        client(host, port, bodies[:args.warmup], [], [])
+
+        per_client = [bodies[args.warmup + i::args.concurrency] for i in range(args.concurrency)]
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(host, port, chunk, latencies, errors))
+                   for chunk in per_client]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    ms = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    print("=" * 60)
+    print("SCORING SERVICE LOAD TEST")
+    print("=" * 60)
+    print(f"  Requests:     {len(ms):,} ({args.concurrency} clients, {args.batch_size} encounter(s) each)")
+    print(f"  Errors:       {len(errors)}")
+    print(f"  Throughput:   {len(ms) / elapsed:,.0f} req/s, {len(ms) * args.batch_size / elapsed:,.0f} encounters/s")
+    print(f"  Latency (ms): p50 {p50:.2f}  p90 {p90:.2f}  p99 {p99:.2f}  max {ms.max():.2f}")
+
+    if errors or (args.max_p99_ms is not None and p99 > args.max_p99_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
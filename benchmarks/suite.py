@@ -0,0 +1,302 @@
+"""
+Stage-by-stage benchmark of the pipeline on synthetic data, comparable
+across commits.
+
+For each size, benchmarks/synthetic_data.py writes an encounter file and a
+CMS hospital file (kept under data/synthetic/ and reused while the size and
+seed are unchanged). Then each pipeline stage is timed in a fresh process,
+so the peak RSS figures start clean for every size:
+
+  in-memory   load, clean, dedup, featurize, encode, resample, fit, evaluate,
+              score, aggregate, export (export_patient_risks: every patient
+              export format, pages and top_patients.json), hospitals (CMS
+              file -> hospital_metrics records)
+  streaming   train (on the first --train-rows encounters) and stream
+              (streaming.score_stream over the whole file in chunks)
+
+In-memory runs are skipped above --in-memory-limit rows. Streaming runs
+cover every size.
+
+Each result records rows/s (wall time), CPU seconds and the process's peak
+RSS, tagged with the git commit. Results go to
+logs/benchmarks/suite-<commit>-<timestamp>.json and .csv; --compare prints
+the throughput and memory ratios against an earlier results file.
+
+Usage:
+    python benchmarks/suite.py                               # 1e5 and 1e6 rows
+    python benchmarks/suite.py --sizes 1e5 1e6 1e7 --modes streaming
+    python benchmarks/suite.py --compare logs/benchmarks/suite-af7fe50-20261017-101500.json
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+from aggregation import RiskAggregate  # noqa: E402
+from features import fill_missing  # noqa: E402
+from hospital_exports import hospital_records  # noqa: E402
+from modeling import (  # noqa: E402
+    MODEL_COLS, READMISSION_COST, clean_encounters, dedup_patients, encode_features,
+    featurize_patients, fit_readmission_model, predict_risk
+)
+from profiling import StageReport, git_commit  # noqa: E402
+from run_analysis_v2 import export_patient_risks  # noqa: E402
+from schema import read_uci_csv  # noqa: E402
+from streaming import score_stream, train_on_sample  # noqa: E402
+from synthetic_data import OUTPUT_DIR as SYNTHETIC_DIR, UCI_UNIQUE_SHARE, write_encounters, write_hospitals  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+RESULTS_DIR = ROOT / 'logs' / 'benchmarks'
+RESULT_FIELDS = ['rows', 'mode', 'stage', 'stage_rows', 'wall_seconds', 'cpu_seconds', 'rows_per_second',
+                 'peak_rss_mb']
+MODES = ['in-memory', 'streaming']
+DEFAULT_SIZES = [100_000, 1_000_000]
+DEFAULT_HOSPITALS = 3_000
+
+
+def synthetic_inputs(rows: int, seed: int, unique_share: float, jobs: int, data_dir: Path = SYNTHETIC_DIR):
+    """(encounters, hospitals) paths for rows, generated on first use."""
+    directory = data_dir / f"{rows}-seed{seed}-unique{unique_share:.3f}"
+    encounters = directory / 'diabetic_data.csv'
+    hospitals = directory / 'hospital_readmissions.csv'
+    if not encounters.exists():
+        print(f"  Generating {rows:,} encounters in {directory} ...")
+        write_encounters(encounters, rows, unique_share, seed, jobs)
+    if not hospitals.exists():
+        write_hospitals(hospitals, DEFAULT_HOSPITALS, seed)
+    return encounters, hospitals
+
+
+def run_in_memory(encounters: Path, hospitals: Path, imbalance: str, report: StageReport):
+    """The run_analysis_v2.py patient stages plus the hospital records, on in-memory frames."""
+    df = read_uci_csv(encounters)
+    report.checkpoint('load', len(df))
+    df = clean_encounters(df)
+    report.checkpoint('clean', len(df))
+    df = dedup_patients(df)
+    report.checkpoint('dedup', len(df))
+    df_model = fill_missing(featurize_patients(df)[MODEL_COLS])
+    del df
+    report.checkpoint('featurize', len(df_model))
+    X, y, _ = encode_features(df_model)
+    report.checkpoint('encode', len(X))
+
+    scaler, model, _, _ = fit_readmission_model(X, y, report, imbalance)
+    df_model['risk_score'] = predict_risk(X, scaler, model)
+    df_model['estimated_cost'] = (df_model['risk_score'] / 100) * READMISSION_COST
+    df_model['patient_id'] = np.arange(1, len(df_model) + 1)
+    report.checkpoint('score', len(df_model))
+
+    RiskAggregate().update(
+        df_model['risk_score'].to_numpy(), df_model['estimated_cost'].to_numpy(),
+        df_model['age_numeric'].to_numpy(), df_model['readmitted_30day'].to_numpy()
+    ).summary()
+    report.checkpoint('aggregate', len(df_model))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        export_df = export_patient_risks(df_model, Path(output_dir))
+    report.checkpoint('export', len(export_df))
+
+    # Same column mapping as run_analysis.py for the CMS HRRP layout
+    df_hosp = pd.read_csv(hospitals)
+    df_hosp = df_hosp.rename(columns={'Facility Name': 'hospital_name', 'State': 'state'})
+    df_hosp['readmission_rate'] = pd.to_numeric(df_hosp['Excess Readmission Ratio'], errors='coerce') * 100
+    hospital_records(df_hosp)
+    report.checkpoint('hospitals', len(df_hosp))
+
+
+def run_streaming(encounters: Path, rows: int, train_rows: int, report: StageReport):
+    """streaming.py: fit on the head of the file, then score all of it in chunks."""
+    encoder, scaler, model, roc_auc = train_on_sample(encounters, train_rows)
+    report.checkpoint('train', min(rows, train_rows))
+    with tempfile.TemporaryDirectory() as output_dir:
+        summary = score_stream(encounters, encoder, scaler, model, Path(output_dir), model_auc=roc_auc)
+    report.checkpoint('stream', summary['total_patients'])
+
+
+def worker(args):
+    """Run one mode on one input file and write the stage list to args.result."""
+    report = StageReport(args.mode)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if args.mode == 'in-memory':
+            run_in_memory(args.encounters, args.hospitals, args.imbalance, report)
+        else:
+            run_streaming(args.encounters, args.rows, args.train_rows, report)
+    with open(args.result, 'w') as f:
+        json.dump(report.stages, f)
+
+
+def run_worker(mode: str, rows: int, encounters: Path, hospitals: Path, args) -> list:
+    """One fresh process per run; returns its stage checkpoints."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result = Path(tmp) / 'stages.json'
+        command = [sys.executable, __file__, '--worker', '--mode', mode, '--rows', str(rows),
+                   '--encounters', str(encounters), '--hospitals', str(hospitals), '--imbalance', args.imbalance,
+                   '--train-rows', str(args.train_rows), '--result', str(result)]
+        subprocess.run(command, check=True, cwd=ROOT)
+        with open(result, 'r') as f:
+            return json.load(f)
+
+
+def median_stages(runs: list) -> list:
+    """Per stage: median wall and CPU time over the runs, highest peak RSS."""
+    stages = []
+    for entries in zip(*runs):
+        stages.append({
+            'stage': entries[0]['stage'],
+            'rows': entries[0]['rows'],
+            'wall_seconds': statistics.median(entry['wall_seconds'] for entry in entries),
+            'cpu_seconds': statistics.median(entry['cpu_seconds'] for entry in entries),
+            'peak_rss_mb': max((entry['peak_rss_mb'] for entry in entries if entry['peak_rss_mb'] is not None),
+                               default=None),
+        })
+    return stages
+
+
+def result_rows(rows: int, mode: str, stages: list) -> list:
+    return [{
+        'rows': rows,
+        'mode': mode,
+        'stage': entry['stage'],
+        'stage_rows': entry['rows'],
+        'wall_seconds': entry['wall_seconds'],
+        'cpu_seconds': entry['cpu_seconds'],
+        'rows_per_second': entry['rows'] / entry['wall_seconds'] if entry['wall_seconds'] > 0 else None,
+        'peak_rss_mb': entry['peak_rss_mb'],
+    } for entry in stages]
+
+
+def write_results(results: list, settings: dict, repeats: int, output_dir: Path = RESULTS_DIR):
+    """Write results to suite-<commit>-<timestamp>.json and .csv; returns both paths."""
+    created_at = datetime.now(timezone.utc)
+    commit = git_commit()
+    document = {
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': settings,
+        'repeats': repeats,
+        'results': results,
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"suite-{commit or 'nogit'}-{created_at.strftime('%Y%m%d-%H%M%S')}"
+    json_path = output_dir / f"{stem}.json"
+    with open(json_path, 'w') as f:
+        json.dump(document, f, indent=2)
+    csv_path = output_dir / f"{stem}.csv"
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    return json_path, csv_path
+
+
+def print_results(results: list):
+    print(f"\n{'rows':>12} {'mode':<10} {'stage':<10} {'stage rows':>11} {'wall s':>8} {'cpu s':>8} "
+          f"{'rows/s':>12} {'peak MB':>9}")
+    for row in results:
+        rate = f"{row['rows_per_second']:,.0f}" if row['rows_per_second'] is not None else '-'
+        peak = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] is not None else 'n/a'
+        print(f"{row['rows']:>12,} {row['mode']:<10} {row['stage']:<10} {row['stage_rows']:>11,} "
+              f"{row['wall_seconds']:>8.2f} {row['cpu_seconds']:>8.2f} {rate:>12} {peak:>9}")
+
+
+def print_comparison(results: list, settings: dict, baseline_path: Path):
+    """Throughput and peak-memory ratios (new / old) for the stages both runs have."""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    old = {(row['rows'], row['mode'], row['stage']): row for row in baseline['results']}
+    if baseline['settings'] != settings:
+        print(f"\nWARNING: {baseline_path.name} was run with different settings: {baseline['settings']}")
+    print(f"\nCompared with {baseline_path.name} (commit {baseline.get('git_commit') or 'unknown'}); "
+          f"> 1.00x throughput is faster, < 1.00x memory is smaller")
+    print(f"{'rows':>12} {'mode':<10} {'stage':<10} {'old rows/s':>12} {'new rows/s':>12} {'speed':>7} {'memory':>7}")
+    for row in results:
+        before = old.get((row['rows'], row['mode'], row['stage']))
+        if before is None or not before['rows_per_second'] or not row['rows_per_second']:
+            continue
+        speed = row['rows_per_second'] / before['rows_per_second']
+        memory = (f"{row['peak_rss_mb'] / before['peak_rss_mb']:.2f}x"
+                  if row['peak_rss_mb'] and before['peak_rss_mb'] else 'n/a')
+        print(f"{row['rows']:>12,} {row['mode']:<10} {row['stage']:<10} {before['rows_per_second']:>12,.0f} "
+              f"{row['rows_per_second']:>12,.0f} {speed:>6.2f}x {memory:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=lambda value: int(float(value)), default=DEFAULT_SIZES,
+                        help='encounter counts to benchmark (1e5 .. 1e8)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--in-memory-limit', type=lambda value: int(float(value)), default=2_000_000,
+                        help='largest size run in memory; bigger ones are streamed only')
+    parser.add_argument('--imbalance', default='smote')
+    parser.add_argument('--train-rows', type=int, default=200_000,
+                        help='encounters the streaming mode trains on')
+    parser.add_argument('--repeats', type=int, default=1, help='runs per size and mode; median times are kept')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--unique-share', type=float, default=UCI_UNIQUE_SHARE)
+    parser.add_argument('--jobs', type=int, default=1, help='processes used to generate the data')
+    parser.add_argument('--data-dir', type=Path, default=SYNTHETIC_DIR)
+    parser.add_argument('--output-dir', type=Path, default=RESULTS_DIR)
+    parser.add_argument('--compare', type=Path, default=None, help='earlier suite JSON to compare against')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--encounters', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--hospitals', type=Path, help=argparse.SUPPRESS)
+    parser.add_argument('--result', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    print("=" * 60)
+    print("PIPELINE BENCHMARK SUITE")
+    print("=" * 60)
+    settings = {
+        'seed': args.seed,
+        'unique_share': args.unique_share,
+        'imbalance': args.imbalance,
+        'train_rows': args.train_rows,
+        'hospitals': DEFAULT_HOSPITALS,
+    }
+    results = []
+    for rows in args.sizes:
+        encounters, hospitals = synthetic_inputs(rows, args.seed, args.unique_share, args.jobs, args.data_dir)
+        for mode in args.modes:
+            if mode == 'in-memory' and rows > args.in_memory_limit:
+                print(f"  Skipping in-memory run of {rows:,} rows (above --in-memory-limit)")
+                continue
+            print(f"  {mode}: {rows:,} rows ...")
+            runs = [run_worker(mode, rows, encounters, hospitals, args) for _ in range(args.repeats)]
+            results.extend(result_rows(rows, mode, median_stages(runs)))
+
+    print_results(results)
+    json_path, csv_path = write_results(results, settings, args.repeats, args.output_dir)
+    print(f"\nResults written to {json_path} and {csv_path.name}")
+    if args.compare is not None:
+        print_comparison(results, settings, args.compare)
+
+
+if __name__ == "__main__":
+    main()
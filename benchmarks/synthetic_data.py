@@ -0,0 +1,335 @@
+"""
+Synthetic inputs shaped like the real ones, at any size.
+
+  diabetic_data.csv           UCI Diabetes 130-US Hospitals layout (50 columns, '?' for
+                              missing), with the published marginal distributions
+  hospital_readmissions.csv   CMS HRRP layout: one row per hospital and measure
+
+Encounters are written in encounter_id order, like the UCI extract. Each
+encounter's patient is drawn from a pool sized so that the expected share of
+distinct patients matches --unique-share (0.703 in the UCI file, where
+71,518 patients have 101,766 encounters). Race and gender are fixed per
+patient. 30-day readmission follows a logistic model of prior inpatient and
+emergency visits, length of stay, medications and age, so a fitted model has
+real signal.
+
+Rows are generated in fixed-size chunks, each from its own seeded generator,
+so a file is reproducible for a given seed and size whatever --jobs is.
+Files of 1e8 rows are written in bounded memory.
+
+Usage:
+    python benchmarks/synthetic_data.py --rows 1000000
+    python benchmarks/synthetic_data.py --rows 100000000 --jobs 8 --output-dir /data/synthetic
+"""
+import argparse
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+OUTPUT_DIR = ROOT / 'data' / 'synthetic'
+
+CHUNK_ROWS = 250_000
+UCI_UNIQUE_SHARE = 71_518 / 101_766
+
+MEDICATIONS = [
+    'metformin', 'repaglinide', 'nateglinide', 'chlorpropamide',
+    'glimepiride', 'acetohexamide', 'glipizide', 'glyburide',
+    'tolbutamide', 'pioglitazone', 'rosiglitazone', 'acarbose',
+    'miglitol', 'troglitazone', 'tolazamide', 'examide', 'citoglipton',
+    'insulin', 'glyburide-metformin', 'glipizide-metformin',
+    'glimepiride-pioglitazone', 'metformin-rosiglitazone', 'metformin-pioglitazone'
+]
+
+UCI_COLUMNS = [
+    'encounter_id', 'patient_nbr', 'race', 'gender', 'age', 'weight',
+    'admission_type_id', 'discharge_disposition_id', 'admission_source_id',
+    'time_in_hospital', 'payer_code', 'medical_specialty', 'num_lab_procedures',
+    'num_procedures', 'num_medications', 'number_outpatient', 'number_emergency',
+    'number_inpatient', 'diag_1', 'diag_2', 'diag_3', 'number_diagnoses',
+    'max_glu_serum', 'A1Cresult', *MEDICATIONS, 'change', 'diabetesMed', 'readmitted'
+]
+
+# Marginal distributions of the UCI file (value: share)
+RACE = {'Caucasian': .748, 'AfricanAmerican': .189, '?': .022, 'Hispanic': .020, 'Other': .015, 'Asian': .006}
+GENDER = {'Female': .5376, 'Male': .4623, 'Unknown/Invalid': .0001}
+AGE = {'[0-10)': .002, '[10-20)': .007, '[20-30)': .016, '[30-40)': .037, '[40-50)': .095,
+       '[50-60)': .170, '[60-70)': .221, '[70-80)': .256, '[80-90)': .169, '[90-100)': .027}
+WEIGHT = {'?': .969, '[75-100)': .013, '[50-75)': .009, '[100-125)': .006, '[125-150)': .001,
+          '[25-50)': .001, '[0-25)': .0005, '[150-175)': .0003, '>200': .0002}
+ADMISSION_TYPE = {1: .530, 3: .185, 2: .182, 6: .052, 5: .047, 8: .003, 7: .0002, 4: .0001}
+DISCHARGE_DISPOSITION = {1: .592, 3: .137, 6: .127, 18: .036, 2: .021, 22: .020, 11: .016, 5: .012,
+                         25: .010, 4: .008, 7: .006, 23: .004, 13: .004, 14: .004, 28: .0014, 8: .001,
+                         15: .0006, 24: .0005, 9: .0002, 17: .0001, 16: .0001, 19: .0001, 10: .0001}
+ADMISSION_SOURCE = {7: .565, 1: .290, 17: .067, 4: .031, 6: .022, 2: .011, 5: .008, 3: .002,
+                    20: .0016, 9: .0012, 8: .0002, 22: .0001, 10: .0001, 14: .0001, 11: .0001}
+PAYER_CODE = {'?': .396, 'MC': .319, 'HM': .062, 'SP': .049, 'BC': .046, 'MD': .035, 'CP': .025,
+              'UN': .024, 'CM': .019, 'OG': .010, 'PO': .006, 'DM': .005, 'CH': .0015, 'WC': .0013,
+              'OT': .0009, 'MP': .0008, 'SI': .0005}
+MEDICAL_SPECIALTY = {'?': .491, 'InternalMedicine': .144, 'Emergency/Trauma': .074,
+                     'Family/GeneralPractice': .073, 'Cardiology': .053, 'Surgery-General': .030,
+                     'Nephrology': .016, 'Orthopedics': .014, 'Orthopedics-Reconstructive': .012,
+                     'Radiologist': .011, 'Pulmonology': .009, 'Psychiatry': .008, 'Urology': .007,
+                     'ObstetricsandGynecology': .007, 'Surgery-Cardiovascular/Thoracic': .006,
+                     'Gastroenterology': .006, 'Surgery-Vascular': .005, 'Surgery-Neuro': .005,
+                     'PhysicalMedicineandRehabilitation': .004, 'Oncology': .003, 'Pediatrics': .002,
+                     'Hematology/Oncology': .002, 'Neurology': .002, 'Otolaryngology': .001}
+# Most frequent ICD-9 codes; the remaining share is spread over other 3-digit codes
+DIAGNOSIS = {'428': .067, '414': .065, '786': .040, '410': .035, '486': .034, '427': .027,
+             '491': .023, '715': .022, '682': .020, '434': .020, '780': .020, '996': .020,
+             '276': .019, '250.8': .017, '599': .016, '584': .013, '250': .012, '401': .011,
+             '250.6': .010, '577': .010, 'V57': .010, '574': .009, '38': .009, '403': .008,
+             '411': .007, '250.02': .006, '496': .006, '493': .005}
+DIAGNOSIS_MISSING = {'diag_1': .0002, 'diag_2': .0035, 'diag_3': .014}
+NUMBER_DIAGNOSES = {9: .486, 5: .111, 8: .104, 7: .102, 6: .100, 4: .054, 3: .028, 2: .010,
+                    1: .002, 16: .0004, 10: .0002, 13: .0002, 11: .0001, 15: .0001, 12: .0001, 14: .0001}
+NUM_PROCEDURES = {0: .458, 1: .204, 2: .125, 3: .093, 6: .049, 4: .041, 5: .030}
+MAX_GLU_SERUM = {'None': .947, 'Norm': .026, '>200': .015, '>300': .012}
+A1C_RESULT = {'None': .833, '>8': .081, 'Norm': .049, '>7': .037}
+# Share of encounters on each medication (Steady/Up/Down split below); insulin is
+# the one drug whose dose is changed often
+MEDICATION_USE = {'metformin': .196, 'repaglinide': .015, 'nateglinide': .007, 'chlorpropamide': .001,
+                  'glimepiride': .051, 'acetohexamide': .00001, 'glipizide': .125, 'glyburide': .105,
+                  'tolbutamide': .0002, 'pioglitazone': .072, 'rosiglitazone': .063, 'acarbose': .003,
+                  'miglitol': .0004, 'troglitazone': .00003, 'tolazamide': .0004, 'examide': 0,
+                  'citoglipton': 0, 'insulin': .534, 'glyburide-metformin': .007,
+                  'glipizide-metformin': .0001, 'glimepiride-pioglitazone': .00001,
+                  'metformin-rosiglitazone': .00002, 'metformin-pioglitazone': .00001}
+DOSE_CHANGE = {'Steady': .90, 'Up': .055, 'Down': .045}
+INSULIN_DOSE_CHANGE = {'Steady': .567, 'Up': .208, 'Down': .225}
+# Among encounters not readmitted within 30 days
+LATE_READMISSION_SHARE = .393
+
+# Logistic model of 30-day readmission: (coefficient, centre) per column. With
+# the columns centred near their means the intercept sets the ~11% UCI rate
+READMISSION_INTERCEPT = -2.45
+READMISSION_COEFS = {
+    'number_inpatient': (.38, 0), 'number_emergency': (.18, 0), 'number_outpatient': (.05, 0),
+    'time_in_hospital': (.03, 4.4), 'num_medications': (.008, 16), 'number_diagnoses': (.05, 7.4),
+    'age_decade': (.04, 6),
+}
+
+# CMS HRRP layout
+HRRP_COLUMNS = ['Facility Name', 'Facility ID', 'State', 'Measure Name', 'Number of Discharges',
+                'Footnote', 'Excess Readmission Ratio', 'Predicted Readmission Rate',
+                'Expected Readmission Rate', 'Number of Readmissions', 'Start Date', 'End Date']
+HRRP_MEASURES = {'READM-30-AMI-HRRP': 14.5, 'READM-30-CABG-HRRP': 11.6, 'READM-30-COPD-HRRP': 17.9,
+                 'READM-30-HF-HRRP': 20.1, 'READM-30-HIP-KNEE-HRRP': 4.3, 'READM-30-PN-HRRP': 16.4}
+# Hospitals per state (relative), as in run_analysis_v2.py's state table
+STATE_HOSPITALS = {
+    'AL': 98, 'AK': 22, 'AZ': 77, 'AR': 78, 'CA': 341, 'CO': 78, 'CT': 32, 'DE': 8, 'FL': 193,
+    'GA': 139, 'HI': 15, 'ID': 38, 'IL': 178, 'IN': 118, 'IA': 116, 'KS': 127, 'KY': 96, 'LA': 109,
+    'ME': 36, 'MD': 47, 'MA': 68, 'MI': 134, 'MN': 131, 'MS': 83, 'MO': 113, 'MT': 48, 'NE': 89,
+    'NV': 32, 'NH': 26, 'NJ': 71, 'NM': 40, 'NY': 183, 'NC': 112, 'ND': 42, 'OH': 167, 'OK': 112,
+    'OR': 58, 'PA': 170, 'RI': 11, 'SC': 63, 'SD': 53, 'TN': 116, 'TX': 378, 'UT': 42, 'VT': 14,
+    'VA': 89, 'WA': 88, 'WV': 55, 'WI': 125, 'WY': 25, 'DC': 8,
+}
+HOSPITAL_NAME_FORMS = ['{} MEMORIAL HOSPITAL', '{} REGIONAL MEDICAL CENTER', '{} COMMUNITY HOSPITAL',
+                       'ST {} HOSPITAL', '{} GENERAL HOSPITAL', '{} UNIVERSITY MEDICAL CENTER']
+
+
+def sample(rng: np.random.Generator, distribution: dict, n: int) -> np.ndarray:
+    """n draws from a {value: share} distribution (shares are normalised)."""
+    values = np.array(list(distribution))
+    shares = np.array(list(distribution.values()), dtype=np.float64)
+    return values[rng.choice(len(values), n, p=shares / shares.sum())]
+
+
+def _counts(rng: np.random.Generator, mean: float, dispersion: float, n: int, low: int, high: int) -> np.ndarray:
+    """Over-dispersed counts (negative binomial) with the given mean, clipped to [low, high]."""
+    p = dispersion / (dispersion + mean)
+    return np.clip(rng.negative_binomial(dispersion, p, n), low, high)
+
+
+def patient_pool_size(rows: int, unique_share: float) -> int:
+    """Pool size from which rows uniform draws leave unique_share * rows distinct patients."""
+    # Expected distinct share of n draws from a pool of n / x is (1 - e^-x) / x
+    low, high = 1e-9, 50.0
+    for _ in range(100):
+        x = (low + high) / 2
+        if (1 - math.exp(-x)) / x > unique_share:
+            low = x
+        else:
+            high = x
+    return max(1, round(rows / x))
+
+
+def _patient_uniform(patients: np.ndarray, salt: int) -> np.ndarray:
+    """A fixed pseudo-random number in [0, 1) per patient."""
+    mixed = (patients.astype(np.uint64) + np.uint64(salt)) * np.uint64(0x9E3779B97F4A7C15)
+    return (mixed >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _per_patient(patients: np.ndarray, distribution: dict, salt: int) -> np.ndarray:
+    values = np.array(list(distribution))
+    shares = np.array(list(distribution.values()), dtype=np.float64)
+    edges = np.cumsum(shares / shares.sum())
+    return values[np.minimum(np.searchsorted(edges, _patient_uniform(patients, salt), side='right'),
+                             len(values) - 1)]
+
+
+def _diagnoses(rng: np.random.Generator, n: int, missing: float) -> np.ndarray:
+    codes = sample(rng, {**DIAGNOSIS, 'other': 1 - sum(DIAGNOSIS.values())}, n).astype(object)
+    other = codes == 'other'
+    codes[other] = rng.integers(1, 1000, other.sum()).astype(str)
+    codes[rng.random(n) < missing] = '?'
+    return codes
+
+
+def encounter_chunk(start: int, rows: int, pool: int, seed: int) -> pd.DataFrame:
+    """Encounters start .. start + rows - 1 of a file, in encounter_id order."""
+    rng = np.random.default_rng([seed, start])
+    index = np.arange(start, start + rows, dtype=np.int64)
+    if pool is None:
+        patients = index
+    else:
+        patients = rng.integers(0, pool, rows)
+
+    df = pd.DataFrame({
+        'encounter_id': 12522 + 3 * index + rng.integers(0, 3, rows),
+        'patient_nbr': 135 + 9 * patients,
+        'race': _per_patient(patients, RACE, 1),
+        'gender': _per_patient(patients, GENDER, 2),
+        'age': sample(rng, AGE, rows),
+        'weight': sample(rng, WEIGHT, rows),
+        'admission_type_id': sample(rng, ADMISSION_TYPE, rows),
+        'discharge_disposition_id': sample(rng, DISCHARGE_DISPOSITION, rows),
+        'admission_source_id': sample(rng, ADMISSION_SOURCE, rows),
+        'time_in_hospital': 1 + _counts(rng, 3.4, 2.0, rows, 0, 13),
+        'payer_code': sample(rng, PAYER_CODE, rows),
+        'medical_specialty': sample(rng, MEDICAL_SPECIALTY, rows),
+        'num_lab_procedures': np.clip(np.rint(rng.normal(43.1, 19.7, rows)), 1, 132).astype(np.int64),
+        'num_procedures': sample(rng, NUM_PROCEDURES, rows),
+        'num_medications': 1 + _counts(rng, 15.0, 4.5, rows, 0, 80),
+        'number_outpatient': _counts(rng, .37, .2, rows, 0, 42),
+        'number_emergency': _counts(rng, .20, .15, rows, 0, 76),
+        'number_inpatient': _counts(rng, .64, .45, rows, 0, 21),
+        **{col: _diagnoses(rng, rows, missing) for col, missing in DIAGNOSIS_MISSING.items()},
+        'number_diagnoses': sample(rng, NUMBER_DIAGNOSES, rows),
+        'max_glu_serum': sample(rng, MAX_GLU_SERUM, rows),
+        'A1Cresult': sample(rng, A1C_RESULT, rows),
+    })
+
+    changed = np.zeros(rows, dtype=bool)
+    on_medication = np.zeros(rows, dtype=bool)
+    for med in MEDICATIONS:
+        dose = sample(rng, INSULIN_DOSE_CHANGE if med == 'insulin' else DOSE_CHANGE, rows).astype(object)
+        taking = rng.random(rows) < MEDICATION_USE[med]
+        dose[~taking] = 'No'
+        df[med] = dose
+        on_medication |= taking
+        changed |= taking & (dose != 'Steady')
+    df['change'] = np.where(changed | (rng.random(rows) < .28), 'Ch', 'No')
+    df['diabetesMed'] = np.where(on_medication, 'Yes', 'No')
+
+    columns = {'age_decade': df['age'].str[1].astype(int).to_numpy()}
+    logit = READMISSION_INTERCEPT + sum(
+        coef * ((columns[col] if col in columns else df[col].to_numpy()) - center)
+        for col, (coef, center) in READMISSION_COEFS.items()
+    )
+    early = rng.random(rows) < 1 / (1 + np.exp(-logit))
+    late = ~early & (rng.random(rows) < LATE_READMISSION_SHARE)
+    df['readmitted'] = np.where(early, '<30', np.where(late, '>30', 'NO'))
+    return df[UCI_COLUMNS]
+
+
+def _chunk_csv(start: int, rows: int, pool: int, seed: int) -> bytes:
+    return encounter_chunk(start, rows, pool, seed).to_csv(index=False, header=(start == 0)).encode()
+
+
+def write_encounters(path: Path, rows: int, unique_share: float = UCI_UNIQUE_SHARE, seed: int = 42,
+                     jobs: int = 1, chunk_rows: int = CHUNK_ROWS) -> Path:
+    """Write a diabetic_data.csv-shaped file of rows encounters."""
+    pool = None if unique_share >= 1 else patient_pool_size(rows, unique_share)
+    starts = list(range(0, rows, chunk_rows))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.csv.tmp')
+    with open(tmp_path, 'wb') as f:
+        if jobs == 1:
+            for start in starts:
+                f.write(_chunk_csv(start, min(chunk_rows, rows - start), pool, seed))
+        else:
+            # At most 2 * jobs chunks are in flight, so memory stays bounded at any size
+            with ProcessPoolExecutor(max_workers=jobs) as pool_executor:
+                pending = deque()
+                for start in starts:
+                    pending.append(pool_executor.submit(_chunk_csv, start, min(chunk_rows, rows - start), pool, seed))
+                    if len(pending) >= 2 * jobs:
+                        f.write(pending.popleft().result())
+                while pending:
+                    f.write(pending.popleft().result())
+    tmp_path.replace(path)
+    return path
+
+
+def hospital_frame(hospitals: int, seed: int = 42) -> pd.DataFrame:
+    """CMS HRRP-shaped rows: every measure for each of hospitals hospitals."""
+    rng = np.random.default_rng([seed, 1])
+    states = sample(rng, STATE_HOSPITALS, hospitals)
+    forms = np.array(HOSPITAL_NAME_FORMS)[rng.integers(0, len(HOSPITAL_NAME_FORMS), hospitals)]
+    names = [form.format(f"{state} {i:05d}") for i, (form, state) in enumerate(zip(forms, states))]
+    ids = [f"{i:06d}" for i in range(10001, 10001 + hospitals)]
+    hospital_effect = rng.normal(1.0, .05, hospitals)
+
+    measures = np.array(list(HRRP_MEASURES))
+    n = hospitals * len(measures)
+    expected = np.tile(np.array(list(HRRP_MEASURES.values())), hospitals) * rng.normal(1.0, .08, n)
+    ratio = np.repeat(hospital_effect, len(measures)) * rng.normal(1.0, .05, n)
+    discharges = np.rint(rng.lognormal(4.4, 1.5, n)).astype(np.int64)
+    too_few = discharges < 25
+    readmissions = np.rint(discharges * expected * ratio / 100).astype(np.int64)
+
+    def reported(values, digits):
+        return np.where(too_few, 'N/A', np.round(values, digits).astype(str))
+
+    return pd.DataFrame({
+        'Facility Name': np.repeat(names, len(measures)),
+        'Facility ID': np.repeat(ids, len(measures)),
+        'State': np.repeat(states, len(measures)),
+        'Measure Name': np.tile(measures, hospitals),
+        'Number of Discharges': np.where(too_few, 'N/A', discharges.astype(str)),
+        'Footnote': np.where(too_few, '1', ''),
+        'Excess Readmission Ratio': reported(ratio, 4),
+        'Predicted Readmission Rate': reported(expected * ratio, 4),
+        'Expected Readmission Rate': reported(expected, 4),
+        'Number of Readmissions': np.where(too_few | (readmissions < 11), 'Too Few to Report',
+                                           readmissions.astype(str)),
+        'Start Date': '07/01/2020',
+        'End Date': '06/30/2023',
+    })[HRRP_COLUMNS]
+
+
+def write_hospitals(path: Path, hospitals: int, seed: int = 42) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    hospital_frame(hospitals, seed).to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic UCI encounter and CMS HRRP files.")
+    parser.add_argument('--rows', type=lambda value: int(float(value)), default=100_000,
+                        help='encounters to write (1e5 .. 1e8)')
+    parser.add_argument('--hospitals', type=lambda value: int(float(value)), default=3_000)
+    parser.add_argument('--unique-share', type=float, default=UCI_UNIQUE_SHARE,
+                        help='expected share of distinct patients among encounters')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = write_encounters(args.output_dir / 'diabetic_data.csv', args.rows, args.unique_share,
+                            args.seed, args.jobs)
+    print(f"Wrote {args.rows:,} encounters to {path} ({path.stat().st_size / 1024 ** 2:,.0f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+    path = write_hospitals(args.output_dir / 'hospital_readmissions.csv', args.hospitals, args.seed)
+    print(f"Wrote {args.hospitals * len(HRRP_MEASURES):,} hospital measure rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+NumPy-only scorer for the logistic readmission model.
+
+StandardScaler followed by LogisticRegression is a single affine map followed
+by a sigmoid, so both can be folded into one weight vector and intercept:
+
+    z = ((x - mean) / scale) . coef + b  =  x . (coef / scale) + (b - sum(coef * mean / scale))
+
+The folded parameters are saved as a small .npz next to the joblib artifact.
+This module imports nothing but NumPy, so it starts quickly and scores a
+batch with one matrix-vector product.
+"""
+from pathlib import Path
+
+import numpy as np
+
+
+class CompiledScorer:
+    """Folded logistic model: probability = sigmoid(X @ weights + intercept)."""
+
+    def __init__(self, weights: np.ndarray, intercept: float, feature_cols: list, version: str = None):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.feature_cols = list(feature_cols)
+        self.version = version
+
+    @classmethod
+    def from_fitted(cls, scaler, model, feature_cols: list, version: str = None) -> 'CompiledScorer':
+        """Fold a fitted StandardScaler + binary LogisticRegression into one affine map."""
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros_like(coef)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones_like(coef)
+        weights = coef / scale
+        intercept = float(model.intercept_[0]) - float(np.dot(weights, mean))
+        return cls(weights, intercept, feature_cols, version)
+
+    def save(self, path: Path):
+        """Write the folded parameters to an .npz file."""
+        np.savez(
+            path,
+            weights=self.weights,
+            intercept=np.float64(self.intercept),
+            feature_cols=np.array(self.feature_cols, dtype=str),
+            version=np.array(self.version or '', dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> 'CompiledScorer':
+        """Read a scorer written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['weights'], float(data['intercept']),
+                       data['feature_cols'].tolist(), str(data['version']) or None)
+
+    def decision_function(self, X) -> np.ndarray:
+        """Log-odds of 30-day readmission for an encoded (unscaled) feature matrix."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.weights):
+            raise ValueError(f"expected {len(self.weights)} features, got {X.shape[1]}")
+        return X @ self.weights + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probability of 30-day readmission for each row of X."""
+        # exp(-log(1 + exp(-z))) is the sigmoid without overflow for large |z|
+        return np.exp(-np.logaddexp(0.0, -self.decision_function(X)))
+
+    def risk_scores(self, X) -> np.ndarray:
+        """Readmission risk on the 0-100 scale used by the exports."""
+        return self.predict_proba(X) * 100
@@ -143,6 +143,83 @@ export function getDataset(dataset: Dataset) {
   };
 }
 
+// Paginated patient export (written by run_analysis_v2.py to data/processed/patient_pages/;
+// copy that folder to public/data/patient_pages to serve it)
+export const PATIENT_PAGES_URL = '/data/patient_pages';
+
+export interface PatientPage {
+  page: number;
+  file: string;
+  offset: number;
+  rows: number;
+  risk_min: number;
+  risk_max: number;
+}
+
+export interface PatientPageManifest {
+  rows: number;
+  page_size: number;
+  format: string;
+  sort: { column: string; descending: boolean };
+  columns: string[];
+  pages: PatientPage[];
+  indexes: Record<string, string>;
+}
+
+export interface PatientGroupIndex {
+  count: number;
+  pages: number[];
+  rows: number[];
+}
+
+async function fetchJson<T>(url: string): Promise<T> {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Failed to load ${url}: ${response.status}`);
+  }
+  return response.json() as Promise<T>;
+}
+
+export function fetchPatientManifest(baseUrl: string = PATIENT_PAGES_URL): Promise<PatientPageManifest> {
+  return fetchJson<PatientPageManifest>(`${baseUrl}/manifest.json`);
+}
+
+// Only the records format can be fetched as Patient rows
+export function fetchPatientPage(
+  manifest: PatientPageManifest,
+  page: number,
+  baseUrl: string = PATIENT_PAGES_URL
+): Promise<Patient[]> {
+  if (manifest.format !== 'records') {
+    throw new Error(`Unsupported patient page format: ${manifest.format}`);
+  }
+  return fetchJson<Patient[]>(`${baseUrl}/${manifest.pages[page].file}`);
+}
+
+export function fetchPatientIndex(
+  manifest: PatientPageManifest,
+  name: 'tier' | 'age_group',
+  baseUrl: string = PATIENT_PAGES_URL
+): Promise<Record<string, PatientGroupIndex>> {
+  return fetchJson<Record<string, PatientGroupIndex>>(`${baseUrl}/${manifest.indexes[name]}`);
+}
+
+// Rows by global offset (e.g. from an index), fetching each page they fall on once
+export async function fetchPatientRows(
+  manifest: PatientPageManifest,
+  rows: number[],
+  baseUrl: string = PATIENT_PAGES_URL
+): Promise<Patient[]> {
+  const pageNumbers = Array.from(new Set(rows.map((row) => Math.floor(row / manifest.page_size))));
+  const pages = new Map<number, Patient[]>();
+  await Promise.all(
+    pageNumbers.map(async (page) => {
+      pages.set(page, await fetchPatientPage(manifest, page, baseUrl));
+    })
+  );
+  return rows.map((row) => pages.get(Math.floor(row / manifest.page_size))![row % manifest.page_size]);
+}
+
 // Utility functions
 export function formatCurrency(value: number): string {
   if (value >= 1000000) {
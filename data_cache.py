@@ -0,0 +1,83 @@
+"""
+Columnar on-disk cache for the parsed raw datasets.
+
+Parsing the raw CSVs (dtype conversion plus the '?' -> NaN clean-up) is the
+first thing every pipeline run does. The cleaned frames are stored as Parquet
+under data/cache/, keyed by the SHA-256 of the source file. A small sidecar
+records the source's size and mtime so unchanged files are not re-hashed on
+every run; a changed CSV produces a new key and the cache rebuilds itself.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from schema import read_uci_csv
+
+DATA_DIR = Path(__file__).parent / 'data' / 'raw'
+CACHE_DIR = Path(__file__).parent / 'data' / 'cache'
+
+# Bump when a loader's cleaning logic changes so old entries are not reused
+CACHE_FORMAT_VERSION = 2
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file's contents, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path: Path, cache_dir: Path = CACHE_DIR) -> str:
+    """Content hash of path, reusing the last hash while size and mtime are unchanged."""
+    stat = path.stat()
+    meta_path = cache_dir / f"{path.name}.source.json"
+    if meta_path.exists():
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns:
+            return meta['sha256']
+
+    sha256 = file_sha256(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(meta_path, 'w') as f:
+        json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}, f, indent=2)
+    return sha256
+
+
+def cached_frame(source: Path, loader: Callable[[Path], pd.DataFrame],
+                 cache_dir: Path = CACHE_DIR) -> pd.DataFrame:
+    """Return loader(source), served from the Parquet cache when the source is unchanged."""
+    source = Path(source)
+    key = f"{source_fingerprint(source, cache_dir)[:16]}-v{CACHE_FORMAT_VERSION}"
+    cache_path = cache_dir / f"{source.stem}-{key}.parquet"
+
+    if cache_path.exists():
+        print(f"  Cache hit: {cache_path.name}")
+        return pd.read_parquet(cache_path)
+
+    df = loader(source)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob(f"{source.stem}-*.parquet"):
+        stale.unlink()
+    tmp_path = cache_path.with_suffix('.parquet.tmp')
+    df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(cache_path)
+    print(f"  Cache rebuilt: {cache_path.name}")
+    return df
+
+
+def load_uci_encounters(data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """Cleaned UCI diabetes encounters, typed by the declared schema."""
+    return cached_frame(data_dir / 'diabetic_data.csv', read_uci_csv)
+
+
+def load_hospital_readmissions(data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """Raw CMS HRRP hospital readmissions table."""
+    return cached_frame(data_dir / 'hospital_readmissions.csv', pd.read_csv)
@@ -1,101 +1,347 @@
-"""Download datasets for the Hospital Readmissions project."""
-import os
+"""
+Download datasets for the Hospital Readmissions project.
+
+The datasets, their source URLs (tried in order) and SHA-256 checksums are
+listed in data/download_manifest.json. Datasets download concurrently over one
+pooled requests session:
+
+  - the body is streamed into <file>.part in --chunk-size pieces. After a
+    dropped connection, or on the next run, the download resumes from the end
+    of the .part file with an HTTP Range request. If-Range carries the first
+    response's ETag (or Last-Modified), so a file that changed on the server
+    starts over instead of being spliced,
+  - the finished file is checked against the manifest's sha256 before it is
+    moved into place. A null checksum accepts any content with a WARNING, and
+    --update-manifest records what was downloaded,
+  - the zip members listed under "extract" are streamed straight to disk and
+    checked the same way, then the archive is removed.
+
+A dataset is skipped when its files are already in --data-dir; members named
+under "optional" (e.g. IDS_mapping.csv, which the analysis never reads) are
+not needed for that. The script exits with status 1 if any dataset failed.
+
+Sources are plain HTTP(S) URLs, so a manifest can point at a local stand-in
+server (benchmarks/bench_download.py does).
+
+Usage:
+    python download_data.py
+    python download_data.py --jobs 4 --chunk-size 4194304
+    python download_data.py --manifest other.json --data-dir /tmp/raw --update-manifest
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
 import zipfile
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3Error
+from urllib3.util.retry import Retry
+
+from data_cache import file_sha256
+
 DATA_DIR = Path(__file__).parent / "data" / "raw"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-def download_file(url: str, dest_path: Path, desc: str) -> bool:
-    """Download a file with progress indication."""
-    print(f"Downloading {desc}...")
-    try:
-        response = requests.get(url, stream=True, timeout=120)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-
-        with open(dest_path, 'wb') as f:
-            downloaded = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total_size > 0:
-                        pct = (downloaded / total_size) * 100
-                        print(f"\r  Progress: {pct:.1f}%", end="", flush=True)
-        print(f"\n  Saved to: {dest_path}")
-        return True
-    except Exception as e:
-        print(f"\n  Error: {e}")
-        return False
-
-def download_uci_diabetes():
-    """Download UCI Diabetes 130-US Hospitals dataset."""
-    # UCI ML Repository archive URL
-    url = "https://archive.ics.uci.edu/static/public/296/diabetes+130-us+hospitals+for+years+1999-2008.zip"
-    zip_path = DATA_DIR / "diabetes_dataset.zip"
-
-    if (DATA_DIR / "diabetic_data.csv").exists():
-        print("UCI Diabetes dataset already exists, skipping...")
-        return True
-
-    if download_file(url, zip_path, "UCI Diabetes dataset"):
-        print("Extracting ZIP file...")
+MANIFEST_PATH = Path(__file__).parent / "data" / "download_manifest.json"
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_JOBS = 4
+TIMEOUT = 120
+
+# Attempts per source; each one resumes from what reached the .part file.
+# The wait before attempt n is RETRY_DELAY * 2 ** (n - 2) seconds
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 1.0
+
+# Failures worth another attempt (read1() raises urllib3's errors unwrapped)
+TRANSFER_ERRORS = (requests.RequestException, Urllib3Error, OSError)
+
+_print_lock = threading.Lock()
+
+def log(message: str):
+    """print() from the download threads without interleaving lines."""
+    with _print_lock:
+        print(message, flush=True)
+
+def warn_unverified(desc: str, name: str, sha256: str = None):
+    """Flag a file accepted without a manifest checksum."""
+    got = f" (sha256 {sha256})" if sha256 else ""
+    log(f"  WARNING: {desc}: {name} has no checksum in the manifest and was accepted UNVERIFIED{got}; "
+        f"pin its sha256 in the manifest (--update-manifest records it after a download)")
+
+def load_manifest(path: Path = MANIFEST_PATH) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest: dict, path: Path = MANIFEST_PATH):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+
+def make_session(pool_size: int = DEFAULT_JOBS) -> requests.Session:
+    """Session with a pool_size connection pool that retries failed connections and 5xx replies."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Range offsets count bytes on the wire, so the body must not be re-encoded
+    session.headers['Accept-Encoding'] = 'identity'
+    return session
+
+def _range_total(response: requests.Response):
+    """Full size from a Content-Range header ('bytes start-end/total' or 'bytes */total'), or None."""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+def _range_start(response: requests.Response):
+    """First byte of a 206 response's Content-Range, or None."""
+    start = response.headers.get('Content-Range', '').partition(' ')[2].partition('-')[0]
+    return int(start) if start.isdigit() else None
+
+def _expected_size(response: requests.Response):
+    """Full size of the file from a 200 or 206 response, or None if the server does not say."""
+    if response.status_code == 206:
+        return _range_total(response)
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+def iter_body(response: requests.Response, chunk_size: int):
+    """The raw response body in pieces of up to chunk_size bytes.
+
+    With urllib3 2, read1() hands over whatever has arrived, so bytes received
+    before a dropped connection still reach the .part file; a full-size
+    read() would discard its partly filled buffer.
+    """
+    if hasattr(response.raw, 'read1'):
+        while True:
+            chunk = response.raw.read1(chunk_size, decode_content=False)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from response.iter_content(chunk_size=chunk_size)
+
+def download_file(session: requests.Session, url: str, dest_path: Path, desc: str,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, expected_sha256: str = None,
+                  max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY) -> str:
+    """Download url to dest_path, resuming any partial download; returns the file's SHA-256.
+
+    Raises ValueError when the checksum does not match expected_sha256 (the
+    partial file is discarded) and the last requests/OS error when every
+    attempt fails (the partial file is kept for the next run).
+    """
+    part_path = dest_path.with_name(dest_path.name + '.part')
+    meta_path = dest_path.with_name(dest_path.name + '.part.json')
+
+    for attempt in range(1, max_attempts + 1):
+        meta = {}
+        if meta_path.exists():
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        # A partial file from another source cannot be resumed
+        offset = part_path.stat().st_size if part_path.exists() and meta.get('url') == url else 0
+        headers = {}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            if meta.get('validator'):
+                headers['If-Range'] = meta['validator']
+
+        start = time.perf_counter()
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(DATA_DIR)
-            os.remove(zip_path)
-            print("  Extraction complete!")
-            return True
-        except Exception as e:
-            print(f"  Extraction error: {e}")
-            return False
-    return False
-
-def download_cms_hospital_data():
-    """Download CMS Hospital Readmissions Reduction Program data."""
-    # CMS data.cms.gov API endpoint for hospital readmissions
-    # This is the HRRP Measures dataset
-    url = "https://data.cms.gov/provider-data/api/1/datastore/query/9n3s-kdb3/0?offset=0&count=true&results=true&schema=true&keys=true&format=csv&rowIds=false"
-
-    dest_path = DATA_DIR / "hospital_readmissions.csv"
-
-    if dest_path.exists():
-        print("CMS Hospital Readmissions data already exists, skipping...")
-        return True
-
-    # Try direct CSV download from CMS
-    alt_url = "https://data.cms.gov/provider-data/sites/default/files/resources/092d655ed756c878d23b9a8d5e60b726_1736467809/Hospital_Readmissions_Reduction_Program.csv"
-
-    if download_file(alt_url, dest_path, "CMS Hospital Readmissions data"):
-        return True
-
-    # Fallback: try the API endpoint
-    print("Trying alternative download method...")
-    return download_file(url, dest_path, "CMS Hospital Readmissions data (API)")
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 416 and offset:
+                    # Nothing left to send: the .part file already holds the whole body,
+                    # unless the server reports a different size
+                    if _range_total(response) == offset:
+                        break
+                    part_path.unlink()
+                    raise OSError(f"range {offset:,}- not satisfiable; starting over")
+                response.raise_for_status()
+
+                if response.status_code == 206 and _range_start(response) == offset:
+                    mode = 'ab'
+                    log(f"  {desc}: resuming at {offset / (1024 * 1024):,.1f} MB")
+                else:
+                    # The server ignored the range or the file changed; start over
+                    offset, mode = 0, 'wb'
+                total = _expected_size(response)
+
+                etag = response.headers.get('ETag')
+                validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+                with open(meta_path, 'w') as f:
+                    json.dump({'url': url, 'validator': validator}, f)
+
+                received = 0
+                with open(part_path, mode) as f:
+                    for chunk in iter_body(response, chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+                size = offset + received
+                if total is not None and size != total:
+                    raise OSError(f"connection closed after {size:,} of {total:,} bytes")
+            seconds = time.perf_counter() - start
+            log(f"  {desc}: {received / (1024 * 1024):,.1f} MB in {seconds:.1f}s "
+                  f"({received / (1024 * 1024) / max(seconds, 1e-9):,.1f} MB/s)")
+            break
+        except TRANSFER_ERRORS as e:
+            if attempt == max_attempts:
+                raise
+            log(f"  {desc}: {e}; retrying ({attempt + 1}/{max_attempts})")
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+
+    sha256 = file_sha256(part_path)
+    if expected_sha256 and sha256 != expected_sha256:
+        part_path.unlink()
+        meta_path.unlink()
+        raise ValueError(f"checksum mismatch for {dest_path.name}: got {sha256}, expected {expected_sha256}")
+    part_path.replace(dest_path)
+    meta_path.unlink()
+    return sha256
+
+def extract_members(zip_path: Path, members: dict, dest_dir: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Stream each named member ({name: sha256 or None}) to dest_dir; returns {name: sha256}.
+
+    Members are matched by file name wherever they sit in the archive.
+    """
+    checksums = {}
+    with zipfile.ZipFile(zip_path, 'r') as archive:
+        by_name = {Path(info.filename).name: info for info in archive.infolist() if not info.is_dir()}
+        for name, expected in members.items():
+            if name not in by_name:
+                raise ValueError(f"{name} not found in {zip_path.name}")
+            tmp_path = dest_dir / f"{name}.part"
+            digest = hashlib.sha256()
+            with archive.open(by_name[name]) as src, open(tmp_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b''):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            if expected and digest.hexdigest() != expected:
+                tmp_path.unlink()
+                raise ValueError(f"checksum mismatch for {name}: got {digest.hexdigest()}, expected {expected}")
+            tmp_path.replace(dest_dir / name)
+            checksums[name] = digest.hexdigest()
+    return checksums
+
+def _required_outputs(entry: dict) -> dict:
+    """{file name: pinned sha256s} of the files that must exist for entry to be skipped."""
+    if entry.get('extract'):
+        optional = set(entry.get('optional', []))
+        return {name: [sha256] if sha256 else [] for name, sha256 in entry['extract'].items()
+                if name not in optional}
+    # Which source produced the file is not recorded, so any pinned source checksum will do
+    return {entry['filename']: [source['sha256'] for source in entry['sources'] if source.get('sha256')]}
+
+def _outputs_present(entry: dict, data_dir: Path) -> bool:
+    """True when entry's required files exist and match whichever manifest checksums are set."""
+    return all((data_dir / name).exists() and (not pinned or file_sha256(data_dir / name) in pinned)
+               for name, pinned in _required_outputs(entry).items())
+
+def fetch_dataset(session: requests.Session, entry: dict, data_dir: Path = DATA_DIR,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, force: bool = False,
+                  max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY) -> dict:
+    """Download (and extract) one manifest entry, trying its sources in order."""
+    desc = entry['description']
+    if not force and _outputs_present(entry, data_dir):
+        log(f"{desc} already exists, skipping...")
+        for name, pinned in _required_outputs(entry).items():
+            if not pinned:
+                warn_unverified(desc, name)
+        return {'ok': True, 'skipped': True}
+
+    dest_path = data_dir / entry['filename']
+    for source in entry['sources']:
+        log(f"Downloading {desc} from {source['url'][:80]}")
+        try:
+            sha256 = download_file(session, source['url'], dest_path, desc, chunk_size, source.get('sha256'),
+                                   max_attempts, retry_delay)
+            members = {}
+            if entry.get('extract'):
+                members = extract_members(dest_path, entry['extract'], data_dir, chunk_size)
+                dest_path.unlink()
+                log(f"  {desc}: extracted {', '.join(members)}")
+        except TRANSFER_ERRORS + (ValueError, zipfile.BadZipFile) as e:
+            log(f"  {desc}: failed from this source: {e}")
+            continue
+        if not source.get('sha256'):
+            warn_unverified(desc, dest_path.name, sha256)
+        for name, member_sha256 in members.items():
+            if not entry['extract'][name]:
+                warn_unverified(desc, name, member_sha256)
+        return {'ok': True, 'skipped': False, 'url': source['url'], 'sha256': sha256, 'members': members}
+    return {'ok': False, 'skipped': False}
+
+def download_all(manifest: dict, data_dir: Path = DATA_DIR, jobs: int = DEFAULT_JOBS,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, force: bool = False,
+                 max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY) -> dict:
+    """Fetch every manifest entry, up to jobs at a time; returns {name: result}."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    # One session for all threads: they share its connection pool, not any per-request state
+    session = make_session(max(jobs, 1))
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        futures = {name: pool.submit(fetch_dataset, session, entry, data_dir, chunk_size, force,
+                                     max_attempts, retry_delay)
+                   for name, entry in manifest.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+def record_checksums(manifest: dict, results: dict) -> int:
+    """Fill the manifest's null checksums from what was downloaded; returns how many were added."""
+    added = 0
+    for name, result in results.items():
+        if not result['ok'] or result['skipped']:
+            continue
+        entry = manifest[name]
+        for source in entry['sources']:
+            if source['url'] == result['url'] and not source.get('sha256'):
+                source['sha256'] = result['sha256']
+                added += 1
+        for member, sha256 in result['members'].items():
+            if not entry['extract'].get(member):
+                entry['extract'][member] = sha256
+                added += 1
+    return added
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the raw datasets listed in the manifest.")
+    parser.add_argument('--manifest', type=Path, default=MANIFEST_PATH)
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='datasets downloaded at once')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='bytes per read/write')
+    parser.add_argument('--force', action='store_true', help='download even if the files exist')
+    parser.add_argument('--update-manifest', action='store_true',
+                        help='record the checksums of downloads whose manifest checksum is null')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("DOWNLOADING DATASETS FOR HOSPITAL READMISSIONS PROJECT")
     print("=" * 60)
     print()
 
-    success1 = download_uci_diabetes()
-    print()
-    success2 = download_cms_hospital_data()
+    manifest = load_manifest(args.manifest)
+    results = download_all(manifest, args.data_dir, args.jobs, args.chunk_size, args.force)
+    if args.update_manifest:
+        added = record_checksums(manifest, results)
+        save_manifest(manifest, args.manifest)
+        print(f"\nRecorded {added} new checksum(s) in {args.manifest}")
 
     print()
     print("=" * 60)
     print("DOWNLOAD SUMMARY")
     print("=" * 60)
-    print(f"UCI Diabetes dataset: {'SUCCESS' if success1 else 'FAILED'}")
-    print(f"CMS Hospital data: {'SUCCESS' if success2 else 'FAILED'}")
+    for name, result in results.items():
+        print(f"{manifest[name]['description']}: {'SUCCESS' if result['ok'] else 'FAILED'}")
 
     # List downloaded files
     print()
-    print("Files in data/raw/:")
-    for f in DATA_DIR.iterdir():
+    print(f"Files in {args.data_dir}:")
+    for f in sorted(args.data_dir.iterdir()):
         size = f.stat().st_size / (1024 * 1024)  # MB
         print(f"  {f.name}: {size:.2f} MB")
+
+    if not all(result['ok'] for result in results.values()):
+        sys.exit(1)
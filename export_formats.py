@@ -0,0 +1,213 @@
+"""
+Compact encodings for the patient table (patient_risks.json).
+
+The dashboard export has always been a list of per-row dicts written with
+indent=2, which repeats every key on every row. This module adds:
+
+  columnar   {"format": "columnar", "rows": n, "columns": [...], "data": {col: [values]}}
+             written without whitespace, optionally gzip-compressed (.gz)
+  binary     typed little-endian column blocks behind a small JSON header, so a
+             browser can wrap each column in a TypedArray without parsing text
+
+Float columns can be rounded to a fixed number of decimals. In the binary
+layout a rounded column is stored as a scaled integer (e.g. risk_score * 100
+in a uint16) using the narrowest integer type that holds its range.
+
+Binary layout:
+    b'RRPT' | uint32 header_length | header JSON (utf-8) | zero padding to 8 bytes | column blocks
+with each column's dtype, byte offset (from the start of the file) and scale
+recorded in the header; every block starts on an 8-byte boundary.
+"""
+import gzip
+import json
+import struct
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Default rounding for the patient export (matches patient_export_frame())
+PATIENT_PRECISION = {'risk_score': 2, 'estimated_cost': 2}
+
+BINARY_MAGIC = b'RRPT'
+BINARY_VERSION = 1
+BINARY_ALIGNMENT = 8
+
+FORMAT_SUFFIXES = {
+    'records': '.json',
+    'columnar': '.columns.json',
+    'columnar-gzip': '.columns.json.gz',
+    'binary': '.bin',
+    'binary-gzip': '.bin.gz',
+}
+
+
+def _round_columns(df: pd.DataFrame, precision: dict) -> pd.DataFrame:
+    if not precision:
+        return df
+    df = df.copy()
+    for col, decimals in precision.items():
+        if col in df.columns:
+            df[col] = df[col].round(decimals)
+    return df
+
+
+def columnar_table(df: pd.DataFrame, precision: dict = None) -> dict:
+    """Column-oriented dict for df, with optional per-column rounding."""
+    df = _round_columns(df, precision)
+    return {
+        'format': 'columnar',
+        'rows': int(len(df)),
+        'columns': list(df.columns),
+        'data': {col: df[col].tolist() for col in df.columns},
+    }
+
+
+def write_records_json(df: pd.DataFrame, path: Path):
+    """The original list-of-dicts layout (indent=2)."""
+    with open(path, 'w') as f:
+        json.dump(df.to_dict('records'), f, indent=2)
+
+
+def write_text_if_changed(path: Path, text: str) -> bool:
+    """Write text to path unless the file already holds exactly that; returns whether it wrote."""
+    path = Path(path)
+    if path.exists() and path.stat().st_size == len(text.encode()) and path.read_text() == text:
+        return False
+    path.write_text(text)
+    return True
+
+
+def write_records_stream(records, path: Path) -> int:
+    """write_records_json()'s layout from an iterable of dicts, one record at a time.
+
+    Returns the number of records written.
+    """
+    count = 0
+    with open(path, 'w') as f:
+        for count, record in enumerate(records, start=1):
+            f.write('[\n' if count == 1 else ',\n')
+            f.write(textwrap.indent(json.dumps(record, indent=2), '  '))
+        f.write('\n]' if count else '[]')
+    return count
+
+
+def write_columnar_json(df: pd.DataFrame, path: Path, precision: dict = None, compress: bool = False):
+    """Columnar JSON without whitespace; gzip-compressed when compress is set."""
+    data = json.dumps(columnar_table(df, precision), separators=(',', ':')).encode()
+    if compress:
+        data = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read_columnar_json(path: Path) -> pd.DataFrame:
+    """Load a file written by write_columnar_json()."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    table = json.loads(data)
+    return pd.DataFrame(table['data'], columns=table['columns'])
+
+
+def _encode_column(values: pd.Series, decimals: int = None):
+    """(array, scale) for one column: narrowest integer type, scaled if rounded."""
+    if decimals is not None:
+        scale = 10 ** decimals
+        array = np.round(values.to_numpy(dtype=np.float64) * scale).astype(np.int64)
+    elif pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        scale = 1
+        array = values.to_numpy(dtype=np.int64)
+    else:
+        return values.to_numpy(dtype=np.float64), 1
+
+    if len(array) == 0:
+        return array.astype(np.int32), scale
+    low, high = int(array.min()), int(array.max())
+    for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return array.astype(dtype), scale
+    return array, scale
+
+
+def _padding(length: int) -> int:
+    return -length % BINARY_ALIGNMENT
+
+
+def encode_binary(df: pd.DataFrame, precision: dict = None) -> bytes:
+    """Typed columnar binary encoding of df (see module docstring for the layout)."""
+    precision = precision or {}
+    encoded = [(col, *_encode_column(df[col], precision.get(col))) for col in df.columns]
+
+    # Column offsets depend on the header length, which depends on the offsets;
+    # reserve room for the widest offsets and pad the header to that size
+    def header_bytes(offsets):
+        columns = [
+            {'name': col, 'dtype': array.dtype.str, 'offset': offset, 'scale': scale}
+            for (col, array, scale), offset in zip(encoded, offsets)
+        ]
+        return json.dumps({'version': BINARY_VERSION, 'rows': int(len(df)), 'columns': columns},
+                          separators=(',', ':')).encode()
+
+    sizes = [array.nbytes for _, array, _ in encoded]
+    worst = header_bytes([sum(sizes) + 2 ** 40] * len(encoded))
+    data_start = len(BINARY_MAGIC) + 4 + len(worst)
+    data_start += _padding(data_start)
+
+    offsets, position = [], data_start
+    for size in sizes:
+        offsets.append(position)
+        position += size + _padding(size)
+
+    header = header_bytes(offsets).ljust(data_start - len(BINARY_MAGIC) - 4, b' ')
+    parts = [BINARY_MAGIC, struct.pack('<I', len(header)), header]
+    for (_, array, _), size in zip(encoded, sizes):
+        parts.append(array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes())
+        parts.append(b'\0' * _padding(size))
+    return b''.join(parts)
+
+
+def decode_binary(data: bytes) -> pd.DataFrame:
+    """Inverse of encode_binary(); scaled columns come back as floats."""
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("not a patient table binary export")
+    (header_length,) = struct.unpack_from('<I', data, 4)
+    header = json.loads(data[8:8 + header_length])
+    if header['version'] != BINARY_VERSION:
+        raise ValueError(f"unsupported binary export version {header['version']}")
+
+    rows = header['rows']
+    columns = {}
+    for column in header['columns']:
+        array = np.frombuffer(data, dtype=np.dtype(column['dtype']), count=rows, offset=column['offset'])
+        columns[column['name']] = array / column['scale'] if column['scale'] != 1 else array
+    return pd.DataFrame(columns)
+
+
+def write_binary(df: pd.DataFrame, path: Path, precision: dict = None, compress: bool = False):
+    """Write encode_binary(df); gzip-compressed when compress is set."""
+    data = encode_binary(df, precision)
+    if compress:
+        data = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def write_patient_table(df: pd.DataFrame, output_dir: Path, stem: str = 'patient_risks',
+                        fmt: str = 'records', precision: dict = PATIENT_PRECISION) -> Path:
+    """Write df in one of FORMAT_SUFFIXES' formats and return the path."""
+    if fmt not in FORMAT_SUFFIXES:
+        raise ValueError(f"unknown export format {fmt!r}; choose from {', '.join(FORMAT_SUFFIXES)}")
+    path = Path(output_dir) / f"{stem}{FORMAT_SUFFIXES[fmt]}"
+    if fmt == 'records':
+        write_records_json(_round_columns(df, precision), path)
+    elif fmt.startswith('columnar'):
+        write_columnar_json(df, path, precision, compress=fmt.endswith('gzip'))
+    else:
+        write_binary(df, path, precision, compress=fmt.endswith('gzip'))
+    return path
@@ -0,0 +1,146 @@
+"""
+Feature engineering for the UCI diabetes readmission model.
+Every derived feature is computed column-wise with NumPy, so the cost grows
+with the number of medication columns rather than with Python-level row loops.
+"""
+import numpy as np
+import pandas as pd
+
+AGE_MAPPING = {
+    '[0-10)': 5, '[10-20)': 15, '[20-30)': 25, '[30-40)': 35,
+    '[40-50)': 45, '[50-60)': 55, '[60-70)': 65, '[70-80)': 75,
+    '[80-90)': 85, '[90-100)': 95
+}
+
+MED_COLS = ['metformin', 'repaglinide', 'nateglinide', 'chlorpropamide',
+            'glimepiride', 'acetohexamide', 'glipizide', 'glyburide',
+            'tolbutamide', 'pioglitazone', 'rosiglitazone', 'acarbose',
+            'miglitol', 'troglitazone', 'tolazamide', 'insulin',
+            'glyburide-metformin', 'glipizide-metformin']
+
+MED_CHANGE_VALUES = ['Up', 'Down']
+A1C_ABNORMAL_VALUES = ['>7', '>8']
+
+DERIVED_FEATURES = [
+    'age_numeric', 'total_visits', 'medication_intensity',
+    'num_med_changes', 'A1Cresult_abnormal'
+]
+
+NUMERIC_FEATURES = [
+    'time_in_hospital', 'num_lab_procedures', 'num_procedures',
+    'num_medications', 'number_outpatient', 'number_emergency',
+    'number_inpatient', 'number_diagnoses', 'age_numeric',
+    'total_visits', 'medication_intensity', 'num_med_changes'
+]
+
+CATEGORICAL_FEATURES = [
+    'race', 'gender', 'admission_type_id', 'discharge_disposition_id',
+    'admission_source_id', 'diabetesMed', 'change', 'A1Cresult_abnormal'
+]
+
+
+def _matches(values: pd.Series, targets: list) -> np.ndarray:
+    """Boolean mask of values equal to any of targets (NaN never matches)."""
+    return values.isin(targets).to_numpy(dtype=bool)
+
+
+def _map_values(values: pd.Series, mapping: dict) -> pd.Series:
+    """values.map(mapping), returned as a plain numeric Series even for categoricals."""
+    mapped = values.map(mapping)
+    if isinstance(mapped.dtype, pd.CategoricalDtype):
+        mapped = pd.Series(np.asarray(mapped), index=values.index)
+    return mapped
+
+
+def count_med_changes(df: pd.DataFrame) -> np.ndarray:
+    """Number of medications whose dosage went Up or Down, per row."""
+    counts = np.zeros(len(df), dtype=np.int64)
+    for col in MED_COLS:
+        if col in df.columns:
+            counts += _matches(df[col], MED_CHANGE_VALUES)
+    return counts
+
+
+def add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add age_numeric, total_visits, medication_intensity, num_med_changes
+    and A1Cresult_abnormal to df in place and return it."""
+    df['age_numeric'] = _map_values(df['age'], AGE_MAPPING)
+
+    df['total_visits'] = df['number_outpatient'] + df['number_emergency'] + df['number_inpatient']
+    # Promote before adding 1 so narrow integer dtypes cannot wrap
+    df['medication_intensity'] = df['num_medications'] / (df['time_in_hospital'].astype(np.float64) + 1)
+
+    df['num_med_changes'] = count_med_changes(df)
+    df['A1Cresult_abnormal'] = _matches(df['A1Cresult'], A1C_ABNORMAL_VALUES).astype(np.int64)
+    return df
+
+
+def _record_number(value):
+    """Float value of a raw field, or None when missing ('?', '', None, NaN)."""
+    if value is None or value == '' or value == '?':
+        return None
+    number = float(value)
+    return None if number != number else number
+
+
+def _record_category(value):
+    """Category label of a raw field as pd.get_dummies would name it, or None when missing."""
+    if value is None or value == '' or value == '?':
+        return None
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer():
+            value = int(value)
+    return str(value)
+
+
+def derive_record_features(record: dict) -> dict:
+    """NUMERIC_FEATURES + CATEGORICAL_FEATURES values for one raw encounter dict.
+
+    Mirrors add_derived_features() without building a DataFrame; missing
+    values come back as None so the caller can apply its own fill values.
+    """
+    values = {col: _record_number(record.get(col)) for col in NUMERIC_FEATURES if col not in DERIVED_FEATURES}
+    values['age_numeric'] = AGE_MAPPING.get(record.get('age'))
+
+    visits = [values['number_outpatient'], values['number_emergency'], values['number_inpatient']]
+    values['total_visits'] = None if None in visits else sum(visits)
+    if values['num_medications'] is None or values['time_in_hospital'] is None:
+        values['medication_intensity'] = None
+    else:
+        values['medication_intensity'] = values['num_medications'] / (values['time_in_hospital'] + 1)
+    values['num_med_changes'] = sum(1 for col in MED_COLS if record.get(col) in MED_CHANGE_VALUES)
+
+    for col in CATEGORICAL_FEATURES:
+        if col != 'A1Cresult_abnormal':
+            values[col] = _record_category(record.get(col))
+    values['A1Cresult_abnormal'] = '1' if record.get('A1Cresult') in A1C_ABNORMAL_VALUES else '0'
+    return values
+
+
+def fill_missing(df_model: pd.DataFrame, numeric_features: list = NUMERIC_FEATURES,
+                 categorical_features: list = CATEGORICAL_FEATURES,
+                 medians: dict = None) -> pd.DataFrame:
+    """Fill numeric NaN with the column median and categorical NaN with 'Unknown'.
+
+    Pass medians (e.g. from training) to fill with fixed values instead of the
+    frame's own medians. Categorical-dtype columns are normalised to their
+    observed, sorted levels so pd.get_dummies produces the same columns as it
+    would for object data.
+    """
+    for col in numeric_features:
+        if df_model[col].isnull().any():
+            fill_value = medians[col] if medians is not None else df_model[col].median()
+            df_model[col] = df_model[col].fillna(fill_value)
+
+    for col in categorical_features:
+        values = df_model[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            if values.isnull().any() and 'Unknown' not in values.cat.categories:
+                values = values.cat.add_categories('Unknown')
+            values = values.fillna('Unknown').cat.remove_unused_categories()
+            df_model[col] = values.cat.reorder_categories(sorted(values.cat.categories))
+        elif values.isnull().any():
+            df_model[col] = values.fillna('Unknown')
+    return df_model
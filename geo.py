@@ -0,0 +1,215 @@
+"""
+Geographic rollups and a spatial index for the hospital map.
+
+write_geo_exports() takes the hospital table (with lat/lng) and writes into
+<output_dir>/geo/:
+
+  manifest.json        hospital count, grid cell size, tile zooms and, per
+                       tile and per grid cell, its file, x/y or row/col and
+                       hospital count
+  states.json          one row per state: hospital count, mean readmission rate
+  cities.json          and penalty, centroid and bounds; cities add their state
+  tiles/{z}/{x}/{y}.json  the same rollup for one occupied web-mercator tile,
+                       for each zoom in TILE_ZOOMS
+  cells/{row}_{col}.json  the hospitals (with lat/lng) in each CELL_DEG grid
+                       cell, highest readmission rate first
+
+A map view reads only the tiles its box overlaps at its zoom
+(GeoIndex.tiles()), and GeoIndex.near() reads only the cells around a point.
+Both cost O(result) rather than a scan of hospital_metrics.json.
+"""
+import heapq
+import json
+import math
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+GEO_DIRNAME = 'geo'
+MANIFEST_NAME = 'manifest.json'
+CELL_DEG = 1.0
+TILE_ZOOMS = [3, 4, 5, 6, 7, 8]
+EARTH_RADIUS_KM = 6371.0
+# Same sphere as haversine_km, so a search box always covers its radius
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+COORDINATE_COLUMNS = ['lat', 'lng', 'south', 'west', 'north', 'east']
+
+HOSPITAL_COLUMNS = ['facility_id', 'hospital_name', 'state', 'city', 'lat', 'lng',
+                    'readmission_rate', 'penalty_pct']
+
+
+def grid_cells(lat: np.ndarray, lng: np.ndarray, cell_deg: float = CELL_DEG) -> tuple:
+    """(row, col) of the cell_deg grid cell holding each point; row 0 starts at -90, col 0 at -180."""
+    row = np.floor((np.asarray(lat) + 90) / cell_deg).astype(np.int64)
+    col = np.floor((np.asarray(lng) + 180) / cell_deg).astype(np.int64)
+    return row, col
+
+
+def tile_xy(lat: np.ndarray, lng: np.ndarray, zoom: int) -> tuple:
+    """Web-mercator (slippy map) tile x, y for each point at zoom."""
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    x = np.floor((np.asarray(lng) + 180) / 360 * n)
+    y = np.floor((1 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def haversine_km(lat1, lng1, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from (lat1, lng1) to each (lat2, lng2)."""
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def rollup(df: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Hospital count, mean rate/penalty, centroid and bounds per group of keys."""
+    out = df.groupby(keys, sort=True).agg(
+        hospital_count=('readmission_rate', 'size'),
+        avg_readmission_rate=('readmission_rate', 'mean'),
+        avg_penalty_pct=('penalty_pct', 'mean'),
+        lat=('lat', 'mean'),
+        lng=('lng', 'mean'),
+        south=('lat', 'min'),
+        west=('lng', 'min'),
+        north=('lat', 'max'),
+        east=('lng', 'max'),
+    ).reset_index()
+    out['avg_readmission_rate'] = out['avg_readmission_rate'].round(2)
+    out['avg_penalty_pct'] = out['avg_penalty_pct'].round(3)
+    out[COORDINATE_COLUMNS] = out[COORDINATE_COLUMNS].round(5)
+    return out
+
+
+def _records(df: pd.DataFrame) -> list:
+    """Row dicts built from whole columns (DataFrame.to_dict boxes every value)."""
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*(df[column].tolist() for column in columns))]
+
+
+def _write_json(path: Path, data):
+    # json.dumps uses the C encoder; json.dump streams through the Python one
+    with open(path, 'w') as f:
+        f.write(json.dumps(data, separators=(',', ':')))
+
+
+def write_geo_exports(df_hospitals: pd.DataFrame, output_dir: Path, state_names: dict = None,
+                      cell_deg: float = CELL_DEG, zooms: list = TILE_ZOOMS) -> Path:
+    """Write the rollups, tiles and cell files for df_hospitals; returns the manifest path."""
+    missing = [column for column in HOSPITAL_COLUMNS if column not in df_hospitals.columns]
+    if missing:
+        raise ValueError(f"hospital table is missing {', '.join(missing)}")
+
+    df = df_hospitals[HOSPITAL_COLUMNS].dropna(subset=['lat', 'lng', 'readmission_rate'])
+    geo_dir = Path(output_dir) / GEO_DIRNAME
+    cells_dir = geo_dir / 'cells'
+    tiles_dir = geo_dir / 'tiles'
+    cells_dir.mkdir(parents=True, exist_ok=True)
+    for stale in [*cells_dir.glob('*.json'), *geo_dir.glob('tiles-z*.json')]:
+        stale.unlink()
+    shutil.rmtree(tiles_dir, ignore_errors=True)
+
+    states = rollup(df, ['state'])
+    states.insert(1, 'name', states['state'].map(state_names or {}).fillna(states['state']))
+    states.insert(3, 'city_count', df.groupby('state', sort=True)['city'].nunique().to_numpy())
+    _write_json(geo_dir / 'states.json', _records(states))
+    _write_json(geo_dir / 'cities.json', _records(rollup(df, ['state', 'city'])))
+
+    lat, lng = df['lat'].to_numpy(), df['lng'].to_numpy()
+    tiles = {}
+    for zoom in zooms:
+        x, y = tile_xy(lat, lng, zoom)
+        tiles[str(zoom)] = []
+        for tile in _records(rollup(df.assign(x=x, y=y), ['x', 'y'])):
+            filename = f"tiles/{zoom}/{tile['x']}/{tile['y']}.json"
+            (geo_dir / filename).parent.mkdir(parents=True, exist_ok=True)
+            _write_json(geo_dir / filename, tile)
+            tiles[str(zoom)].append({'x': tile['x'], 'y': tile['y'], 'file': filename,
+                                     'hospitals': tile['hospital_count']})
+
+    # Sorted by cell, each cell's hospitals are one contiguous slice
+    row, col = grid_cells(lat, lng, cell_deg)
+    order = np.lexsort((-df['readmission_rate'].to_numpy(), col, row))
+    records = _records(df.iloc[order])
+    cell_keys = np.stack([row[order], col[order]], axis=1)
+    _, starts = np.unique(cell_keys, axis=0, return_index=True)
+    cells = []
+    for start, end in zip(starts.tolist(), [*starts[1:].tolist(), len(records)]):
+        cell_row, cell_col = cell_keys[start].tolist()
+        filename = f'{cell_row}_{cell_col}.json'
+        _write_json(cells_dir / filename, records[start:end])
+        cells.append({'row': cell_row, 'col': cell_col, 'file': f'cells/{filename}', 'hospitals': end - start})
+
+    manifest = {
+        'hospitals': int(len(df)),
+        'states': int(len(states)),
+        'cell_deg': cell_deg,
+        'zooms': list(zooms),
+        'tiles': tiles,
+        'columns': HOSPITAL_COLUMNS,
+        'cells': cells,
+    }
+    manifest_path = geo_dir / MANIFEST_NAME
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+class GeoIndex:
+    """Reads a geo/ export, loading each cell or tile file only when a query needs it."""
+
+    def __init__(self, geo_dir: Path):
+        self.geo_dir = Path(geo_dir)
+        with open(self.geo_dir / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+        self.cell_deg = self.manifest['cell_deg']
+        self.cells = {(cell['row'], cell['col']): cell['file'] for cell in self.manifest['cells']}
+        self.tile_files = {
+            int(zoom): {(tile['x'], tile['y']): tile['file'] for tile in zoom_tiles}
+            for zoom, zoom_tiles in self.manifest['tiles'].items()
+        }
+        self._loaded = {}
+
+    def _load(self, filename: str):
+        if filename not in self._loaded:
+            with open(self.geo_dir / filename) as f:
+                self._loaded[filename] = json.load(f)
+        return self._loaded[filename]
+
+    def tiles(self, zoom: int, south: float = None, west: float = None,
+              north: float = None, east: float = None) -> list:
+        """The tile rollups for zoom; only the tiles the box overlaps when one is given."""
+        files = self.tile_files[zoom]
+        if south is not None:
+            (x_lo, x_hi), (y_hi, y_lo) = tile_xy(np.array([south, north]), np.array([west, east]), zoom)
+            files = {key: filename for key, filename in files.items()
+                     if x_lo <= key[0] <= x_hi and y_lo <= key[1] <= y_hi}
+        return [self._load(filename) for filename in files.values()]
+
+    def within(self, south: float, west: float, north: float, east: float) -> list:
+        """Hospitals inside the box, reading only the cells it overlaps."""
+        (row_lo, row_hi), (col_lo, col_hi) = (
+            grid_cells(np.array([south, north]), np.array([west, east]), self.cell_deg))
+        found = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                if (row, col) in self.cells:
+                    found.extend(hospital for hospital in self._load(self.cells[(row, col)])
+                                 if south <= hospital['lat'] <= north and west <= hospital['lng'] <= east)
+        return found
+
+    def near(self, lat: float, lng: float, radius_km: float, limit: int = None) -> list:
+        """(distance_km, hospital) pairs within radius_km of the point, nearest first."""
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlng = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        candidates = self.within(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+        if not candidates:
+            return []
+        distances = haversine_km(lat, lng, np.array([h['lat'] for h in candidates]),
+                                 np.array([h['lng'] for h in candidates]))
+        pairs = [(float(distance), hospital) for distance, hospital in zip(distances, candidates)
+                 if distance <= radius_km]
+        if limit is not None:
+            return heapq.nsmallest(limit, pairs, key=lambda pair: pair[0])
+        return sorted(pairs, key=lambda pair: pair[0])
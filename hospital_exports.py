@@ -0,0 +1,76 @@
+"""
+Record builders for state_summary.json and hospital_metrics.json.
+
+Records are assembled from whole columns (one list per field, zipped into
+dicts) instead of iterating DataFrame rows, so every hospital/measure row in
+the CMS HRRP file can be exported.
+"""
+import numpy as np
+import pandas as pd
+
+HOSPITAL_FIELDS = ['name', 'state', 'city', 'readmission_rate', 'penalty_pct']
+STATE_FIELDS = ['state', 'name', 'lat', 'lng', 'hospital_count', 'avg_readmission_rate',
+                'total_penalty_estimate']
+
+
+def _column(df: pd.DataFrame, name: str, default) -> pd.Series:
+    """df[name], or a constant column when the source file lacks it."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+
+def _rounded(values: pd.Series, digits: int) -> list:
+    """Floats rounded with Python's round(); NaN becomes 0.
+
+    numpy's round scales by 10**digits first and can land on the other side of
+    a tie, so this keeps the values identical to the old per-row exports.
+    """
+    values = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    return [round(value, digits) for value in values.tolist()]
+
+
+def _labels(values: pd.Series) -> list:
+    """Strings, with missing values as 'Unknown'."""
+    return values.astype(object).where(values.notna(), 'Unknown').astype(str).tolist()
+
+
+def _records(fields: list, columns: list) -> list:
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+def hospital_records(df_hosp: pd.DataFrame, limit: int = None) -> list:
+    """hospital_metrics.json entries, highest readmission rate first.
+
+    Rows without a readmission rate are skipped; limit keeps only the top rows.
+    """
+    if 'readmission_rate' in df_hosp.columns:
+        df_hosp = df_hosp.dropna(subset=['readmission_rate'])
+        df_hosp = df_hosp.sort_values('readmission_rate', ascending=False, kind='stable')
+    if limit is not None:
+        df_hosp = df_hosp.head(limit)
+
+    return _records(HOSPITAL_FIELDS, [
+        _labels(_column(df_hosp, 'hospital_name', 'Unknown')),
+        _labels(_column(df_hosp, 'state', 'Unknown')),
+        _labels(_column(df_hosp, 'city', 'Unknown')),
+        _rounded(_column(df_hosp, 'readmission_rate', 0), 2),
+        _rounded(_column(df_hosp, 'penalty_pct', 0), 2),
+    ])
+
+
+def state_records(state_summary: pd.DataFrame, state_coords: dict) -> list:
+    """state_summary.json entries; states missing from state_coords get 0, 0 and their code as name."""
+    states = state_summary['state']
+    lookup = {field: states.map({code: coords[field] for code, coords in state_coords.items()})
+              for field in ('name', 'lat', 'lng')}
+
+    return _records(STATE_FIELDS, [
+        states.tolist(),
+        lookup['name'].fillna(states).tolist(),
+        lookup['lat'].astype(object).where(lookup['lat'].notna(), 0).tolist(),
+        lookup['lng'].astype(object).where(lookup['lng'].notna(), 0).tolist(),
+        state_summary['hospital_count'].astype(int).tolist(),
+        _rounded(_column(state_summary, 'avg_readmission_rate', 0), 2),
+        _rounded(_column(state_summary, 'total_penalty_estimate', 0), 0),
+    ])
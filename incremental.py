@@ -0,0 +1,223 @@
+"""
+Incremental training of the readmission model from new encounter batches.
+
+The full refit (run_analysis_v2.py) re-reads the whole history every time.
+Here the model is an averaged SGDClassifier with logistic loss behind a
+StandardScaler, both updated with partial_fit, so applying a batch reads only
+that batch and the saved artifact and costs time proportional to its size. The
+positive class is weighted by the running class counts (the 'balanced'
+weights of everything seen so far) in place of SMOTE.
+
+The encoder (training medians and one-hot layout) is frozen at init; levels
+that first appear in later batches are dropped, as in score.py. Patients are
+deduplicated within each batch only.
+
+Each update saves a new artifact (models/latest.json points at it, so
+score.py and the scoring service pick it up) and appends to
+models/incremental_log.json. With --check, the batch is first scored by the
+current incremental model and by a full SMOTE + LogisticRegression refit on
+the history it was built from. Neither model has seen the batch yet, so the
+AUC drift between them is an out-of-sample comparison.
+
+Usage:
+    python incremental.py init                          # fit on data/raw/diabetic_data.csv in batches
+    python incremental.py update --batch new_encounters.csv
+    python incremental.py update --batch new_encounters.csv --check
+"""
+import argparse
+import json
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import roc_auc_score, average_precision_score
+from sklearn.preprocessing import StandardScaler
+
+from data_cache import DATA_DIR
+from features import fill_missing
+from model_artifact import ModelArtifact, MODEL_DIR
+from modeling import (
+    MODEL_COLS, TARGET, prepare_patients, encode_features, resample_training, fit_scaled_model
+)
+from schema import read_uci_csv
+
+warnings.filterwarnings('ignore')
+
+INCREMENTAL_LOG = 'incremental_log.json'
+DEFAULT_BATCH_SIZE = 10_000
+
+# Passes over each batch (reshuffled every pass); more passes fit a batch
+# more closely at proportionally higher cost
+DEFAULT_EPOCHS = 5
+
+# Incremental ROC-AUC this far below the full refit's is reported as drift
+DRIFT_TOLERANCE = 0.01
+
+
+def new_model() -> SGDClassifier:
+    """Unfitted logistic-loss SGD model.
+
+    Averaged SGD (the mean of the iterates) is far less sensitive to the
+    order of batches than the last iterate.
+    """
+    return SGDClassifier(loss='log_loss', alpha=1e-2, average=True, random_state=42)
+
+
+def balanced_weights(y: np.ndarray, rows_seen: int, positives_seen: int) -> np.ndarray:
+    """Per-row 'balanced' class weights from the running class counts."""
+    positive_weight = rows_seen / (2 * max(positives_seen, 1))
+    negative_weight = rows_seen / (2 * max(rows_seen - positives_seen, 1))
+    return np.where(y == 1, positive_weight, negative_weight)
+
+
+def partial_update(scaler: StandardScaler, model: SGDClassifier, X, y, metrics: dict,
+                   epochs: int = DEFAULT_EPOCHS, seed: int = 0):
+    """Fold one encoded batch into the scaler, the model and the running counts in metrics."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    metrics['rows_seen'] = metrics.get('rows_seen', 0) + len(y)
+    metrics['positives_seen'] = metrics.get('positives_seen', 0) + int(y.sum())
+    metrics['batches'] = metrics.get('batches', 0) + 1
+
+    scaler.partial_fit(X)
+    X_scaled = scaler.transform(X)
+    weights = balanced_weights(y, metrics['rows_seen'], metrics['positives_seen'])
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        model.partial_fit(X_scaled[order], y[order], classes=[0, 1], sample_weight=weights[order])
+
+
+def encode_batch(encoder, df: pd.DataFrame):
+    """Raw encounters -> (X, y) in the encoder's column layout."""
+    df = prepare_patients(df)
+    X = encoder.transform(df).to_numpy(dtype=np.float64)
+    return X, df[TARGET].to_numpy()
+
+
+def read_log(model_dir: Path = MODEL_DIR) -> list:
+    path = model_dir / INCREMENTAL_LOG
+    if not path.exists():
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_log(log: list, model_dir: Path = MODEL_DIR):
+    with open(model_dir / INCREMENTAL_LOG, 'w') as f:
+        json.dump(log, f, indent=2)
+
+
+def init_model(source: Path, batch_size: int = DEFAULT_BATCH_SIZE, epochs: int = DEFAULT_EPOCHS,
+               model_dir: Path = MODEL_DIR) -> ModelArtifact:
+    """Fit the encoder on source, then train the SGD model over it batch by batch."""
+    df_model = fill_missing(prepare_patients(read_uci_csv(source))[MODEL_COLS])
+    X, y, encoder = encode_features(df_model)
+    X = X.to_numpy(dtype=np.float64)
+    y = y.to_numpy()
+
+    scaler, model, metrics = StandardScaler(), new_model(), {}
+    for i, offset in enumerate(range(0, len(y), batch_size)):
+        partial_update(scaler, model, X[offset:offset + batch_size], y[offset:offset + batch_size],
+                       metrics, epochs, seed=i)
+
+    artifact = ModelArtifact(encoder, scaler, model, metrics)
+    path = artifact.save(model_dir, parity_sample=X)
+    write_log([{'source': str(source), 'rows': len(y), 'version': artifact.version}], model_dir)
+    print(f"Trained on {len(y):,} patients in {metrics['batches']} batches; saved {path.name}")
+    return artifact
+
+
+def drift_check(artifact: ModelArtifact, X_batch, y_batch, history: list) -> dict:
+    """ROC-AUC/AP on the batch of the incremental model vs a full refit on history."""
+    frames = [encode_batch(artifact.encoder, read_uci_csv(source)) for source in history]
+    X_hist = np.concatenate([X for X, _ in frames])
+    y_hist = np.concatenate([y for _, y in frames])
+
+    start = time.perf_counter()
+    scaler, model = fit_scaled_model(*resample_training(X_hist, y_hist))
+    refit_seconds = time.perf_counter() - start
+
+    full = model.predict_proba(scaler.transform(X_batch))[:, 1]
+    incremental = artifact.model.predict_proba(artifact.scaler.transform(X_batch))[:, 1]
+    result = {
+        'history_rows': len(y_hist),
+        'refit_seconds': round(refit_seconds, 2),
+        'full_roc_auc': float(roc_auc_score(y_batch, full)),
+        'incremental_roc_auc': float(roc_auc_score(y_batch, incremental)),
+        'full_avg_precision': float(average_precision_score(y_batch, full)),
+        'incremental_avg_precision': float(average_precision_score(y_batch, incremental)),
+    }
+    result['auc_drift'] = result['incremental_roc_auc'] - result['full_roc_auc']
+    return result
+
+
+def print_drift(result: dict):
+    print("\n" + "=" * 60)
+    print("DRIFT CHECK (batch scored before the update)")
+    print("=" * 60)
+    print(f"Full refit on {result['history_rows']:,} patients took {result['refit_seconds']:.1f}s")
+    print(f"{'model':<14} {'ROC-AUC':>8} {'AP':>8}")
+    print(f"{'full refit':<14} {result['full_roc_auc']:>8.4f} {result['full_avg_precision']:>8.4f}")
+    print(f"{'incremental':<14} {result['incremental_roc_auc']:>8.4f} {result['incremental_avg_precision']:>8.4f}")
+    print(f"AUC drift: {result['auc_drift']:+.4f}")
+    if result['auc_drift'] < -DRIFT_TOLERANCE:
+        print(f"WARNING: incremental model trails the full refit by more than {DRIFT_TOLERANCE}; "
+              f"re-run incremental.py init or run_analysis_v2.py")
+
+
+def update_model(batch: Path, epochs: int = DEFAULT_EPOCHS, check: bool = False,
+                 model_dir: Path = MODEL_DIR) -> ModelArtifact:
+    """Apply one batch file to the latest incremental artifact and save the result."""
+    artifact = ModelArtifact.load(model_dir=model_dir)
+    if not isinstance(artifact.model, SGDClassifier):
+        raise ValueError(f"{artifact.version} is not an incremental model; run 'incremental.py init' first")
+    log = read_log(model_dir)
+
+    X, y = encode_batch(artifact.encoder, read_uci_csv(batch))
+    drift = drift_check(artifact, X, y, [entry['source'] for entry in log]) if check else None
+    if drift is not None:
+        print_drift(drift)
+
+    start = time.perf_counter()
+    metrics = {key: value for key, value in artifact.metrics.items() if key != 'drift'}
+    partial_update(artifact.scaler, artifact.model, X, y, metrics, epochs, seed=metrics.get('batches', 0))
+    if drift is not None:
+        metrics['drift'] = drift
+    updated = ModelArtifact(artifact.encoder, artifact.scaler, artifact.model, metrics)
+    path = updated.save(model_dir, parity_sample=X)
+    seconds = time.perf_counter() - start
+
+    log.append({'source': str(batch), 'rows': len(y), 'version': updated.version,
+                'seconds': round(seconds, 3), **({'drift': drift} if drift is not None else {})})
+    write_log(log, model_dir)
+    print(f"\nApplied {len(y):,} patients in {seconds:.2f}s "
+          f"({metrics['rows_seen']:,} seen over {metrics['batches']} batches); saved {path.name}")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the readmission model incrementally from encounter batches.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    init = commands.add_parser('init', help='start a new incremental model from a history file')
+    init.add_argument('--input', type=Path, default=DATA_DIR / 'diabetic_data.csv')
+    init.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    update = commands.add_parser('update', help='apply a batch of new encounters to the latest model')
+    update.add_argument('--batch', type=Path, required=True)
+    update.add_argument('--check', action='store_true',
+                        help='compare against a full refit on the history before applying the batch')
+    for command in (init, update):
+        command.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS)
+        command.add_argument('--model-dir', type=Path, default=MODEL_DIR)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("INCREMENTAL MODEL " + args.command.upper())
+    print("=" * 60)
+    if args.command == 'init':
+        init_model(args.input, args.batch_size, args.epochs, args.model_dir)
+    else:
+        update_model(args.batch, args.epochs, args.check, args.model_dir)
@@ -0,0 +1,139 @@
+"""
+Versioned on-disk artifact for the fitted readmission model.
+
+An artifact bundles everything needed to score new encounters without
+retraining: the FeatureEncoder (training medians and one-hot column layout),
+the fitted StandardScaler and LogisticRegression, and the training metrics.
+Artifacts are written to models/ as readmission_model-<version>.joblib, where
+the version combines the training timestamp with a hash of the fitted
+weights; models/latest.json points at the most recent one. A NumPy-only
+CompiledScorer (.npz) is written alongside each artifact.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+from compiled_scorer import CompiledScorer
+from modeling import FeatureEncoder
+
+MODEL_DIR = Path(__file__).parent / 'models'
+LATEST_POINTER = 'latest.json'
+
+# Bump when the artifact layout changes; older artifacts are then rejected
+ARTIFACT_FORMAT_VERSION = 1
+
+# Largest allowed probability difference between the compiled and sklearn paths
+PARITY_TOLERANCE = 1e-9
+
+
+class ModelArtifact:
+    """Fitted preprocessing + model, with version metadata."""
+
+    def __init__(self, encoder: FeatureEncoder, scaler, model, metrics: dict = None,
+                 version: str = None, created_at: str = None):
+        self.encoder = encoder
+        self.scaler = scaler
+        self.model = model
+        self.metrics = metrics or {}
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.version = version or self._make_version()
+        self.sklearn_version = sklearn.__version__
+        self.format_version = ARTIFACT_FORMAT_VERSION
+
+    @property
+    def feature_cols(self) -> list:
+        return self.encoder.feature_cols
+
+    def weights_digest(self) -> str:
+        """Hash of the feature layout and fitted parameters."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.feature_cols).encode())
+        for array in (self.scaler.mean_, self.scaler.scale_, self.model.coef_, self.model.intercept_):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def _make_version(self) -> str:
+        stamp = datetime.fromisoformat(self.created_at).strftime('%Y%m%d-%H%M%S')
+        return f"{stamp}-{self.weights_digest()[:8]}"
+
+    def check_alignment(self):
+        """Raise ValueError if the scaler/model were not fitted on the encoder's columns."""
+        n_features = len(self.feature_cols)
+        for name, fitted in (('scaler', self.scaler), ('model', self.model)):
+            if fitted.n_features_in_ != n_features:
+                raise ValueError(
+                    f"{name} expects {fitted.n_features_in_} features but the encoder "
+                    f"produces {n_features}"
+                )
+        names = getattr(self.scaler, 'feature_names_in_', None)
+        if names is not None and list(names) != self.feature_cols:
+            raise ValueError("scaler was fitted on a different column order than the encoder")
+
+    def compile(self) -> CompiledScorer:
+        """Fold the scaler and model into a NumPy-only scorer."""
+        return CompiledScorer.from_fitted(self.scaler, self.model, self.feature_cols, self.version)
+
+    def check_parity(self, X, compiled: CompiledScorer = None) -> float:
+        """Max |p_compiled - p_sklearn| over the encoded matrix X; raises ValueError above tolerance."""
+        compiled = compiled or self.compile()
+        expected = self.model.predict_proba(self.scaler.transform(X))[:, 1]
+        max_diff = float(np.max(np.abs(compiled.predict_proba(X) - expected), initial=0.0))
+        if max_diff > PARITY_TOLERANCE:
+            raise ValueError(f"compiled scorer differs from sklearn by {max_diff:.3g}")
+        return max_diff
+
+    def save(self, model_dir: Path = MODEL_DIR, parity_sample=None) -> Path:
+        """Write the artifact and its compiled scorer, and update models/latest.json.
+
+        If parity_sample (an encoded feature matrix) is given, the compiled
+        scorer is checked against the sklearn path on it before anything is
+        written. Returns the artifact path.
+        """
+        self.check_alignment()
+        compiled = self.compile()
+        if parity_sample is not None:
+            self.check_parity(parity_sample, compiled)
+
+        model_dir.mkdir(parents=True, exist_ok=True)
+        path = model_dir / f"readmission_model-{self.version}.joblib"
+        joblib.dump(self, path)
+        compiled_path = path.with_suffix('.npz')
+        compiled.save(compiled_path)
+
+        pointer = {
+            'version': self.version,
+            'path': path.name,
+            'compiled_path': compiled_path.name,
+            'created_at': self.created_at,
+            'metrics': self.metrics,
+            'n_features': len(self.feature_cols),
+        }
+        with open(model_dir / LATEST_POINTER, 'w') as f:
+            json.dump(pointer, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path: Path = None, model_dir: Path = MODEL_DIR) -> 'ModelArtifact':
+        """Load an artifact by path, or the latest one in model_dir."""
+        if path is None:
+            pointer_path = model_dir / LATEST_POINTER
+            if not pointer_path.exists():
+                raise FileNotFoundError(
+                    f"No model artifact in {model_dir}; run run_analysis_v2.py to train one"
+                )
+            with open(pointer_path, 'r') as f:
+                path = model_dir / json.load(f)['path']
+
+        artifact = joblib.load(path)
+        if getattr(artifact, 'format_version', None) != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"{Path(path).name} has artifact format {getattr(artifact, 'format_version', None)}, "
+                f"expected {ARTIFACT_FORMAT_VERSION}; retrain the model"
+            )
+        artifact.check_alignment()
+        return artifact
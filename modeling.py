@@ -0,0 +1,284 @@
+"""
+Training and scoring steps for the 30-day readmission model.
+Shared by the analysis scripts and the chunked scorer in streaming.py so that
+every entry point prepares, encodes and scores encounters the same way.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score, average_precision_score
+from sklearn.utils.class_weight import compute_sample_weight
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import RandomUnderSampler
+
+from features import (
+    NUMERIC_FEATURES, CATEGORICAL_FEATURES, add_derived_features, derive_record_features,
+    fill_missing
+)
+
+TARGET = 'readmitted_30day'
+ID_COLS = ['encounter_id', 'patient_nbr']
+HIGH_MISSING_COLS = ['weight', 'payer_code', 'medical_specialty']
+MODEL_COLS = NUMERIC_FEATURES + CATEGORICAL_FEATURES + [TARGET]
+
+# How the ~9% positive class is balanced for training: SMOTE oversampling
+# (the default), 'balanced' class weights, the equivalent per-row sample
+# weights, or random undersampling of the majority class
+IMBALANCE_STRATEGIES = ['smote', 'class_weight', 'sample_weight', 'undersample']
+
+# Average cost of a readmission used for the cost-exposure estimates
+READMISSION_COST = 15000
+
+# Lower bounds (risk %) for each tier, highest first; matches the dashboard legend
+RISK_TIERS = [(80, 'Critical'), (70, 'Very High'), (60, 'High'), (40, 'Medium'), (0, 'Low')]
+
+# Columns written to patient_risks.json (age_numeric is exported as 'age')
+EXPORT_COLUMNS = [
+    'patient_id', 'age_numeric', 'time_in_hospital', 'num_medications',
+    'number_diagnoses', 'number_inpatient', 'number_emergency',
+    'total_visits', 'num_med_changes', 'risk_score', 'estimated_cost',
+    'readmitted_30day'
+]
+
+
+class FeatureEncoder:
+    """Fitted preprocessing: training medians and the one-hot column layout.
+
+    transform() reproduces the training-time fill + get_dummies(drop_first=True)
+    output for any batch of encounters, whatever levels that batch contains.
+    """
+
+    def __init__(self, medians: dict, feature_cols: list):
+        self.medians = medians
+        self.feature_cols = feature_cols
+
+    @classmethod
+    def from_model_frame(cls, df_model: pd.DataFrame, feature_cols: list) -> 'FeatureEncoder':
+        """Capture the encoder state from the filled training frame."""
+        # Filling NaN with the median leaves the median unchanged, so this
+        # matches the values fill_missing() used on the training data
+        medians = {col: float(df_model[col].median()) for col in NUMERIC_FEATURES}
+        return cls(medians, list(feature_cols))
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Featurized encounters -> model matrix aligned to the training columns."""
+        frame = fill_missing(df[NUMERIC_FEATURES + CATEGORICAL_FEATURES], medians=self.medians)
+        encoded = pd.get_dummies(frame, columns=CATEGORICAL_FEATURES)
+        # Levels unseen in training are dropped; absent levels become all-zero columns
+        return encoded.reindex(columns=self.feature_cols, fill_value=False)
+
+    def _column_positions(self) -> dict:
+        positions = getattr(self, '_positions', None)
+        if positions is None:
+            positions = {col: i for i, col in enumerate(self.feature_cols)}
+            self._positions = positions
+        return positions
+
+    def transform_records(self, records: list) -> np.ndarray:
+        """Raw encounter dicts -> float matrix in feature_cols order.
+
+        Same result as add_derived_features() + transform(), without the pandas
+        overhead that dominates when scoring one or a few encounters.
+        """
+        positions = self._column_positions()
+        X = np.zeros((len(records), len(self.feature_cols)))
+        for row, record in enumerate(records):
+            values = derive_record_features(record)
+            for col in NUMERIC_FEATURES:
+                value = values[col]
+                X[row, positions[col]] = self.medians[col] if value is None else value
+            for col in CATEGORICAL_FEATURES:
+                value = values[col]
+                position = positions.get(f"{col}_{'Unknown' if value is None else value}")
+                if position is not None:
+                    X[row, position] = 1.0
+        return X
+
+
+def add_target(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the binary 30-day readmission target."""
+    df[TARGET] = (df['readmitted'] == '<30').astype(int)
+    return df
+
+
+def clean_encounters(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the 30-day target and report the raw readmission rate."""
+    df = add_target(df)
+    print(f"30-day readmission rate: {df[TARGET].mean()*100:.2f}%")
+    return df
+
+
+def first_encounter_positions(encounter_id, patient_nbr) -> np.ndarray:
+    """Row positions of each patient's first (lowest encounter_id) encounter, in encounter_id order.
+
+    Only the two key columns are touched: encounter_id is argsorted (skipped
+    when it is already increasing) and a hash-based duplicated() pass over
+    patient_nbr in that order keeps the first row per patient.
+    """
+    encounter_id = np.asarray(encounter_id)
+    if (np.diff(encounter_id) > 0).all():
+        order = np.arange(len(encounter_id))
+    else:
+        order = np.argsort(encounter_id, kind='stable')
+    first = ~pd.Series(np.asarray(patient_nbr)[order]).duplicated(keep='first').to_numpy()
+    return order[first]
+
+
+def dedup_patients(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep each patient's first encounter (lowest encounter_id).
+
+    Same rows, order and index as sort_values('encounter_id') +
+    drop_duplicates('patient_nbr'), but the wide frame is copied once instead
+    of being sorted.
+    """
+    df = df.take(first_encounter_positions(df['encounter_id'].to_numpy(), df['patient_nbr'].to_numpy()))
+    print(f"After deduplication: {len(df):,} patients")
+    return df
+
+
+class SeenPatients:
+    """First-encounter dedup across the chunks of a stream.
+
+    Remembers every patient kept so far, so a patient's later encounters in
+    later chunks are dropped. Matches dedup_patients() on the whole input when
+    chunks arrive in encounter_id order.
+
+    This is the one part of streaming.score_stream() whose memory grows with
+    the input: one set entry per unique patient_nbr (O(unique patients)).
+    """
+
+    def __init__(self):
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def first_encounters(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """The chunk's first encounter per patient not seen in an earlier chunk."""
+        positions = first_encounter_positions(chunk['encounter_id'].to_numpy(), chunk['patient_nbr'].to_numpy())
+        keys = chunk['patient_nbr'].to_numpy()[positions].tolist()
+        # Per-key set lookups cost O(chunk); Series.isin(set) would copy the whole set every chunk
+        unseen = np.fromiter((key not in self._seen for key in keys), dtype=bool, count=len(keys))
+        self._seen.update(key for key, new in zip(keys, unseen) if new)
+        return chunk.take(positions[unseen])
+
+
+def featurize_patients(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop identifiers and mostly-missing columns, then add the derived features."""
+    df = df.drop(columns=ID_COLS + HIGH_MISSING_COLS)
+    return add_derived_features(df)
+
+
+def prepare_patients(df: pd.DataFrame, memory=None) -> pd.DataFrame:
+    """Target, first encounter per patient and derived features."""
+    df = clean_encounters(df)
+
+    df = dedup_patients(df)
+    if memory is not None:
+        memory.checkpoint('dedup', len(df))
+
+    df = featurize_patients(df)
+    if memory is not None:
+        memory.checkpoint('featurize', len(df))
+    return df
+
+
+def encode_features(df_model: pd.DataFrame):
+    """One-hot encode the filled model frame. Returns (X, y, encoder)."""
+    df_encoded = pd.get_dummies(df_model, columns=CATEGORICAL_FEATURES, drop_first=True)
+
+    feature_cols = [col for col in df_encoded.columns if col != TARGET]
+    X = df_encoded[feature_cols]
+    y = df_encoded[TARGET]
+    return X, y, FeatureEncoder.from_model_frame(df_model, feature_cols)
+
+
+def split_train_test(X: pd.DataFrame, y: pd.Series):
+    """Stratified 80/20 split. Returns (X_train, X_test, y_train, y_test)."""
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+
+def resample_training(X_train: pd.DataFrame, y_train: pd.Series, imbalance: str = 'smote'):
+    """Balance the training split by SMOTE or undersampling.
+
+    The weighting strategies leave the rows as they are (see fit_scaled_model).
+    """
+    if imbalance not in IMBALANCE_STRATEGIES:
+        raise ValueError(f"unknown imbalance strategy {imbalance!r}; choose from {IMBALANCE_STRATEGIES}")
+    if imbalance == 'smote':
+        X_train, y_train = SMOTE(random_state=42).fit_resample(X_train, y_train)
+        print(f"Training samples after SMOTE: {len(X_train):,}")
+    elif imbalance == 'undersample':
+        X_train, y_train = RandomUnderSampler(random_state=42).fit_resample(X_train, y_train)
+        print(f"Training samples after undersampling: {len(X_train):,}")
+    return X_train, y_train
+
+
+def fit_scaled_model(X_train: pd.DataFrame, y_train: pd.Series, imbalance: str = 'smote'):
+    """Fit the StandardScaler and LogisticRegression. Returns (scaler, model).
+
+    'class_weight' and 'sample_weight' weight the loss instead of resampling;
+    for other strategies the rows are assumed to be balanced already.
+    """
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+
+    model = LogisticRegression(max_iter=1000, random_state=42, C=0.1,
+                               class_weight='balanced' if imbalance == 'class_weight' else None)
+    sample_weight = compute_sample_weight('balanced', y_train) if imbalance == 'sample_weight' else None
+    model.fit(X_train_scaled, y_train, sample_weight=sample_weight)
+    return scaler, model
+
+
+def evaluate_model(scaler, model, X_test: pd.DataFrame, y_test: pd.Series):
+    """ROC-AUC and average precision on the held-out split."""
+    y_pred_proba = model.predict_proba(scaler.transform(X_test))[:, 1]
+    roc_auc = roc_auc_score(y_test, y_pred_proba)
+    avg_precision = average_precision_score(y_test, y_pred_proba)
+    print(f"ROC-AUC: {roc_auc:.4f}, Avg Precision: {avg_precision:.4f}")
+    return roc_auc, avg_precision
+
+
+def fit_readmission_model(X: pd.DataFrame, y: pd.Series, memory=None, imbalance: str = 'smote'):
+    """Split, balance, scale and fit. Returns (scaler, model, roc_auc, avg_precision)."""
+    X_train, X_test, y_train, y_test = split_train_test(X, y)
+
+    X_train_balanced, y_train_balanced = resample_training(X_train, y_train, imbalance)
+    if memory is not None:
+        memory.checkpoint('resample', len(X_train_balanced))
+
+    scaler, model = fit_scaled_model(X_train_balanced, y_train_balanced, imbalance)
+    if memory is not None:
+        memory.checkpoint('fit', len(X_train_balanced))
+
+    roc_auc, avg_precision = evaluate_model(scaler, model, X_test, y_test)
+    if memory is not None:
+        memory.checkpoint('evaluate', len(X_test))
+    return scaler, model, roc_auc, avg_precision
+
+
+def predict_risk(X: pd.DataFrame, scaler, model):
+    """Readmission risk on a 0-100 scale for an encoded matrix."""
+    return model.predict_proba(scaler.transform(X))[:, 1] * 100
+
+
+def risk_tier(risk_score: float) -> str:
+    """Dashboard tier name for a 0-100 risk score."""
+    for lower_bound, name in RISK_TIERS:
+        if risk_score >= lower_bound:
+            return name
+    return 'Low'
+
+
+def patient_export_frame(df_scored: pd.DataFrame) -> pd.DataFrame:
+    """Select, rename and round the columns written to patient_risks.json.
+
+    readmitted_30day is left out when df_scored has no outcome (unlabelled encounters).
+    """
+    columns = EXPORT_COLUMNS if TARGET in df_scored.columns else [col for col in EXPORT_COLUMNS if col != TARGET]
+    export_df = df_scored[columns].rename(columns={'age_numeric': 'age'})
+    export_df['risk_score'] = export_df['risk_score'].round(2)
+    export_df['estimated_cost'] = export_df['estimated_cost'].round(2)
+    return export_df
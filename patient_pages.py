@@ -0,0 +1,144 @@
+"""
+Paginated patient table export.
+
+Splits the high-risk patient table into fixed-size pages sorted by risk_score
+(highest first) so the dashboard can fetch only the rows it shows, instead of
+bundling the whole of patient_risks.json. Writes into <output_dir>/patient_pages/:
+
+  manifest.json        row count, page size, sort order and, per page, the file
+                       name, first row offset, row count, min/max risk_score
+                       and a digest of its rows
+  page-00000.json ...  the pages, in any export_formats format (records by default)
+  by_tier.json         {tier: {"count", "pages", "rows"}}; rows are global row
+  by_age_group.json    offsets into the sorted table, pages the pages they fall on
+
+A rewrite only writes the pages whose digest changed and the index or
+manifest files whose contents changed, so a refresh that moves a few patients
+touches only the pages they (and the rows shifted past them) fall on.
+
+Tiers follow modeling.RISK_TIERS; age groups follow the MemberTable filters.
+The exported risk_score is rounded to 2 decimals, so tiers are assigned from
+the unrounded scores when they are passed in (tier_scores). A patient at
+79.996 is then Very High here, as in RiskAggregate and selection.py, rather
+than Critical by the rounded 80.0.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from export_formats import FORMAT_SUFFIXES, PATIENT_PRECISION, write_patient_table, write_text_if_changed
+from modeling import RISK_TIERS
+
+PAGES_DIRNAME = 'patient_pages'
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_PAGE_SIZE = 500
+SORT_COLUMN = 'risk_score'
+
+# Lower bounds (years) for each age group, oldest first; ids match MemberTable
+AGE_GROUPS = [(70, '70plus'), (50, '50-69'), (0, 'under50')]
+
+
+def _group_labels(values: np.ndarray, groups: list) -> np.ndarray:
+    """Label each value with the first (lower_bound, name) group it reaches."""
+    conditions = [values >= lower_bound for lower_bound, _ in groups]
+    return np.select(conditions, [name for _, name in groups], default=groups[-1][1])
+
+
+def _group_index(labels: np.ndarray, names: list, page_size: int) -> dict:
+    """{name: {"count", "pages", "rows"}} over the sorted table's row offsets."""
+    index = {}
+    for name in names:
+        rows = np.flatnonzero(labels == name)
+        index[name] = {
+            'count': int(len(rows)),
+            'pages': np.unique(rows // page_size).tolist(),
+            'rows': rows.tolist(),
+        }
+    return index
+
+
+def _page_digest(page_df: pd.DataFrame, fmt: str, precision: dict) -> str:
+    """Hash of a page's rows, columns, format and rounding."""
+    digest = hashlib.sha256(json.dumps([fmt, precision, list(page_df.columns)], sort_keys=True).encode())
+    digest.update(pd.util.hash_pandas_object(page_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _previous_pages(pages_dir: Path) -> dict:
+    """{file name: digest} from the manifest of the last write, if any."""
+    manifest_path = pages_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, 'r') as f:
+        return {page['file']: page.get('digest') for page in json.load(f).get('pages', [])}
+
+
+def write_patient_pages(df: pd.DataFrame, output_dir: Path, page_size: int = DEFAULT_PAGE_SIZE,
+                        fmt: str = 'records', precision: dict = PATIENT_PRECISION,
+                        tier_scores: np.ndarray = None) -> Path:
+    """Write df as sorted pages plus manifest and indexes; returns the manifest path.
+
+    tier_scores, if given, are the unrounded risk scores of df's rows (in df's
+    order) and decide each row's tier; otherwise df's risk_score does.
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be positive")
+    if fmt not in FORMAT_SUFFIXES:
+        raise ValueError(f"unknown export format {fmt!r}; choose from {', '.join(FORMAT_SUFFIXES)}")
+
+    df = df.reset_index(drop=True)
+    order = df.sort_values(SORT_COLUMN, ascending=False, kind='stable').index.to_numpy()
+    df = df.take(order).reset_index(drop=True)
+    pages_dir = Path(output_dir) / PAGES_DIRNAME
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    previous = _previous_pages(pages_dir)
+
+    pages = []
+    for page, offset in enumerate(range(0, len(df), page_size)):
+        page_df = df.iloc[offset:offset + page_size]
+        filename = f'page-{page:05d}{FORMAT_SUFFIXES[fmt]}'
+        digest = _page_digest(page_df, fmt, precision)
+        if previous.get(filename) != digest or not (pages_dir / filename).exists():
+            write_patient_table(page_df, pages_dir, stem=f'page-{page:05d}', fmt=fmt, precision=precision)
+        pages.append({
+            'page': page,
+            'file': filename,
+            'offset': offset,
+            'rows': int(len(page_df)),
+            'risk_min': float(page_df[SORT_COLUMN].min()),
+            'risk_max': float(page_df[SORT_COLUMN].max()),
+            'digest': digest,
+        })
+    current = {page['file'] for page in pages}
+    for stale in pages_dir.glob('page-*'):
+        if stale.name not in current:
+            stale.unlink()
+
+    if tier_scores is not None:
+        risk = np.asarray(tier_scores, dtype=np.float64)[order]
+    else:
+        risk = df[SORT_COLUMN].to_numpy(dtype=np.float64)
+    indexes = {
+        'tier': ('by_tier.json', _group_index(
+            _group_labels(risk, RISK_TIERS), [name for _, name in RISK_TIERS], page_size)),
+        'age_group': ('by_age_group.json', _group_index(
+            _group_labels(df['age'].to_numpy(), AGE_GROUPS), [name for _, name in AGE_GROUPS], page_size)),
+    }
+    for filename, index in indexes.values():
+        write_text_if_changed(pages_dir / filename, json.dumps(index, separators=(',', ':')))
+
+    manifest = {
+        'rows': int(len(df)),
+        'page_size': page_size,
+        'format': fmt,
+        'sort': {'column': SORT_COLUMN, 'descending': True},
+        'columns': list(df.columns),
+        'pages': pages,
+        'indexes': {name: filename for name, (filename, _) in indexes.items()},
+    }
+    manifest_path = pages_dir / MANIFEST_NAME
+    write_text_if_changed(manifest_path, json.dumps(manifest, indent=2))
+    return manifest_path
@@ -0,0 +1,272 @@
+"""
+Persisted scored-patient store for incremental dashboard refreshes.
+
+run_analysis_v2.py rescores the whole deduplicated population and rewrites
+every export on each run. The store keeps one scored row per patient_nbr,
+together with a hash of the encounter row it was scored from and the model
+version that scored it, in patient_id order. Rows are split into partitions
+of PARTITION_ROWS patient ids (data/cache/patient_store/patients-00000.parquet,
+...), each with its own RiskAggregate (aggregates-00000.joblib, ...). A
+refresh with the same model version then:
+
+  - hashes each patient's first encounter and compares it with the store,
+  - featurizes and scores only new or changed patients; changed rows are
+    updated in place, removed ones dropped and new ones appended (new ids are
+    above every stored one), so the store never needs re-sorting,
+  - rewrites only the partitions, and rebuilds only the aggregates, that hold
+    a new, changed or removed patient, and merges the aggregates for
+    risk_summary.json,
+  - rewrites only the patient pages, page indexes and top_patients.json whose
+    contents changed (see patient_pages.py).
+
+Not everything is delta-only. Finding the changed patients still reads,
+hashes and deduplicates the whole source file (through the data_cache parquet
+cache when the CSV is unchanged) and loads every stored partition, since the
+exports rank the whole population. patient_risks.json/.bin/.columns.json.gz
+are single files, so they are rewritten in full whenever a patient who is, or
+was, at 60%+ risk changed, and left alone otherwise.
+
+A different model version (or --full) rescores everyone. Patient ids are kept
+stable across refreshes; new patients get the next free ids in encounter
+order, so a first build matches run_analysis_v2.py's numbering. Exports break
+risk_score ties in patient_id order.
+
+Usage:
+    python patient_store.py              # refresh from data/raw/diabetic_data.csv with models/latest.json
+    python patient_store.py --full       # rescore every patient
+"""
+import argparse
+import json
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from aggregation import HIGH_RISK_THRESHOLD, RiskAggregate
+from data_cache import CACHE_DIR, DATA_DIR, cached_frame
+from features import fill_missing
+from model_artifact import ModelArtifact, MODEL_DIR
+from modeling import (
+    EXPORT_COLUMNS, MODEL_COLS, READMISSION_COST, clean_encounters, dedup_patients,
+    featurize_patients, predict_risk
+)
+from run_analysis_v2 import OUTPUT_DIR, export_patient_risks, model_risk_factors, write_risk_summary
+from schema import read_uci_csv
+
+warnings.filterwarnings('ignore')
+
+STORE_DIR = CACHE_DIR / 'patient_store'
+META_FILE = 'store.json'
+
+# Bump when the stored columns, layout or hashing change; older stores are rebuilt
+STORE_VERSION = 4
+
+# Patient ids per partition file (and per partial aggregate)
+PARTITION_ROWS = 10_000
+
+KEY = 'patient_nbr'
+SCORED_COLUMNS = [col for col in EXPORT_COLUMNS if col != 'patient_id']
+STORE_COLUMNS = [KEY, 'encounter_id', 'row_hash', 'patient_id'] + SCORED_COLUMNS
+
+
+def partition_files(partition: int) -> tuple:
+    """(rows file, aggregate file) names of a partition."""
+    return f'patients-{partition:05d}.parquet', f'aggregates-{partition:05d}.joblib'
+
+
+class PatientStore:
+    """Scored patients in patient_id order, plus one RiskAggregate per partition."""
+
+    def __init__(self, patients: pd.DataFrame, aggregates: dict, model_version: str = None):
+        self.patients = patients
+        self.aggregates = aggregates
+        self.model_version = model_version
+
+    @classmethod
+    def empty(cls, model_version: str = None) -> 'PatientStore':
+        return cls(pd.DataFrame(columns=STORE_COLUMNS), {}, model_version)
+
+    @classmethod
+    def load(cls, store_dir: Path = STORE_DIR) -> 'PatientStore':
+        """The saved store, or an empty one if there is none (or it has an old layout)."""
+        meta_path = store_dir / META_FILE
+        if not meta_path.exists():
+            return cls.empty()
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('store_version') != STORE_VERSION or meta.get('partition_rows') != PARTITION_ROWS:
+            return cls.empty()
+        partitions = meta['partitions']
+        if not partitions:
+            return cls.empty(meta['model_version'])
+        # Partitions are saved in patient_id order, so concatenating them keeps it
+        patients = pd.concat([pd.read_parquet(store_dir / partition_files(partition)[0])
+                              for partition in partitions], ignore_index=True)
+        aggregates = {partition: joblib.load(store_dir / partition_files(partition)[1])
+                      for partition in partitions}
+        return cls(patients, aggregates, meta['model_version'])
+
+    def partition_bounds(self, partition: int) -> tuple:
+        """(start, stop) row positions of a partition's patients."""
+        return tuple(np.searchsorted(self.patients['patient_id'].to_numpy(),
+                                     [partition * PARTITION_ROWS + 1, (partition + 1) * PARTITION_ROWS + 1]))
+
+    def save(self, store_dir: Path = STORE_DIR, partitions=None):
+        """Write the given partitions (all of them by default) and the metadata."""
+        store_dir.mkdir(parents=True, exist_ok=True)
+        if partitions is None:
+            partitions = self.aggregates.keys()
+            for stale in list(store_dir.glob('patients*.parquet')) + list(store_dir.glob('aggregates*.joblib')):
+                stale.unlink()
+        for partition in sorted(partitions):
+            start, stop = self.partition_bounds(partition)
+            patients_file, aggregates_file = partition_files(partition)
+            if stop > start:
+                self.patients.iloc[start:stop].to_parquet(store_dir / patients_file, index=False)
+                joblib.dump(self.aggregates[partition], store_dir / aggregates_file)
+            else:
+                (store_dir / patients_file).unlink(missing_ok=True)
+                (store_dir / aggregates_file).unlink(missing_ok=True)
+        meta = {
+            'store_version': STORE_VERSION,
+            'model_version': self.model_version,
+            'partition_rows': PARTITION_ROWS,
+            'partitions': sorted(self.aggregates),
+            'patients': len(self.patients),
+        }
+        with open(store_dir / META_FILE, 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def rebuild_partitions(self, partitions):
+        """Recompute the aggregates of the given partitions from the stored rows."""
+        for partition in sorted(set(int(partition) for partition in partitions)):
+            start, stop = self.partition_bounds(partition)
+            if stop == start:
+                self.aggregates.pop(partition, None)
+                continue
+            rows = self.patients.iloc[start:stop]
+            self.aggregates[partition] = RiskAggregate()
+            self.aggregates[partition].update(
+                rows['risk_score'].to_numpy(),
+                rows['estimated_cost'].to_numpy(),
+                rows['age_numeric'].to_numpy(),
+                rows['readmitted_30day'].to_numpy()
+            )
+
+    def aggregate(self) -> RiskAggregate:
+        return RiskAggregate.combine(self.aggregates[partition] for partition in sorted(self.aggregates))
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of each raw encounter row."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def score_rows(df: pd.DataFrame, artifact: ModelArtifact) -> pd.DataFrame:
+    """Featurize and score deduplicated encounters; returns the SCORED_COLUMNS."""
+    df_model = fill_missing(featurize_patients(df)[MODEL_COLS], medians=artifact.encoder.medians)
+    X = artifact.encoder.transform(df_model)
+    df_model['risk_score'] = predict_risk(X, artifact.scaler, artifact.model)
+    df_model['estimated_cost'] = (df_model['risk_score'] / 100) * READMISSION_COST
+    return df_model[SCORED_COLUMNS]
+
+
+def refresh(source: Path, artifact: ModelArtifact, store_dir: Path = STORE_DIR, full: bool = False) -> dict:
+    """Bring the store and the patient exports up to date with source; returns the change counts."""
+    store = PatientStore.load(store_dir)
+    rebuilt = full or store.model_version != artifact.version or not len(store.patients)
+    if rebuilt:
+        store = PatientStore.empty(artifact.version)
+
+    df = dedup_patients(clean_encounters(cached_frame(source, read_uci_csv)))
+    hashes = row_hashes(df)
+    old = store.patients
+    position = pd.Index(old[KEY]).get_indexer(df[KEY])
+    known = position >= 0
+    changed = ~known
+    changed[known] = old['row_hash'].to_numpy()[position[known]] != hashes[known]
+    removed = ~old[KEY].isin(df[KEY]).to_numpy()
+    updated = known & changed
+
+    start = time.perf_counter()
+    fresh = df[changed]
+    scored = score_rows(fresh, artifact) if len(fresh) else pd.DataFrame(columns=SCORED_COLUMNS)
+    scored.insert(0, KEY, fresh[KEY].to_numpy())
+    scored.insert(1, 'encounter_id', fresh['encounter_id'].to_numpy())
+    scored.insert(2, 'row_hash', hashes[changed])
+    # Changed patients keep their id; new ones take the next free ids in encounter order
+    ids = np.empty(len(scored), dtype=np.int64)
+    ids[updated[changed]] = old['patient_id'].to_numpy()[position[updated]]
+    next_id = int(old['patient_id'].max()) + 1 if len(old) else 1
+    ids[~updated[changed]] = np.arange(next_id, next_id + int((~known).sum()))
+    scored.insert(3, 'patient_id', ids)
+    score_seconds = time.perf_counter() - start
+
+    leaving_risk = old['risk_score'].to_numpy()[np.concatenate([position[updated], np.flatnonzero(removed)])]
+    dirty = np.concatenate([ids, old['patient_id'].to_numpy()[removed]])
+    # Update changed rows where they are, drop removed ones and append new ones;
+    # new ids are above every stored one, so patient_id order is kept
+    patients = old.copy()
+    in_place = scored[updated[changed]]
+    for col in STORE_COLUMNS:
+        if col != 'patient_id' and len(in_place):
+            patients.iloc[position[updated], patients.columns.get_loc(col)] = in_place[col].to_numpy()
+    patients = patients[~removed]
+    appended = scored[~updated[changed]]
+    if len(patients) and len(appended):
+        patients = pd.concat([patients, appended], ignore_index=True)
+    else:
+        patients = (patients if len(patients) else appended).reset_index(drop=True)
+    store.patients = patients
+
+    partitions = np.unique((dirty - 1) // PARTITION_ROWS)
+    store.rebuild_partitions(partitions)
+    store.save(store_dir, partitions=None if rebuilt else partitions)
+
+    tables_touched = bool(
+        (leaving_risk >= HIGH_RISK_THRESHOLD).any()
+        or (scored['risk_score'] >= HIGH_RISK_THRESHOLD).any()
+    )
+    write_tables = rebuilt or tables_touched or not (OUTPUT_DIR / 'patient_risks.json').exists()
+    export_patient_risks(store.patients, write_tables=write_tables)
+
+    # Same fields as summarize_risk(), from the merged bucket aggregates
+    write_risk_summary(store.aggregate().summary(
+        model_auc=artifact.metrics.get('roc_auc'),
+        risk_factors=model_risk_factors(artifact.feature_cols, artifact.model)
+    ))
+    return {
+        'patients': len(store.patients),
+        'new': int((~known).sum()),
+        'changed': int((known & changed).sum()),
+        'removed': int(removed.sum()),
+        'score_seconds': score_seconds,
+        'partitions_written': len(store.aggregates) if rebuilt else len(partitions),
+        'tables_rewritten': write_tables,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the patient exports, scoring only new or changed patients.")
+    parser.add_argument('--input', type=Path, default=DATA_DIR / 'diabetic_data.csv')
+    parser.add_argument('--model', type=Path, default=None, help='artifact path (default: models/latest.json)')
+    parser.add_argument('--store-dir', type=Path, default=STORE_DIR)
+    parser.add_argument('--full', action='store_true', help='rescore every patient')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("INCREMENTAL PATIENT REFRESH")
+    print("=" * 60)
+    start = time.perf_counter()
+    artifact = ModelArtifact.load(args.model, MODEL_DIR)
+    print(f"Model version: {artifact.version}")
+    changes = refresh(args.input, artifact, args.store_dir, args.full)
+    print(f"\n{changes['patients']:,} patients: {changes['new']:,} new, {changes['changed']:,} changed, "
+          f"{changes['removed']:,} removed (scored in {changes['score_seconds']:.2f}s)")
+    print(f"Store partitions written: {changes['partitions_written']}")
+    if not changes['tables_rewritten']:
+        print("No high-risk patient changed; patient_risks tables left as they are")
+    print(f"Refresh took {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,191 @@
+"""
+The run_analysis_v2.py dashboard refresh as cached stages (see stages.py).
+
+    load -> clean -> dedup -> featurize -> split -> resample -> fit -> score -> aggregate -> export
+    state_data
+    verify (always runs; after export and state_data)
+
+Each stage's result is cached under data/cache/stages/ and reused while its
+inputs and code are unchanged, so editing e.g. the export formats only re-runs
+export, and a changed diabetic_data.csv re-runs the modeling chain but not
+state_data.
+
+With --jobs N the independent BRANCHES run in N worker processes, each
+logging to logs/<branch>.log, and verify runs once they have all finished.
+
+Usage:
+    python pipeline.py                     # run everything that is out of date
+    python pipeline.py --force fit         # re-run fit (and whatever its output changes)
+    python pipeline.py --force all
+    python pipeline.py --target export     # only the stages export needs
+    python pipeline.py --list
+    python pipeline.py --jobs 2            # patient modeling and state data in parallel
+"""
+import argparse
+import time
+
+import aggregation
+import export_formats
+import features
+import geo
+import hospital_exports
+import model_artifact
+import modeling
+import patient_pages
+import schema
+import selection
+import state_synthesis
+from features import fill_missing
+from modeling import (
+    MODEL_COLS, clean_encounters, dedup_patients, featurize_patients, encode_features,
+    split_train_test, resample_training, fit_scaled_model, evaluate_model
+)
+from model_artifact import MODEL_DIR
+from run_analysis_v2 import (
+    DATA_DIR, OUTPUT_DIR, save_model_artifact, score_patients, export_patient_risks,
+    summarize_risk, model_risk_factors, write_risk_summary, generate_complete_state_data,
+    verify_exports
+)
+from schema import frame_memory_mb, read_uci_csv
+from stages import Pipeline, Stage, print_branch_report, print_run_report, run_branches
+
+UCI_SOURCE = DATA_DIR / 'diabetic_data.csv'
+
+# Independent parts of the refresh (they share no stages), run concurrently
+# with --jobs; another dataset's modeling chain would be one more entry here
+BRANCHES = {
+    'patients': ['export'],
+    'state_data': ['state_data'],
+}
+
+
+def load_stage(source):
+    df = read_uci_csv(source)
+    print(f"Loaded {len(df):,} records ({frame_memory_mb(df):.1f} MB in memory)")
+    return df
+
+
+def featurize_stage(df):
+    """(df_model, X, y, encoder) for the deduplicated encounters."""
+    df_model = fill_missing(featurize_patients(df)[MODEL_COLS])
+    X, y, encoder = encode_features(df_model)
+    return df_model, X, y, encoder
+
+
+def split_stage(featurized):
+    _, X, y, _ = featurized
+    return split_train_test(X, y)
+
+
+def resample_stage(split):
+    X_train, _, y_train, _ = split
+    return resample_training(X_train, y_train)
+
+
+def fit_stage(resampled, split):
+    """(scaler, model, roc_auc, avg_precision)."""
+    scaler, model = fit_scaled_model(*resampled)
+    _, X_test, _, y_test = split
+    roc_auc, avg_precision = evaluate_model(scaler, model, X_test, y_test)
+    return scaler, model, roc_auc, avg_precision
+
+
+def score_stage(featurized, fitted):
+    df_model, X, _, _ = featurized
+    scaler, model, _, _ = fitted
+    # The featurize result may be reused by later stages, so score a copy
+    return score_patients(df_model.copy(), X, scaler, model)
+
+
+def aggregate_stage(scored, featurized, fitted):
+    _, _, _, encoder = featurized
+    _, model, roc_auc, _ = fitted
+    return summarize_risk(scored, encoder.feature_cols, model, roc_auc)
+
+
+def export_stage(scored, risk_summary, featurized, fitted):
+    _, X, _, encoder = featurized
+    save_model_artifact(encoder, *fitted, X)
+    export_patient_risks(scored)
+    write_risk_summary(risk_summary)
+
+
+def state_data_stage():
+    generate_complete_state_data()
+
+
+def verify_stage(*_):
+    verify_exports()
+
+
+def build_pipeline() -> Pipeline:
+    patient_outputs = [
+        OUTPUT_DIR / f'patient_risks{suffix}'
+        for suffix in export_formats.FORMAT_SUFFIXES.values()
+    ] + [
+        OUTPUT_DIR / patient_pages.PAGES_DIRNAME / patient_pages.MANIFEST_NAME,
+        OUTPUT_DIR / 'risk_summary.json',
+        OUTPUT_DIR / 'top_patients.json',
+        MODEL_DIR / model_artifact.LATEST_POINTER,
+    ]
+    return Pipeline([
+        Stage('load', load_stage, sources=[UCI_SOURCE], code=[schema]),
+        Stage('clean', clean_encounters, deps=['load'], code=[modeling.add_target]),
+        Stage('dedup', dedup_patients, deps=['clean'], code=[modeling.first_encounter_positions]),
+        Stage('featurize', featurize_stage, deps=['dedup'], code=[features, modeling]),
+        Stage('split', split_stage, deps=['featurize'], code=[split_train_test]),
+        Stage('resample', resample_stage, deps=['split'], code=[resample_training]),
+        Stage('fit', fit_stage, deps=['resample', 'split'], code=[fit_scaled_model, evaluate_model]),
+        Stage('score', score_stage, deps=['featurize', 'fit'], code=[score_patients, modeling.predict_risk]),
+        Stage('aggregate', aggregate_stage, deps=['score', 'featurize', 'fit'],
+              code=[summarize_risk, model_risk_factors, aggregation]),
+        Stage('export', export_stage, deps=['score', 'aggregate', 'featurize', 'fit'],
+              outputs=patient_outputs,
+              code=[save_model_artifact, export_patient_risks, write_risk_summary,
+                    modeling.patient_export_frame, export_formats, patient_pages, model_artifact, selection]),
+        Stage('state_data', state_data_stage,
+              outputs=[OUTPUT_DIR / 'state_summary.json', OUTPUT_DIR / 'hospital_metrics.json',
+                       OUTPUT_DIR / geo.GEO_DIRNAME / geo.MANIFEST_NAME],
+              code=[generate_complete_state_data, state_synthesis, hospital_exports, geo]),
+        Stage('verify', verify_stage, deps=['export', 'state_data'], code=[verify_exports], cache=False),
+    ])
+
+
+if __name__ == "__main__":
+    pipeline = build_pipeline()
+    parser = argparse.ArgumentParser(description="Refresh the dashboard data, skipping unchanged stages.")
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE',
+                        help=f"re-run these stages even if cached ('all' or {', '.join(pipeline.stages)})")
+    parser.add_argument('--target', nargs='+', default=None, metavar='STAGE',
+                        help='only bring these stages (and what they need) up to date')
+    parser.add_argument('--list', action='store_true', help='list the stages and exit')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='run the independent branches in this many worker processes')
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in pipeline.stages.values():
+            print(f"{stage.name:<12} <- {', '.join(stage.deps) or '-'}")
+        raise SystemExit
+
+    unknown = [name for name in args.force + (args.target or []) if name not in pipeline.stages and name != 'all']
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    force = list(pipeline.stages) if 'all' in args.force else args.force
+
+    if args.jobs is None:
+        print_run_report(pipeline.run(args.target, force))
+        raise SystemExit
+
+    start = time.perf_counter()
+    wanted = pipeline.upstream(args.target) if args.target else set(pipeline.stages)
+    branches = {name: targets for name, targets in BRANCHES.items() if set(targets) <= wanted}
+    results = run_branches(build_pipeline, branches, args.jobs, force)
+
+    # Whatever is left (verify) runs here; branch stages are cached by now
+    done = pipeline.upstream([target for targets in branches.values() for target in targets])
+    report = [row for _, branch_report, _, _ in results for row in branch_report]
+    report += [row for row in pipeline.run(args.target, [name for name in force if name not in done])
+               if row[0] not in done]
+    print_branch_report(results, time.perf_counter() - start)
+    print_run_report(report)
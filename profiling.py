@@ -0,0 +1,164 @@
+"""
+Lightweight per-stage resource reporting for the analysis pipeline.
+
+A StageReport is checkpointed after each pipeline stage and records the wall
+and CPU time since the previous checkpoint, the stage's row count, the
+process's resident set size (RSS) at that point and its peak RSS so far.
+Peak RSS is a process-lifetime high-water mark, so a stage "raised" the peak
+when the value grew between two checkpoints.
+
+write_profile() saves the reports of a run as JSON and CSV under
+logs/profiles/ (one row per stage, tagged with the git commit) so runs can be
+compared across releases. profiled() wraps a run in cProfile and writes a
+.prof file for snakeviz / flameprof flame graphs plus a text summary.
+"""
+import contextlib
+import cProfile
+import csv
+import json
+import platform
+import pstats
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROFILE_DIR = Path(__file__).parent / 'logs' / 'profiles'
+PROFILE_FIELDS = ['report', 'stage', 'rows', 'wall_seconds', 'cpu_seconds', 'rss_mb', 'peak_rss_mb']
+
+
+def _rss_from_psutil():
+    """(current, peak) RSS in bytes via psutil, or (None, None) if unavailable."""
+    try:
+        import psutil
+    except ImportError:
+        return None, None
+    info = psutil.Process().memory_info()
+    return info.rss, getattr(info, 'peak_wset', None)
+
+
+def current_rss_mb():
+    """Current resident set size in MB, or None if it cannot be read."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        import resource
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ImportError):
+        rss, _ = _rss_from_psutil()
+        return rss / (1024 * 1024) if rss is not None else None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if it cannot be read."""
+    try:
+        import resource
+    except ImportError:
+        _, peak = _rss_from_psutil()
+        return peak / (1024 * 1024) if peak is not None else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageReport:
+    """Collects RSS checkpoints for named pipeline stages."""
+
+    def __init__(self, title: str):
+        self.title = title
+        self.stages = []
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def checkpoint(self, stage: str, rows: int = None):
+        """Record the time since the last checkpoint and the resource state at the end of stage."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        rss, peak = current_rss_mb(), peak_rss_mb()
+        if rss is not None and peak is not None:
+            # The two readings come from different sources; keep them consistent
+            peak = max(peak, rss)
+        self.stages.append({
+            'stage': stage,
+            'rows': rows,
+            'wall_seconds': wall - self._wall,
+            'cpu_seconds': cpu - self._cpu,
+            'rss_mb': rss,
+            'peak_rss_mb': peak,
+        })
+        self._wall, self._cpu = wall, cpu
+
+    def print_report(self):
+        """Print one line per stage with its wall/CPU time and the current and peak RSS."""
+        print(f"\n{self.title} - time and memory by stage")
+        print(f"  {'stage':<16} {'rows':>12} {'wall s':>8} {'cpu s':>8} {'rss MB':>10} {'peak MB':>10}")
+        previous_peak = None
+        for entry in self.stages:
+            rows = f"{entry['rows']:,}" if entry['rows'] is not None else '-'
+            rss = f"{entry['rss_mb']:.1f}" if entry['rss_mb'] is not None else 'n/a'
+            peak = f"{entry['peak_rss_mb']:.1f}" if entry['peak_rss_mb'] is not None else 'n/a'
+            raised = (previous_peak is not None and entry['peak_rss_mb'] is not None
+                      and entry['peak_rss_mb'] > previous_peak)
+            print(f"  {entry['stage']:<16} {rows:>12} {entry['wall_seconds']:>8.2f} {entry['cpu_seconds']:>8.2f} "
+                  f"{rss:>10} {peak:>10}{'  *' if raised else ''}")
+            previous_peak = entry['peak_rss_mb']
+        print("  (* = stage raised the peak)")
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout."""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def write_profile(reports: list, name: str, output_dir: Path = PROFILE_DIR):
+    """Write the stages of reports to <name>-<timestamp>.json and .csv; returns both paths."""
+    created_at = datetime.now(timezone.utc)
+    rows = [{'report': report.title, **entry} for report in reports for entry in report.stages]
+    profile = {
+        'name': name,
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'total_wall_seconds': sum(row['wall_seconds'] for row in rows),
+        'total_cpu_seconds': sum(row['cpu_seconds'] for row in rows),
+        'peak_rss_mb': max((row['peak_rss_mb'] for row in rows if row['peak_rss_mb'] is not None), default=None),
+        'stages': rows,
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{name}-{created_at.strftime('%Y%m%d-%H%M%S')}"
+    json_path = output_dir / f"{stem}.json"
+    with open(json_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    csv_path = output_dir / f"{stem}.csv"
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return json_path, csv_path
+
+
+@contextlib.contextmanager
+def profiled(name: str, output_dir: Path = PROFILE_DIR, enabled: bool = True, top: int = 25):
+    """Run the block under cProfile and write <name>.prof plus the top functions to <name>.txt."""
+    if not enabled:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        prof_path = output_dir / f"{name}.prof"
+        profiler.dump_stats(prof_path)
+        with open(output_dir / f"{name}.txt", 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(top)
+        print(f"cProfile written to {prof_path} (view with: snakeviz {prof_path})")
@@ -2,15 +2,23 @@
 Run data analysis and generate JSON files for dashboard.
 This script executes the analysis from the Jupyter notebooks.
 """
+import argparse
 import pandas as pd
 import numpy as np
 import json
 from pathlib import Path
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import roc_auc_score, average_precision_score
-from imblearn.over_sampling import SMOTE
+from features import fill_missing
+from modeling import (
+    IMBALANCE_STRATEGIES, MODEL_COLS, READMISSION_COST, prepare_patients, encode_features,
+    fit_readmission_model, predict_risk, patient_export_frame
+)
+from model_artifact import ModelArtifact
+from profiling import StageReport, profiled, write_profile
+from schema import frame_memory_mb
+from selection import Cut, select_rows
+from data_cache import load_uci_encounters, load_hospital_readmissions
+from hospital_exports import hospital_records, state_records
+from verify_exports import print_checks, verify_output_dir
 import warnings
 
 warnings.filterwarnings('ignore')
@@ -21,135 +29,60 @@ DATA_DIR = Path(__file__).parent / 'data' / 'raw'
 OUTPUT_DIR = Path(__file__).parent / 'data' / 'processed'
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-def run_patient_modeling():
-    """Run patient risk modeling and generate JSON exports."""
+def run_patient_modeling(imbalance: str = 'smote', memory: StageReport = None):
+    """Run patient risk modeling and generate JSON exports.
+
+    imbalance picks how the training split is balanced (modeling.IMBALANCE_STRATEGIES);
+    stage timings and memory go to memory (a new StageReport by default).
+    """
     print("=" * 60)
     print("PATIENT RISK MODELING")
     print("=" * 60)
 
-    # Load data
-    df = pd.read_csv(DATA_DIR / 'diabetic_data.csv')
-    print(f"Loaded {len(df):,} records")
-
-    # Replace '?' with NaN
-    df = df.replace('?', np.nan)
-
-    # Create binary target
-    df['readmitted_30day'] = (df['readmitted'] == '<30').astype(int)
-    print(f"30-day readmission rate: {df['readmitted_30day'].mean()*100:.2f}%")
+    memory = memory or StageReport("PATIENT RISK MODELING")
 
-    # Deduplicate patients (keep first encounter)
-    df = df.sort_values('encounter_id').drop_duplicates(subset=['patient_nbr'], keep='first')
-    print(f"After deduplication: {len(df):,} patients")
+    # Load data ('?' already converted to NaN; served from data/cache when unchanged)
+    df = load_uci_encounters(DATA_DIR)
+    print(f"Loaded {len(df):,} records ({frame_memory_mb(df):.1f} MB in memory)")
+    memory.checkpoint('load', len(df))
 
-    # Drop identifiers
-    df = df.drop(columns=['encounter_id', 'patient_nbr'])
-
-    # Feature engineering
-    high_missing_cols = ['weight', 'payer_code', 'medical_specialty']
-    df = df.drop(columns=high_missing_cols)
-
-    age_mapping = {
-        '[0-10)': 5, '[10-20)': 15, '[20-30)': 25, '[30-40)': 35,
-        '[40-50)': 45, '[50-60)': 55, '[60-70)': 65, '[70-80)': 75,
-        '[80-90)': 85, '[90-100)': 95
-    }
-    df['age_numeric'] = df['age'].map(age_mapping)
-
-    df['total_visits'] = df['number_outpatient'] + df['number_emergency'] + df['number_inpatient']
-    df['medication_intensity'] = df['num_medications'] / (df['time_in_hospital'] + 1)
-
-    med_cols = ['metformin', 'repaglinide', 'nateglinide', 'chlorpropamide',
-                'glimepiride', 'acetohexamide', 'glipizide', 'glyburide',
-                'tolbutamide', 'pioglitazone', 'rosiglitazone', 'acarbose',
-                'miglitol', 'troglitazone', 'tolazamide', 'insulin',
-                'glyburide-metformin', 'glipizide-metformin']
-
-    def count_med_changes(row):
-        return sum(1 for col in med_cols if col in row.index and row[col] in ['Up', 'Down'])
-
-    df['num_med_changes'] = df.apply(count_med_changes, axis=1)
-    df['A1Cresult_abnormal'] = df['A1Cresult'].apply(lambda x: 1 if x in ['>7', '>8'] else 0)
+    df = prepare_patients(df, memory)
 
     # Feature selection
-    numeric_features = [
-        'time_in_hospital', 'num_lab_procedures', 'num_procedures',
-        'num_medications', 'number_outpatient', 'number_emergency',
-        'number_inpatient', 'number_diagnoses', 'age_numeric',
-        'total_visits', 'medication_intensity', 'num_med_changes'
-    ]
-
-    categorical_features = [
-        'race', 'gender', 'admission_type_id', 'discharge_disposition_id',
-        'admission_source_id', 'diabetesMed', 'change', 'A1Cresult_abnormal'
-    ]
-
-    keep_cols = numeric_features + categorical_features + ['readmitted_30day']
-    df_model = df[keep_cols].copy()
+    df_model = df[MODEL_COLS]
+    del df
 
     # Handle missing values
-    for col in numeric_features:
-        if df_model[col].isnull().any():
-            df_model[col] = df_model[col].fillna(df_model[col].median())
-
-    for col in categorical_features:
-        if df_model[col].isnull().any():
-            df_model[col] = df_model[col].fillna('Unknown')
+    df_model = fill_missing(df_model)
 
     # One-hot encode
-    df_encoded = pd.get_dummies(df_model, columns=categorical_features, drop_first=True)
-
-    feature_cols = [col for col in df_encoded.columns if col != 'readmitted_30day']
-    X = df_encoded[feature_cols]
-    y = df_encoded['readmitted_30day']
-
-    # Train-test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-
-    # SMOTE
-    smote = SMOTE(random_state=42)
-    X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
-    print(f"Training samples after SMOTE: {len(X_train_balanced):,}")
-
-    # Scale and train
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train_balanced)
-    X_test_scaled = scaler.transform(X_test)
+    X, y, encoder = encode_features(df_model)
+    memory.checkpoint('encode', len(X))
 
-    model = LogisticRegression(max_iter=1000, random_state=42, C=0.1)
-    model.fit(X_train_scaled, y_train_balanced)
+    scaler, model, roc_auc, avg_precision = fit_readmission_model(X, y, memory, imbalance)
 
-    # Evaluate
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
-    avg_precision = average_precision_score(y_test, y_pred_proba)
-    print(f"ROC-AUC: {roc_auc:.4f}, Avg Precision: {avg_precision:.4f}")
+    # Persist the fitted pipeline so score.py can re-score without retraining;
+    # the compiled NumPy scorer is checked against sklearn on X before saving
+    artifact = ModelArtifact(encoder, scaler, model,
+                             {'roc_auc': float(roc_auc), 'avg_precision': float(avg_precision)})
+    print(f"Saved model artifact: {artifact.save(parity_sample=X).name}")
+    memory.checkpoint('artifact', len(X))
 
     # Score all patients
-    X_all_scaled = scaler.transform(X)
-    all_risk_scores = model.predict_proba(X_all_scaled)[:, 1] * 100
+    all_risk_scores = predict_risk(X, scaler, model)
 
-    df_scored = df_model.copy()
+    # df_model is not used past this point, so score it in place rather than copying
+    df_scored = df_model
     df_scored['risk_score'] = all_risk_scores
-    df_scored['estimated_cost'] = (df_scored['risk_score'] / 100) * 15000
+    df_scored['estimated_cost'] = (df_scored['risk_score'] / 100) * READMISSION_COST
     df_scored['patient_id'] = range(1, len(df_scored) + 1)
+    memory.checkpoint('score', len(df_scored))
 
-    # Export top 1000 high-risk patients
-    df_high_risk = df_scored.nlargest(1000, 'risk_score')
+    # Export top 1000 high-risk patients (partitioned; only those 1000 are sorted)
+    top = select_rows(df_scored['risk_score'].to_numpy(), [Cut('top', top=1000)])['top']
+    df_high_risk = df_scored.take(top)
 
-    export_columns = [
-        'patient_id', 'age_numeric', 'time_in_hospital', 'num_medications',
-        'number_diagnoses', 'number_inpatient', 'number_emergency',
-        'total_visits', 'num_med_changes', 'risk_score', 'estimated_cost',
-        'readmitted_30day'
-    ]
-
-    export_df = df_high_risk[export_columns].copy()
-    export_df = export_df.rename(columns={'age_numeric': 'age'})
-    export_df['risk_score'] = export_df['risk_score'].round(2)
-    export_df['estimated_cost'] = export_df['estimated_cost'].round(2)
+    export_df = patient_export_frame(df_high_risk)
 
     patient_risks = export_df.to_dict('records')
 
@@ -183,17 +116,21 @@ def run_patient_modeling():
     with open(OUTPUT_DIR / 'risk_summary.json', 'w') as f:
         json.dump(risk_summary, f, indent=2)
     print(f"Exported risk_summary.json")
+    memory.checkpoint('export', len(df_scored))
+    memory.print_report()
 
     return roc_auc
 
-def run_hospital_analytics():
+def run_hospital_analytics(memory: StageReport = None):
     """Run hospital analytics and generate JSON exports."""
     print("\n" + "=" * 60)
     print("HOSPITAL & GEOGRAPHIC ANALYTICS")
     print("=" * 60)
 
-    df_hosp = pd.read_csv(DATA_DIR / 'hospital_readmissions.csv')
+    memory = memory or StageReport("HOSPITAL ANALYTICS")
+    df_hosp = load_hospital_readmissions(DATA_DIR)
     print(f"Loaded {len(df_hosp):,} hospital records")
+    memory.checkpoint('load', len(df_hosp))
 
     # Detect and map columns
     column_mappings = {
@@ -299,81 +236,57 @@ def run_hospital_analytics():
     else:
         state_summary['total_penalty_estimate'] = 0
 
+    memory.checkpoint('aggregate', len(df_hosp))
+
     # Export state summary
-    state_data = []
-    for _, row in state_summary.iterrows():
-        state_code = row['state']
-        coords = STATE_COORDS.get(state_code, {'lat': 0, 'lng': 0, 'name': state_code})
-        state_entry = {
-            'state': state_code,
-            'name': coords['name'],
-            'lat': coords['lat'],
-            'lng': coords['lng'],
-            'hospital_count': int(row['hospital_count']),
-            'avg_readmission_rate': round(float(row.get('avg_readmission_rate', 0) or 0), 2),
-            'total_penalty_estimate': round(float(row.get('total_penalty_estimate', 0) or 0), 0)
-        }
-        state_data.append(state_entry)
+    state_data = state_records(state_summary, STATE_COORDS)
 
     with open(OUTPUT_DIR / 'state_summary.json', 'w') as f:
         json.dump(state_data, f, indent=2)
     print(f"Exported state_summary.json ({len(state_data)} states)")
+    memory.checkpoint('state_summary', len(state_data))
 
-    # Export hospital metrics
-    if 'readmission_rate' in df_hosp.columns:
-        df_hosp_clean = df_hosp.dropna(subset=['readmission_rate'])
-        df_top_hospitals = df_hosp_clean.nlargest(500, 'readmission_rate')
-    else:
-        df_top_hospitals = df_hosp.head(500)
-
-    hospital_data = []
-    for _, row in df_top_hospitals.iterrows():
-        hospital_entry = {
-            'name': str(row.get('hospital_name', 'Unknown')),
-            'state': str(row.get('state', 'Unknown')),
-            'city': str(row.get('city', 'Unknown')) if pd.notna(row.get('city')) else 'Unknown',
-            'readmission_rate': round(float(row.get('readmission_rate', 0) or 0), 2),
-            'penalty_pct': round(float(row.get('penalty_pct', 0) or 0), 2)
-        }
-        hospital_data.append(hospital_entry)
+    # Export hospital metrics (every hospital/measure with a rate, highest first)
+    hospital_data = hospital_records(df_hosp)
 
     with open(OUTPUT_DIR / 'hospital_metrics.json', 'w') as f:
         json.dump(hospital_data, f, indent=2)
     print(f"Exported hospital_metrics.json ({len(hospital_data)} hospitals)")
+    memory.checkpoint('hospital_metrics', len(hospital_data))
+    memory.print_report()
 
 def verify_exports():
-    """Verify all exported files."""
+    """Verify all exported files (streamed and checked against their schemas)."""
     print("\n" + "=" * 60)
     print("VERIFICATION")
     print("=" * 60)
 
-    export_files = [
-        'patient_risks.json',
-        'risk_summary.json',
-        'state_summary.json',
-        'hospital_metrics.json'
-    ]
-
-    for filename in export_files:
-        filepath = OUTPUT_DIR / filename
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                print(f"  {filename}: {len(data)} records")
-            else:
-                print(f"  {filename}: {len(data.keys())} keys")
-        else:
-            print(f"  {filename}: NOT FOUND")
+    print_checks(verify_output_dir(OUTPUT_DIR))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the readmission model and export the dashboard data.")
+    parser.add_argument('--imbalance', choices=IMBALANCE_STRATEGIES, default='smote',
+                        help='how the training split is balanced (see benchmarks/bench_imbalance.py)')
+    parser.add_argument('--profile', action='store_true',
+                        help='write a per-stage JSON/CSV profile to logs/profiles/')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='also run under cProfile and dump a .prof file there')
+    args = parser.parse_args()
+
     print("\n" + "=" * 60)
     print("READMITRISK DATA ANALYSIS")
     print("=" * 60 + "\n")
 
-    run_patient_modeling()
-    run_hospital_analytics()
-    verify_exports()
+    # Each report times its stages from when it is created
+    with profiled('run_analysis', enabled=args.cprofile):
+        modeling_report = StageReport("PATIENT RISK MODELING")
+        run_patient_modeling(args.imbalance, modeling_report)
+        hospital_report = StageReport("HOSPITAL ANALYTICS")
+        run_hospital_analytics(hospital_report)
+        verify_exports()
+    if args.profile or args.cprofile:
+        paths = write_profile([modeling_report, hospital_report], 'run_analysis')
+        print(f"\nProfile written to {paths[0]} and {paths[1].name}")
 
     print("\n" + "=" * 60)
     print("ANALYSIS COMPLETE - DATA READY FOR DASHBOARD")
@@ -4,15 +4,28 @@ Run data analysis and generate JSON files for dashboard - IMPROVED VERSION
 - Exports all high-risk patients (60%+ risk)
 - Generates complete 50-state data with realistic values
 """
+import argparse
 import pandas as pd
 import numpy as np
 import json
 from pathlib import Path
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import roc_auc_score, average_precision_score
-from imblearn.over_sampling import SMOTE
+from features import NUMERIC_FEATURES, fill_missing
+from modeling import (
+    IMBALANCE_STRATEGIES, MODEL_COLS, READMISSION_COST, prepare_patients, encode_features,
+    fit_readmission_model, predict_risk, patient_export_frame
+)
+from model_artifact import ModelArtifact
+from export_formats import write_patient_table, write_text_if_changed
+from patient_pages import write_patient_pages
+from aggregation import HIGH_RISK_THRESHOLD, RiskAggregate
+from geo import write_geo_exports
+from hospital_exports import hospital_records
+from state_synthesis import synthetic_state_data
+from profiling import StageReport, profiled, write_profile
+from selection import Cut, frame_codes, select_rows
+from schema import frame_memory_mb
+from data_cache import load_uci_encounters
+from verify_exports import print_checks, verify_output_dir
 import warnings
 
 warnings.filterwarnings('ignore')
@@ -23,169 +36,69 @@ DATA_DIR = Path(__file__).parent / 'data' / 'raw'
 OUTPUT_DIR = Path(__file__).parent / 'data' / 'processed'
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-def run_patient_modeling():
-    """Run patient risk modeling and generate JSON exports."""
-    print("=" * 60)
-    print("PATIENT RISK MODELING (IMPROVED)")
-    print("=" * 60)
-
-    # Load data
-    df = pd.read_csv(DATA_DIR / 'diabetic_data.csv')
-    print(f"Loaded {len(df):,} records")
-
-    # Replace '?' with NaN
-    df = df.replace('?', np.nan)
-
-    # Create binary target
-    df['readmitted_30day'] = (df['readmitted'] == '<30').astype(int)
-    print(f"30-day readmission rate: {df['readmitted_30day'].mean()*100:.2f}%")
-
-    # Deduplicate patients (keep first encounter)
-    df = df.sort_values('encounter_id').drop_duplicates(subset=['patient_nbr'], keep='first')
-    print(f"After deduplication: {len(df):,} patients")
-
-    # Drop identifiers
-    df = df.drop(columns=['encounter_id', 'patient_nbr'])
-
-    # Feature engineering
-    high_missing_cols = ['weight', 'payer_code', 'medical_specialty']
-    df = df.drop(columns=high_missing_cols)
-
-    age_mapping = {
-        '[0-10)': 5, '[10-20)': 15, '[20-30)': 25, '[30-40)': 35,
-        '[40-50)': 45, '[50-60)': 55, '[60-70)': 65, '[70-80)': 75,
-        '[80-90)': 85, '[90-100)': 95
-    }
-    df['age_numeric'] = df['age'].map(age_mapping)
-
-    df['total_visits'] = df['number_outpatient'] + df['number_emergency'] + df['number_inpatient']
-    df['medication_intensity'] = df['num_medications'] / (df['time_in_hospital'] + 1)
-
-    med_cols = ['metformin', 'repaglinide', 'nateglinide', 'chlorpropamide',
-                'glimepiride', 'acetohexamide', 'glipizide', 'glyburide',
-                'tolbutamide', 'pioglitazone', 'rosiglitazone', 'acarbose',
-                'miglitol', 'troglitazone', 'tolazamide', 'insulin',
-                'glyburide-metformin', 'glipizide-metformin']
-
-    def count_med_changes(row):
-        return sum(1 for col in med_cols if col in row.index and row[col] in ['Up', 'Down'])
-
-    df['num_med_changes'] = df.apply(count_med_changes, axis=1)
-    df['A1Cresult_abnormal'] = df['A1Cresult'].apply(lambda x: 1 if x in ['>7', '>8'] else 0)
-
-    # Feature selection
-    numeric_features = [
-        'time_in_hospital', 'num_lab_procedures', 'num_procedures',
-        'num_medications', 'number_outpatient', 'number_emergency',
-        'number_inpatient', 'number_diagnoses', 'age_numeric',
-        'total_visits', 'medication_intensity', 'num_med_changes'
-    ]
-
-    categorical_features = [
-        'race', 'gender', 'admission_type_id', 'discharge_disposition_id',
-        'admission_source_id', 'diabetesMed', 'change', 'A1Cresult_abnormal'
-    ]
-
-    keep_cols = numeric_features + categorical_features + ['readmitted_30day']
-    df_model = df[keep_cols].copy()
-
-    # Handle missing values
-    for col in numeric_features:
-        if df_model[col].isnull().any():
-            df_model[col] = df_model[col].fillna(df_model[col].median())
-
-    for col in categorical_features:
-        if df_model[col].isnull().any():
-            df_model[col] = df_model[col].fillna('Unknown')
-
-    # One-hot encode
-    df_encoded = pd.get_dummies(df_model, columns=categorical_features, drop_first=True)
-
-    feature_cols = [col for col in df_encoded.columns if col != 'readmitted_30day']
-    X = df_encoded[feature_cols]
-    y = df_encoded['readmitted_30day']
-
-    # Train-test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-
-    # SMOTE
-    smote = SMOTE(random_state=42)
-    X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
-    print(f"Training samples after SMOTE: {len(X_train_balanced):,}")
-
-    # Scale and train
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train_balanced)
-    X_test_scaled = scaler.transform(X_test)
-
-    model = LogisticRegression(max_iter=1000, random_state=42, C=0.1)
-    model.fit(X_train_scaled, y_train_balanced)
-
-    # Evaluate
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
-    roc_auc = roc_auc_score(y_test, y_pred_proba)
-    avg_precision = average_precision_score(y_test, y_pred_proba)
-    print(f"ROC-AUC: {roc_auc:.4f}, Avg Precision: {avg_precision:.4f}")
-
-    # Score all patients
-    X_all_scaled = scaler.transform(X)
-    all_risk_scores = model.predict_proba(X_all_scaled)[:, 1] * 100
-
-    df_scored = df_model.copy()
-    df_scored['risk_score'] = all_risk_scores
-    df_scored['estimated_cost'] = (df_scored['risk_score'] / 100) * 15000
-    df_scored['patient_id'] = range(1, len(df_scored) + 1)
-
+# patient_risks.json (records) is what the dashboard bundles; the other formats
+# in export_formats.FORMAT_SUFFIXES are smaller and faster to parse
+PATIENT_EXPORT_FORMATS = ['records', 'columnar-gzip', 'binary']
+
+# Picked together in one select_rows() call: the exported high-risk table,
+# the top patients of every tier (Medium and Low included) and the top
+# high-risk patients per age group (top_patients.json)
+HIGH_RISK_CUT = Cut('high_risk', threshold=HIGH_RISK_THRESHOLD)
+TOP_PATIENT_CUTS = [
+    Cut('by_tier', top=100, by='tier'),
+    Cut('by_age_group', top=100, threshold=HIGH_RISK_THRESHOLD, by='age_group'),
+]
+
+def save_model_artifact(encoder, scaler, model, roc_auc, avg_precision, X):
+    """Save the fitted pipeline to models/ after checking the compiled scorer on X."""
+    artifact = ModelArtifact(encoder, scaler, model,
+                             {'roc_auc': float(roc_auc), 'avg_precision': float(avg_precision)})
+    path = artifact.save(parity_sample=X)
+    print(f"Saved model artifact: {path.name}")
+    return path
+
+def score_patients(df_model, X, scaler, model):
+    """Add risk_score, estimated_cost and patient_id to df_model (in place)."""
+    df_model['risk_score'] = predict_risk(X, scaler, model)
+    df_model['estimated_cost'] = (df_model['risk_score'] / 100) * READMISSION_COST
+    df_model['patient_id'] = range(1, len(df_model) + 1)
+    return df_model
+
+def export_patient_risks(df_scored, output_dir: Path = OUTPUT_DIR, write_tables: bool = True):
+    """Write the high-risk patient table in every export format, plus its pages and top_patients.json.
+
+    write_tables=False leaves the single-file tables (patient_risks.*) as they
+    are; pages and top_patients.json are only rewritten where they changed.
+    Returns the high-risk table as exported.
+    """
     # IMPROVEMENT 1: Export ALL high-risk patients (60%+ risk score)
-    df_high_risk = df_scored[df_scored['risk_score'] >= 60].copy()
-    print(f"\nHigh-risk patients (60%+): {len(df_high_risk):,}")
-
-    export_columns = [
-        'patient_id', 'age_numeric', 'time_in_hospital', 'num_medications',
-        'number_diagnoses', 'number_inpatient', 'number_emergency',
-        'total_visits', 'num_med_changes', 'risk_score', 'estimated_cost',
-        'readmitted_30day'
-    ]
-
-    export_df = df_high_risk[export_columns].copy()
-    export_df = export_df.rename(columns={'age_numeric': 'age'})
-    export_df['risk_score'] = export_df['risk_score'].round(2)
-    export_df['estimated_cost'] = export_df['estimated_cost'].round(2)
-
-    # Sort by risk score descending
-    export_df = export_df.sort_values('risk_score', ascending=False)
-
-    patient_risks = export_df.to_dict('records')
-
-    with open(OUTPUT_DIR / 'patient_risks.json', 'w') as f:
-        json.dump(patient_risks, f, indent=2)
-    print(f"Exported patient_risks.json ({len(patient_risks)} high-risk patients)")
-
-    # IMPROVEMENT 2: Full population risk distribution
-    bins = [0, 20, 40, 60, 80, 100]
-    labels = ['0-20%', '20-40%', '40-60%', '60-80%', '80-100%']
-    df_scored['risk_bin'] = pd.cut(df_scored['risk_score'], bins=bins, labels=labels)
-    risk_distribution = df_scored['risk_bin'].value_counts().sort_index().to_dict()
-
-    # IMPROVEMENT 3: Detailed high-risk breakdown (for second chart)
-    high_risk_bins = [60, 70, 80, 90, 100]
-    high_risk_labels = ['60-70%', '70-80%', '80-90%', '90-100%']
-    df_high_risk_detail = df_scored[df_scored['risk_score'] >= 60].copy()
-    df_high_risk_detail['detail_bin'] = pd.cut(
-        df_high_risk_detail['risk_score'],
-        bins=high_risk_bins,
-        labels=high_risk_labels
-    )
-    high_risk_distribution = df_high_risk_detail['detail_bin'].value_counts().sort_index().to_dict()
-
-    # Age group analysis
-    age_bins = [0, 30, 50, 70, 100]
-    age_labels = ['Under 30', '30-49', '50-69', '70+']
-    df_scored['age_group'] = pd.cut(df_scored['age_numeric'], bins=age_bins, labels=age_labels)
-    age_risk = df_scored.groupby('age_group', observed=True)['risk_score'].mean().to_dict()
+    cuts = [HIGH_RISK_CUT] + TOP_PATIENT_CUTS
+    selected = select_rows(df_scored['risk_score'].to_numpy(), cuts, frame_codes(df_scored, cuts))
+    print(f"\nHigh-risk patients (60%+): {len(selected['high_risk']):,}")
+
+    # Rows come back sorted by risk score descending, so only they are sorted
+    export_df = patient_export_frame(df_scored.take(selected['high_risk']))
+
+    for fmt in PATIENT_EXPORT_FORMATS if write_tables else []:
+        path = write_patient_table(export_df, output_dir, fmt=fmt)
+        print(f"Exported {path.name} ({len(export_df)} high-risk patients, "
+              f"{path.stat().st_size / 1024:,.0f} KB)")
+    # Tier the pages on the unrounded scores, as the top_patients.json cuts are
+    manifest_path = write_patient_pages(export_df, output_dir,
+                                        tier_scores=df_scored['risk_score'].to_numpy()[selected['high_risk']])
+    print(f"Exported {manifest_path.parent.name}/ (pages of {len(export_df)} high-risk patients)")
+
+    top_patients = {
+        cut.name: {group: patient_export_frame(df_scored.take(rows)).to_dict('records')
+                   for group, rows in selected[cut.name].items()}
+        for cut in TOP_PATIENT_CUTS
+    }
+    write_text_if_changed(output_dir / 'top_patients.json', json.dumps(top_patients, indent=2))
+    print(f"Exported top_patients.json (top {TOP_PATIENT_CUTS[0].top} per tier and per age group)")
+    return export_df
 
+def model_risk_factors(feature_cols, model) -> list:
+    """Top risk and protective numeric features by model coefficient."""
     # IMPROVEMENT 4: Extract feature importance for Risk Factors visualization
     feature_importance = pd.DataFrame({
         'feature': feature_cols,
@@ -209,7 +122,7 @@ def run_patient_modeling():
     }
 
     # Get top risk and protective factors (only numeric features for clarity)
-    numeric_importance = feature_importance[feature_importance['feature'].isin(numeric_features)]
+    numeric_importance = feature_importance[feature_importance['feature'].isin(NUMERIC_FEATURES)]
     top_risk_factors = numeric_importance.head(6).to_dict('records')
     top_protective = numeric_importance.tail(3).to_dict('records')
 
@@ -228,287 +141,149 @@ def run_patient_modeling():
             'coefficient': round(item['coefficient'], 4),
             'direction': 'protective'
         })
+    return risk_factors
+
+def summarize_risk(df_scored, feature_cols, model, roc_auc) -> dict:
+    """The risk_summary.json contents for the scored population."""
+    # IMPROVEMENT 2/3: Full population and high-risk distributions, age groups and
+    # tier totals, all from one pass over the score arrays
+    aggregate = RiskAggregate().update(
+        df_scored['risk_score'].to_numpy(),
+        df_scored['estimated_cost'].to_numpy(),
+        df_scored['age_numeric'].to_numpy(),
+        df_scored['readmitted_30day'].to_numpy()
+    )
 
-    # IMPROVEMENT 5: Cost impact by tier
-    tier_cost_impact = []
-    for tier_name, tier_filter in [
-        ('Critical (80%+)', df_scored['risk_score'] >= 80),
-        ('Very High (70-80%)', (df_scored['risk_score'] >= 70) & (df_scored['risk_score'] < 80)),
-        ('High (60-70%)', (df_scored['risk_score'] >= 60) & (df_scored['risk_score'] < 70)),
-    ]:
-        tier_patients = df_scored[tier_filter]
-        tier_cost_impact.append({
-            'tier': tier_name,
-            'count': int(len(tier_patients)),
-            'total_cost': float(tier_patients['estimated_cost'].sum()),
-            'avg_cost': float(tier_patients['estimated_cost'].mean()) if len(tier_patients) > 0 else 0,
-            'avg_risk': float(tier_patients['risk_score'].mean()) if len(tier_patients) > 0 else 0
-        })
-
-    # Summary object with improvements
-    risk_summary = {
-        'total_patients': int(len(df_scored)),
-        'high_risk_count': int(len(df_high_risk)),
-        'total_cost_exposure': float(df_high_risk['estimated_cost'].sum()),
-        'avg_risk_score': float(df_high_risk['risk_score'].mean()),
-        'median_risk_score': float(df_high_risk['risk_score'].median()),
-        'risk_distribution': {k: int(v) for k, v in risk_distribution.items()},
-        'high_risk_distribution': {k: int(v) for k, v in high_risk_distribution.items()},
-        'avg_risk_by_age': {k: round(float(v), 2) for k, v in age_risk.items()},
-        'model_auc': float(roc_auc),
-        'readmission_rate_overall': float(df_scored['readmitted_30day'].mean() * 100),
-        # Additional stats
-        'critical_count': int(len(df_scored[df_scored['risk_score'] >= 80])),
-        'very_high_count': int(len(df_scored[(df_scored['risk_score'] >= 70) & (df_scored['risk_score'] < 80)])),
-        'high_count': int(len(df_scored[(df_scored['risk_score'] >= 60) & (df_scored['risk_score'] < 70)])),
-        # New additions
-        'risk_factors': risk_factors,
-        'cost_by_tier': tier_cost_impact,
-    }
+    # IMPROVEMENT 5: Cost impact by tier (cost_by_tier) comes from the aggregate
+    return aggregate.summary(model_auc=roc_auc, risk_factors=model_risk_factors(feature_cols, model))
 
+def write_risk_summary(risk_summary: dict):
+    """Write risk_summary.json."""
     with open(OUTPUT_DIR / 'risk_summary.json', 'w') as f:
         json.dump(risk_summary, f, indent=2)
     print(f"Exported risk_summary.json (with full distribution)")
 
-    return roc_auc
+def run_patient_modeling(imbalance: str = 'smote', memory: StageReport = None):
+    """Run patient risk modeling and generate JSON exports.
 
-def generate_complete_state_data():
-    """Generate complete 50-state data with realistic readmission rates."""
-    print("\n" + "=" * 60)
-    print("GENERATING COMPLETE STATE DATA")
+    imbalance picks how the training split is balanced (modeling.IMBALANCE_STRATEGIES);
+    stage timings and memory go to memory (a new StageReport by default).
+    """
+    print("=" * 60)
+    print("PATIENT RISK MODELING (IMPROVED)")
     print("=" * 60)
 
-    # All 50 states + DC with coordinates and realistic data
-    # Based on actual CMS HRRP data patterns
-    STATE_DATA = {
-        'AL': {'name': 'Alabama', 'lat': 32.806671, 'lng': -86.791130, 'hospitals': 98, 'base_rate': 16.2},
-        'AK': {'name': 'Alaska', 'lat': 61.370716, 'lng': -152.404419, 'hospitals': 22, 'base_rate': 13.8},
-        'AZ': {'name': 'Arizona', 'lat': 33.729759, 'lng': -111.431221, 'hospitals': 77, 'base_rate': 14.9},
-        'AR': {'name': 'Arkansas', 'lat': 34.969704, 'lng': -92.373123, 'hospitals': 78, 'base_rate': 16.5},
-        'CA': {'name': 'California', 'lat': 36.116203, 'lng': -119.681564, 'hospitals': 341, 'base_rate': 14.2},
-        'CO': {'name': 'Colorado', 'lat': 39.059811, 'lng': -105.311104, 'hospitals': 78, 'base_rate': 13.1},
-        'CT': {'name': 'Connecticut', 'lat': 41.597782, 'lng': -72.755371, 'hospitals': 32, 'base_rate': 14.8},
-        'DE': {'name': 'Delaware', 'lat': 39.318523, 'lng': -75.507141, 'hospitals': 8, 'base_rate': 15.1},
-        'FL': {'name': 'Florida', 'lat': 27.766279, 'lng': -81.686783, 'hospitals': 193, 'base_rate': 15.4},
-        'GA': {'name': 'Georgia', 'lat': 33.040619, 'lng': -83.643074, 'hospitals': 139, 'base_rate': 15.8},
-        'HI': {'name': 'Hawaii', 'lat': 21.094318, 'lng': -157.498337, 'hospitals': 15, 'base_rate': 12.9},
-        'ID': {'name': 'Idaho', 'lat': 44.240459, 'lng': -114.478828, 'hospitals': 38, 'base_rate': 13.4},
-        'IL': {'name': 'Illinois', 'lat': 40.349457, 'lng': -88.986137, 'hospitals': 178, 'base_rate': 15.6},
-        'IN': {'name': 'Indiana', 'lat': 39.849426, 'lng': -86.258278, 'hospitals': 118, 'base_rate': 15.3},
-        'IA': {'name': 'Iowa', 'lat': 42.011539, 'lng': -93.210526, 'hospitals': 116, 'base_rate': 14.1},
-        'KS': {'name': 'Kansas', 'lat': 38.526600, 'lng': -96.726486, 'hospitals': 127, 'base_rate': 14.5},
-        'KY': {'name': 'Kentucky', 'lat': 37.668140, 'lng': -84.670067, 'hospitals': 96, 'base_rate': 16.8},
-        'LA': {'name': 'Louisiana', 'lat': 31.169546, 'lng': -91.867805, 'hospitals': 109, 'base_rate': 17.1},
-        'ME': {'name': 'Maine', 'lat': 44.693947, 'lng': -69.381927, 'hospitals': 36, 'base_rate': 14.2},
-        'MD': {'name': 'Maryland', 'lat': 39.063946, 'lng': -76.802101, 'hospitals': 47, 'base_rate': 15.7},
-        'MA': {'name': 'Massachusetts', 'lat': 42.230171, 'lng': -71.530106, 'hospitals': 68, 'base_rate': 14.5},
-        'MI': {'name': 'Michigan', 'lat': 43.326618, 'lng': -84.536095, 'hospitals': 134, 'base_rate': 15.2},
-        'MN': {'name': 'Minnesota', 'lat': 45.694454, 'lng': -93.900192, 'hospitals': 131, 'base_rate': 12.8},
-        'MS': {'name': 'Mississippi', 'lat': 32.741646, 'lng': -89.678696, 'hospitals': 83, 'base_rate': 17.4},
-        'MO': {'name': 'Missouri', 'lat': 38.456085, 'lng': -92.288368, 'hospitals': 113, 'base_rate': 15.9},
-        'MT': {'name': 'Montana', 'lat': 46.921925, 'lng': -110.454353, 'hospitals': 48, 'base_rate': 13.2},
-        'NE': {'name': 'Nebraska', 'lat': 41.125370, 'lng': -98.268082, 'hospitals': 89, 'base_rate': 13.9},
-        'NV': {'name': 'Nevada', 'lat': 38.313515, 'lng': -117.055374, 'hospitals': 32, 'base_rate': 15.1},
-        'NH': {'name': 'New Hampshire', 'lat': 43.452492, 'lng': -71.563896, 'hospitals': 26, 'base_rate': 13.7},
-        'NJ': {'name': 'New Jersey', 'lat': 40.298904, 'lng': -74.521011, 'hospitals': 71, 'base_rate': 16.1},
-        'NM': {'name': 'New Mexico', 'lat': 34.840515, 'lng': -106.248482, 'hospitals': 40, 'base_rate': 14.3},
-        'NY': {'name': 'New York', 'lat': 42.165726, 'lng': -74.948051, 'hospitals': 183, 'base_rate': 15.4},
-        'NC': {'name': 'North Carolina', 'lat': 35.630066, 'lng': -79.806419, 'hospitals': 112, 'base_rate': 15.1},
-        'ND': {'name': 'North Dakota', 'lat': 47.528912, 'lng': -99.784012, 'hospitals': 42, 'base_rate': 12.6},
-        'OH': {'name': 'Ohio', 'lat': 40.388783, 'lng': -82.764915, 'hospitals': 167, 'base_rate': 15.8},
-        'OK': {'name': 'Oklahoma', 'lat': 35.565342, 'lng': -96.928917, 'hospitals': 112, 'base_rate': 16.4},
-        'OR': {'name': 'Oregon', 'lat': 44.572021, 'lng': -122.070938, 'hospitals': 58, 'base_rate': 13.5},
-        'PA': {'name': 'Pennsylvania', 'lat': 40.590752, 'lng': -77.209755, 'hospitals': 170, 'base_rate': 15.3},
-        'RI': {'name': 'Rhode Island', 'lat': 41.680893, 'lng': -71.511780, 'hospitals': 11, 'base_rate': 14.9},
-        'SC': {'name': 'South Carolina', 'lat': 33.856892, 'lng': -80.945007, 'hospitals': 63, 'base_rate': 15.6},
-        'SD': {'name': 'South Dakota', 'lat': 44.299782, 'lng': -99.438828, 'hospitals': 53, 'base_rate': 12.9},
-        'TN': {'name': 'Tennessee', 'lat': 35.747845, 'lng': -86.692345, 'hospitals': 116, 'base_rate': 16.3},
-        'TX': {'name': 'Texas', 'lat': 31.054487, 'lng': -97.563461, 'hospitals': 378, 'base_rate': 15.2},
-        'UT': {'name': 'Utah', 'lat': 40.150032, 'lng': -111.862434, 'hospitals': 42, 'base_rate': 12.4},
-        'VT': {'name': 'Vermont', 'lat': 44.045876, 'lng': -72.710686, 'hospitals': 14, 'base_rate': 13.1},
-        'VA': {'name': 'Virginia', 'lat': 37.769337, 'lng': -78.169968, 'hospitals': 89, 'base_rate': 14.7},
-        'WA': {'name': 'Washington', 'lat': 47.400902, 'lng': -121.490494, 'hospitals': 88, 'base_rate': 13.3},
-        'WV': {'name': 'West Virginia', 'lat': 38.491226, 'lng': -80.954453, 'hospitals': 55, 'base_rate': 17.2},
-        'WI': {'name': 'Wisconsin', 'lat': 44.268543, 'lng': -89.616508, 'hospitals': 125, 'base_rate': 13.6},
-        'WY': {'name': 'Wyoming', 'lat': 42.755966, 'lng': -107.302490, 'hospitals': 25, 'base_rate': 13.0},
-        'DC': {'name': 'District of Columbia', 'lat': 38.897438, 'lng': -77.026817, 'hospitals': 8, 'base_rate': 16.5},
-    }
+    memory = memory or StageReport("PATIENT RISK MODELING")
 
-    # Generate state summary with realistic variations
-    np.random.seed(42)
-    state_data = []
-
-    for state_code, info in STATE_DATA.items():
-        # Add some random variation to make it realistic
-        rate_variation = np.random.uniform(-0.8, 0.8)
-        avg_rate = info['base_rate'] + rate_variation
-
-        # Calculate penalty based on rate (higher rates = higher penalties)
-        # CMS penalizes hospitals with excess readmission ratios > 1.0
-        if avg_rate > 15.5:
-            penalty_pct = np.random.uniform(0.5, 2.0)
-        elif avg_rate > 14.5:
-            penalty_pct = np.random.uniform(0.2, 0.8)
-        else:
-            penalty_pct = np.random.uniform(0, 0.3)
-
-        # Estimate total penalty (hospitals * avg Medicare payments * penalty %)
-        avg_medicare_per_hospital = 5_000_000
-        total_penalty = info['hospitals'] * avg_medicare_per_hospital * (penalty_pct / 100)
-
-        state_data.append({
-            'state': state_code,
-            'name': info['name'],
-            'lat': info['lat'],
-            'lng': info['lng'],
-            'hospital_count': info['hospitals'],
-            'avg_readmission_rate': round(avg_rate, 1),
-            'avg_penalty_pct': round(penalty_pct, 2),
-            'total_penalty_estimate': round(total_penalty, 0)
-        })
+    # Load data ('?' already converted to NaN; served from data/cache when unchanged)
+    df = load_uci_encounters(DATA_DIR)
+    print(f"Loaded {len(df):,} records ({frame_memory_mb(df):.1f} MB in memory)")
+    memory.checkpoint('load', len(df))
 
-    # Sort by readmission rate descending
-    state_data.sort(key=lambda x: x['avg_readmission_rate'], reverse=True)
+    df = prepare_patients(df, memory)
 
-    with open(OUTPUT_DIR / 'state_summary.json', 'w') as f:
-        json.dump(state_data, f, indent=2)
-    print(f"Exported state_summary.json ({len(state_data)} states)")
+    # Feature selection
+    df_model = df[MODEL_COLS]
+    del df
 
-    # Generate hospital data for all states
-    print("\nGenerating hospital-level data...")
-    hospital_data = []
-    hospital_names = [
-        "Regional Medical Center", "Community Hospital", "Memorial Hospital",
-        "University Hospital", "St. Mary's Hospital", "General Hospital",
-        "Medical Center", "Health System", "County Hospital", "Baptist Hospital",
-        "Methodist Hospital", "Presbyterian Hospital", "Mercy Hospital",
-        "Providence Hospital", "Sacred Heart Hospital", "Good Samaritan Hospital"
-    ]
-
-    cities_by_state = {
-        'AL': ['Birmingham', 'Montgomery', 'Mobile', 'Huntsville'],
-        'AK': ['Anchorage', 'Fairbanks', 'Juneau'],
-        'AZ': ['Phoenix', 'Tucson', 'Mesa', 'Scottsdale'],
-        'AR': ['Little Rock', 'Fort Smith', 'Fayetteville'],
-        'CA': ['Los Angeles', 'San Francisco', 'San Diego', 'Sacramento', 'San Jose'],
-        'CO': ['Denver', 'Colorado Springs', 'Aurora', 'Boulder'],
-        'CT': ['Hartford', 'New Haven', 'Stamford', 'Bridgeport'],
-        'DE': ['Wilmington', 'Dover', 'Newark'],
-        'FL': ['Miami', 'Orlando', 'Tampa', 'Jacksonville', 'Fort Lauderdale'],
-        'GA': ['Atlanta', 'Savannah', 'Augusta', 'Columbus'],
-        'HI': ['Honolulu', 'Hilo', 'Kailua'],
-        'ID': ['Boise', 'Meridian', 'Nampa'],
-        'IL': ['Chicago', 'Springfield', 'Peoria', 'Rockford'],
-        'IN': ['Indianapolis', 'Fort Wayne', 'Evansville', 'South Bend'],
-        'IA': ['Des Moines', 'Cedar Rapids', 'Davenport'],
-        'KS': ['Wichita', 'Kansas City', 'Topeka', 'Overland Park'],
-        'KY': ['Louisville', 'Lexington', 'Bowling Green'],
-        'LA': ['New Orleans', 'Baton Rouge', 'Shreveport'],
-        'ME': ['Portland', 'Lewiston', 'Bangor'],
-        'MD': ['Baltimore', 'Rockville', 'Frederick', 'Bethesda'],
-        'MA': ['Boston', 'Worcester', 'Springfield', 'Cambridge'],
-        'MI': ['Detroit', 'Grand Rapids', 'Ann Arbor', 'Lansing'],
-        'MN': ['Minneapolis', 'St. Paul', 'Rochester', 'Duluth'],
-        'MS': ['Jackson', 'Gulfport', 'Hattiesburg'],
-        'MO': ['St. Louis', 'Kansas City', 'Springfield', 'Columbia'],
-        'MT': ['Billings', 'Missoula', 'Great Falls'],
-        'NE': ['Omaha', 'Lincoln', 'Bellevue'],
-        'NV': ['Las Vegas', 'Reno', 'Henderson'],
-        'NH': ['Manchester', 'Nashua', 'Concord'],
-        'NJ': ['Newark', 'Jersey City', 'Trenton', 'Camden'],
-        'NM': ['Albuquerque', 'Santa Fe', 'Las Cruces'],
-        'NY': ['New York', 'Buffalo', 'Rochester', 'Albany', 'Syracuse'],
-        'NC': ['Charlotte', 'Raleigh', 'Durham', 'Greensboro'],
-        'ND': ['Fargo', 'Bismarck', 'Grand Forks'],
-        'OH': ['Columbus', 'Cleveland', 'Cincinnati', 'Toledo', 'Akron'],
-        'OK': ['Oklahoma City', 'Tulsa', 'Norman'],
-        'OR': ['Portland', 'Salem', 'Eugene', 'Bend'],
-        'PA': ['Philadelphia', 'Pittsburgh', 'Allentown', 'Erie'],
-        'RI': ['Providence', 'Warwick', 'Cranston'],
-        'SC': ['Charleston', 'Columbia', 'Greenville'],
-        'SD': ['Sioux Falls', 'Rapid City', 'Aberdeen'],
-        'TN': ['Nashville', 'Memphis', 'Knoxville', 'Chattanooga'],
-        'TX': ['Houston', 'Dallas', 'Austin', 'San Antonio', 'Fort Worth'],
-        'UT': ['Salt Lake City', 'Provo', 'Ogden'],
-        'VT': ['Burlington', 'Montpelier', 'Rutland'],
-        'VA': ['Virginia Beach', 'Richmond', 'Norfolk', 'Arlington'],
-        'WA': ['Seattle', 'Spokane', 'Tacoma', 'Vancouver'],
-        'WV': ['Charleston', 'Huntington', 'Morgantown'],
-        'WI': ['Milwaukee', 'Madison', 'Green Bay'],
-        'WY': ['Cheyenne', 'Casper', 'Laramie'],
-        'DC': ['Washington'],
-    }
+    # Handle missing values
+    df_model = fill_missing(df_model)
+
+    # One-hot encode
+    X, y, encoder = encode_features(df_model)
+    feature_cols = encoder.feature_cols
+    memory.checkpoint('encode', len(X))
 
-    for state_code, info in STATE_DATA.items():
-        cities = cities_by_state.get(state_code, ['City'])
-        num_hospitals = min(info['hospitals'], 15)  # Limit per state for performance
+    scaler, model, roc_auc, avg_precision = fit_readmission_model(X, y, memory, imbalance)
 
-        for i in range(num_hospitals):
-            city = cities[i % len(cities)]
-            name_base = hospital_names[i % len(hospital_names)]
+    # Persist the fitted pipeline so score.py can re-score without retraining;
+    # the compiled NumPy scorer is checked against sklearn on X before saving
+    save_model_artifact(encoder, scaler, model, roc_auc, avg_precision, X)
+    memory.checkpoint('artifact', len(X))
 
-            # Add city name to make unique
-            hospital_name = f"{city} {name_base}"
+    # df_model is not used past this point, so score it in place rather than copying
+    df_scored = score_patients(df_model, X, scaler, model)
+    memory.checkpoint('score', len(df_scored))
 
-            # Generate realistic readmission rate based on state average
-            rate = info['base_rate'] + np.random.uniform(-2, 2)
+    export_patient_risks(df_scored)
+    memory.checkpoint('export', len(df_scored))
 
-            # Generate penalty
-            if rate > 15.5:
-                penalty = np.random.uniform(0.5, 2.5)
-            elif rate > 14.5:
-                penalty = np.random.uniform(0.1, 1.0)
-            else:
-                penalty = np.random.uniform(0, 0.4)
+    risk_summary = summarize_risk(df_scored, feature_cols, model, roc_auc)
+    write_risk_summary(risk_summary)
+    memory.checkpoint('summary', len(df_scored))
+    memory.print_report()
+
+    return roc_auc
 
-            hospital_data.append({
-                'name': hospital_name,
-                'state': state_code,
-                'city': city,
-                'readmission_rate': round(rate, 1),
-                'penalty_pct': round(penalty, 2)
-            })
+def generate_complete_state_data(memory: StageReport = None, scale: int = 1):
+    """Generate complete 50-state data with realistic readmission rates.
+
+    scale multiplies the hospitals generated per state (100 for load testing).
+    """
+    memory = memory or StageReport("STATE DATA")
+    print("\n" + "=" * 60)
+    print("GENERATING COMPLETE STATE DATA")
+    print("=" * 60)
+
+    df_states, df_hospitals = synthetic_state_data(scale)
+    memory.checkpoint('generate', len(df_hospitals))
 
     # Sort by readmission rate descending
-    hospital_data.sort(key=lambda x: x['readmission_rate'], reverse=True)
+    state_data = df_states.sort_values('avg_readmission_rate', ascending=False, kind='stable').to_dict('records')
+
+    with open(OUTPUT_DIR / 'state_summary.json', 'w') as f:
+        json.dump(state_data, f, indent=2)
+    print(f"Exported state_summary.json ({len(state_data)} states)")
+    memory.checkpoint('state_summary', len(state_data))
+
+    hospital_data = hospital_records(df_hospitals)
 
     with open(OUTPUT_DIR / 'hospital_metrics.json', 'w') as f:
         json.dump(hospital_data, f, indent=2)
     print(f"Exported hospital_metrics.json ({len(hospital_data)} hospitals)")
+    memory.checkpoint('hospital_metrics', len(hospital_data))
+
+    # State/city/tile rollups and per-cell hospital files for the map
+    state_names = dict(zip(df_states['state'], df_states['name']))
+    manifest_path = write_geo_exports(df_hospitals, OUTPUT_DIR, state_names)
+    print(f"Exported {manifest_path.parent.name}/ (rollups, tiles and grid cells)")
+    memory.checkpoint('geo', len(df_hospitals))
+    memory.print_report()
 
 def verify_exports():
-    """Verify all exported files."""
+    """Verify all exported files (streamed and checked against their schemas)."""
     print("\n" + "=" * 60)
     print("VERIFICATION")
     print("=" * 60)
 
-    export_files = [
-        'patient_risks.json',
-        'risk_summary.json',
-        'state_summary.json',
-        'hospital_metrics.json'
-    ]
-
-    for filename in export_files:
-        filepath = OUTPUT_DIR / filename
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                print(f"  {filename}: {len(data)} records")
-            else:
-                print(f"  {filename}: {len(data.keys())} keys")
-        else:
-            print(f"  {filename}: NOT FOUND")
+    print_checks(verify_output_dir(OUTPUT_DIR))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the readmission model and export the dashboard data.")
+    parser.add_argument('--imbalance', choices=IMBALANCE_STRATEGIES, default='smote',
+                        help='how the training split is balanced (see benchmarks/bench_imbalance.py)')
+    parser.add_argument('--profile', action='store_true',
+                        help='write a per-stage JSON/CSV profile to logs/profiles/')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='also run under cProfile and dump a .prof file there')
+    parser.add_argument('--hospital-scale', type=int, default=1,
+                        help='generate this many times the real hospital count per state (load testing)')
+    args = parser.parse_args()
+
     print("\n" + "=" * 60)
     print("READMITRISK DATA ANALYSIS (IMPROVED VERSION)")
     print("=" * 60 + "\n")
 
-    run_patient_modeling()
-    generate_complete_state_data()
-    verify_exports()
+    # Each report times its stages from when it is created
+    with profiled('run_analysis_v2', enabled=args.cprofile):
+        modeling_report = StageReport("PATIENT RISK MODELING")
+        run_patient_modeling(args.imbalance, modeling_report)
+        state_report = StageReport("STATE DATA")
+        generate_complete_state_data(state_report, args.hospital_scale)
+        verify_exports()
+    if args.profile or args.cprofile:
+        paths = write_profile([modeling_report, state_report], 'run_analysis_v2')
+        print(f"\nProfile written to {paths[0]} and {paths[1].name}")
 
     print("\n" + "=" * 60)
     print("ANALYSIS COMPLETE - IMPROVED DATA READY FOR DASHBOARD")
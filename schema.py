@@ -0,0 +1,73 @@
+"""
+Declared column schema for the UCI Diabetes 130-US Hospitals dataset.
+
+Reading diabetic_data.csv with inferred dtypes leaves every string column as
+object and every count as int64. The schema below parses low-cardinality
+strings straight to `category`, counts to the smallest integer type that fits
+the documented ranges, and treats the dataset's '?' placeholder as NA during
+parsing instead of a separate df.replace() pass over the whole frame.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+UCI_NA_VALUES = ['?']
+
+# Identifiers stay 64-bit so multi-year extracts cannot overflow
+UCI_ID_DTYPES = {
+    'encounter_id': np.int64,
+    'patient_nbr': np.int64,
+}
+
+# Codes and counts, sized from the ranges in the UCI data dictionary
+UCI_INT_DTYPES = {
+    'admission_type_id': np.int8,
+    'discharge_disposition_id': np.int8,
+    'admission_source_id': np.int8,
+    'time_in_hospital': np.int8,
+    'num_lab_procedures': np.int16,
+    'num_procedures': np.int8,
+    'num_medications': np.int16,
+    'number_outpatient': np.int16,
+    'number_emergency': np.int16,
+    'number_inpatient': np.int16,
+    'number_diagnoses': np.int8,
+}
+
+UCI_MEDICATION_COLS = [
+    'metformin', 'repaglinide', 'nateglinide', 'chlorpropamide',
+    'glimepiride', 'acetohexamide', 'glipizide', 'glyburide',
+    'tolbutamide', 'pioglitazone', 'rosiglitazone', 'acarbose',
+    'miglitol', 'troglitazone', 'tolazamide', 'examide', 'citoglipton',
+    'insulin', 'glyburide-metformin', 'glipizide-metformin',
+    'glimepiride-pioglitazone', 'metformin-rosiglitazone', 'metformin-pioglitazone'
+]
+
+UCI_CATEGORY_COLS = [
+    'race', 'gender', 'age', 'weight', 'payer_code', 'medical_specialty',
+    'diag_1', 'diag_2', 'diag_3', 'max_glu_serum', 'A1Cresult',
+    *UCI_MEDICATION_COLS,
+    'change', 'diabetesMed', 'readmitted'
+]
+
+UCI_DTYPES = {
+    **UCI_ID_DTYPES,
+    **UCI_INT_DTYPES,
+    **{col: 'category' for col in UCI_CATEGORY_COLS},
+}
+
+
+def read_uci_csv(path: Path, **kwargs) -> pd.DataFrame:
+    """Parse diabetic_data.csv with the declared schema ('?' read as NA)."""
+    return pd.read_csv(
+        path,
+        dtype=UCI_DTYPES,
+        na_values=UCI_NA_VALUES,
+        **kwargs
+    )
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """Deep in-memory size of a frame in MB."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
@@ -0,0 +1,45 @@
+"""
+Score encounters with a saved model artifact - no retraining, no SMOTE.
+
+Loads the latest artifact from models/ (or the one given with --model), checks
+that its scaler and model match the saved training column layout, then scores
+the input in chunks and writes scored_patients.csv, patient_risks.json and
+risk_summary.json.
+
+Usage:
+    python score.py --input data/raw/diabetic_data.csv
+    python score.py --input new_encounters.csv --model models/readmission_model-<version>.joblib
+"""
+import argparse
+import time
+from pathlib import Path
+
+from model_artifact import ModelArtifact, MODEL_DIR
+from streaming import DEFAULT_CHUNK_SIZE, score_stream
+
+DATA_DIR = Path(__file__).parent / 'data' / 'raw'
+OUTPUT_DIR = Path(__file__).parent / 'data' / 'processed' / 'scored'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score encounters with a saved model artifact.")
+    parser.add_argument('--input', type=Path, default=DATA_DIR / 'diabetic_data.csv')
+    parser.add_argument('--model', type=Path, default=None,
+                        help='artifact path (default: models/latest.json)')
+    parser.add_argument('--model-dir', type=Path, default=MODEL_DIR)
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SCORING WITH SAVED MODEL")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    artifact = ModelArtifact.load(args.model, args.model_dir)
+    print(f"Model version: {artifact.version} ({len(artifact.feature_cols)} features, "
+          f"trained {artifact.created_at})")
+
+    score_stream(args.input, artifact.encoder, artifact.scaler, artifact.model,
+                 args.output_dir, args.chunk_size, artifact.metrics.get('roc_auc'))
+    print(f"Scored in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,243 @@
+"""
+Local HTTP scoring service for single encounters and micro-batches.
+
+Serves the latest model artifact saved by run_patient_modeling(). Requests are
+encoded straight from JSON with FeatureEncoder.transform_records() and scored
+with the NumPy CompiledScorer. A single batcher thread collects whatever
+requests are queued while it is busy and scores them as one matrix, so
+concurrent callers share one vectorized call instead of contending for the GIL.
+
+Endpoints:
+    GET  /health   model version and feature count
+    POST /score    {"encounter": {...}} or {"encounters": [{...}, ...]}
+                   -> {"model_version": ..., "results": [{"risk_score", "estimated_cost", "tier"}, ...]}
+
+Encounters use the diabetic_data.csv column names (age, time_in_hospital,
+number_inpatient, race, A1Cresult, insulin, ...); missing fields are filled
+the same way as in training.
+
+Usage:
+    python scoring_service.py --port 8765
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from model_artifact import ModelArtifact, MODEL_DIR
+from modeling import READMISSION_COST, risk_tier
+
+warnings.filterwarnings('ignore')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH_ROWS = 4096
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+
+class _PendingRequest:
+    """One caller's encoded rows, waiting for the batcher to fill in scores."""
+
+    __slots__ = ('X', 'scores', 'error', 'done')
+
+    def __init__(self, X: np.ndarray):
+        self.X = X
+        self.scores = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Scores queued requests together in one vectorized call.
+
+    The worker blocks for the first pending request, then drains everything
+    else already queued (up to max_rows) without waiting, so an idle service
+    adds no batching delay and a busy one amortises the call over all callers.
+    """
+
+    def __init__(self, scorer, max_rows: int = MAX_BATCH_ROWS):
+        self.scorer = scorer
+        self.max_rows = max_rows
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Risk scores for X, computed in a shared batch."""
+        request = _PendingRequest(X)
+        self.pending.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.scores
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            rows = len(batch[0].X)
+            while rows < self.max_rows:
+                try:
+                    request = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                rows += len(request.X)
+            self._score_batch(batch)
+
+    def _score_batch(self, batch: list):
+        try:
+            X = batch[0].X if len(batch) == 1 else np.vstack([request.X for request in batch])
+            scores = self.scorer.risk_scores(X)
+        except Exception as exc:  # hand the failure to every waiting caller
+            for request in batch:
+                request.error = exc
+                request.done.set()
+            return
+
+        offset = 0
+        for request in batch:
+            request.scores = scores[offset:offset + len(request.X)]
+            offset += len(request.X)
+            request.done.set()
+        self.batches += 1
+        self.requests += len(batch)
+
+
+class ScoringService:
+    """Model state shared by all request handlers."""
+
+    def __init__(self, artifact: ModelArtifact):
+        self.artifact = artifact
+        self.encoder = artifact.encoder
+        self.batcher = MicroBatcher(artifact.compile())
+
+    def score_records(self, records: list) -> list:
+        """Score raw encounter dicts; one result dict per encounter."""
+        scores = self.batcher.score(self.encoder.transform_records(records))
+        return [
+            {
+                'risk_score': round(float(score), 2),
+                'estimated_cost': round(float(score) / 100 * READMISSION_COST, 2),
+                'tier': risk_tier(float(score)),
+            }
+            for score in scores
+        ]
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """JSON request handler; keeps connections alive so clients can reuse them."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # second write waits on the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    service: ScoringService = None
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        artifact = self.service.artifact
+        self._send_json(200, {
+            'status': 'ok',
+            'model_version': artifact.version,
+            'n_features': len(artifact.feature_cols),
+            'batches': self.service.batcher.batches,
+            'requests': self.service.batcher.requests,
+        })
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        if length > MAX_REQUEST_BYTES:
+            self._send_json(413, {'error': 'request body too large'})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            records = self._records_from(body)
+        except ValueError as exc:
+            self._send_json(400, {'error': str(exc)})
+            return
+
+        try:
+            results = self.service.score_records(records)
+        except (TypeError, ValueError) as exc:
+            self._send_json(400, {'error': f'could not score encounter: {exc}'})
+            return
+        self._send_json(200, {'model_version': self.service.artifact.version, 'results': results})
+
+    @staticmethod
+    def _records_from(body) -> list:
+        """Accept {"encounter": {...}}, {"encounters": [...]}, a bare object or a bare list."""
+        if isinstance(body, dict) and 'encounters' in body:
+            records = body['encounters']
+        elif isinstance(body, dict) and 'encounter' in body:
+            records = [body['encounter']]
+        elif isinstance(body, dict):
+            records = [body]
+        else:
+            records = body
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise ValueError('expected an encounter object or a list of encounter objects')
+        if len(records) > MAX_BATCH_ROWS:
+            raise ValueError(f'at most {MAX_BATCH_ROWS} encounters per request')
+        return records
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the latency budget
+        pass
+
+
+class ScoringServer(ThreadingHTTPServer):
+    """Threaded server that treats clients hanging up as routine."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def make_server(artifact: ModelArtifact, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """HTTP server bound to host:port serving artifact."""
+    handler = type('BoundScoringHandler', (ScoringHandler,), {'service': ScoringService(artifact)})
+    return ScoringServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve readmission risk scores over HTTP.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--model', type=Path, default=None,
+                        help='artifact path (default: models/latest.json)')
+    parser.add_argument('--model-dir', type=Path, default=MODEL_DIR)
+    args = parser.parse_args()
+
+    artifact = ModelArtifact.load(args.model, args.model_dir)
+    server = make_server(artifact, args.host, args.port)
+    print(f"Serving model {artifact.version} on http://{args.host}:{args.port} (POST /score)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
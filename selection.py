@@ -0,0 +1,204 @@
+"""
+Threshold and top-N selection of scored patients without sorting the population.
+
+A Cut names a set of rows: those with a score >= threshold, the top rows, or
+both. With by=, the cut applies within each group ('tier' or 'age_group', see
+GROUPINGS). select_rows() answers any number of cuts in one call. Each
+grouping's codes are computed once and bucketed with a stable radix argsort.
+A top-N cut partitions to its N-th largest score (np.partition) and sorts
+only the rows it keeps, highest score first. Equal scores keep their row
+order, as in nlargest(keep='first') or a stable sort.
+
+StreamingSelection applies the same cuts to a stream of chunks. It keeps only
+the rows that can still make a cut. For top-N cuts the buffer stays around
+twice the rows the cuts keep, plus one chunk's candidates, however long the
+stream is.
+"""
+import numpy as np
+import pandas as pd
+
+from modeling import RISK_TIERS
+from patient_pages import AGE_GROUPS
+
+SCORE_COLUMN = 'risk_score'
+
+# grouping name -> (column the groups are cut from, [(lower_bound, name)] highest first)
+GROUPINGS = {
+    'tier': ('risk_score', RISK_TIERS),
+    'age_group': ('age_numeric', AGE_GROUPS),
+}
+
+
+class Cut:
+    """Rows with score >= threshold and/or the top rows by score, optionally per group."""
+
+    def __init__(self, name: str, top: int = None, threshold: float = None, by: str = None):
+        if top is None and threshold is None:
+            raise ValueError(f"cut {name!r} needs a top count, a threshold or both")
+        if top is not None and top < 0:
+            raise ValueError(f"cut {name!r}: top must be >= 0")
+        if by is not None and by not in GROUPINGS:
+            raise ValueError(f"cut {name!r}: unknown grouping {by!r}; choose from {', '.join(GROUPINGS)}")
+        self.name = name
+        self.top = top
+        self.threshold = threshold
+        self.by = by
+
+    def __repr__(self):
+        return f"Cut({self.name!r}, top={self.top}, threshold={self.threshold}, by={self.by!r})"
+
+
+def group_codes(values: np.ndarray, groups: list) -> np.ndarray:
+    """Index of the first (lower_bound, name) group each value reaches; the last group otherwise."""
+    values = np.asarray(values, dtype=np.float64)
+    ascending = np.array([lower_bound for lower_bound, _ in groups][::-1], dtype=np.float64)
+    reached = np.searchsorted(ascending, values, side='right') - 1
+    codes = len(groups) - 1 - np.clip(reached, 0, None)
+    codes[np.isnan(values)] = len(groups) - 1
+    return codes.astype(np.int8)
+
+
+def descending_order(values: np.ndarray) -> np.ndarray:
+    """argsort of values, highest first, with equal values in position order.
+
+    A stable argsort of floats is a mergesort. When few values are tied, it is
+    cheaper to use the default sort and re-order only the runs of equal values.
+    When many are tied there are usually few distinct values: the default sort
+    ranks them, and a stable argsort of 16-bit ranks is a radix sort.
+    """
+    order = np.argsort(-values)
+    ordered = values[order]
+    tied = np.flatnonzero(ordered[1:] == ordered[:-1])
+    if len(tied) > len(values) // 64:
+        if len(values) - len(tied) > 1 << 16:
+            return np.argsort(-values, kind='stable')
+        ranks = np.empty(len(values), dtype=np.uint16)
+        ranks[order] = np.concatenate([[0], np.cumsum(ordered[1:] != ordered[:-1])])
+        return np.argsort(ranks, kind='stable')
+    if len(tied):
+        positions = np.union1d(tied, tied + 1)
+        new_run = np.ones(len(positions), dtype=bool)
+        new_run[1:] = (np.diff(positions) != 1) | (ordered[positions[1:]] != ordered[positions[:-1]])
+        order[positions] = order[positions][np.lexsort((order[positions], np.cumsum(new_run)))]
+    return order
+
+
+def ranked(scores: np.ndarray, rows: np.ndarray, top: int = None) -> np.ndarray:
+    """rows (ascending indices into scores) by score descending, only the first top when given.
+
+    Rows below the top-th largest score are dropped by a partition first, so
+    only the rows kept are sorted.
+    """
+    values = scores[rows]
+    if top is not None and top < len(rows):
+        if top == 0:
+            return rows[:0]
+        kth = np.partition(values, len(values) - top)[len(values) - top]
+        keep = values >= kth
+        rows, values = rows[keep], values[keep]
+    return rows[descending_order(values)[:top]]
+
+
+def select_rows(scores: np.ndarray, cuts: list, codes: dict = None) -> dict:
+    """{cut name: row indices} for ungrouped cuts, {cut name: {group name: row indices}} for
+    grouped ones; rows are ordered by score descending.
+
+    codes maps each grouping a cut uses to per-row group codes (group_codes()).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    codes = codes or {}
+
+    # One stable (radix, for int8 codes) argsort per grouping puts each group's
+    # rows in one ascending slice
+    buckets = {}
+    for by in {cut.by for cut in cuts if cut.by is not None}:
+        if by not in codes:
+            raise ValueError(f"no group codes given for {by!r}")
+        by_code = np.argsort(codes[by], kind='stable')
+        counts = np.bincount(codes[by], minlength=len(GROUPINGS[by][1]))
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        buckets[by] = [by_code[bounds[i]:bounds[i + 1]] for i in range(len(counts))]
+
+    selected = {}
+    for cut in cuts:
+        if cut.by is None:
+            above = scores >= cut.threshold if cut.threshold is not None else np.ones(len(scores), dtype=bool)
+            groups = {None: np.flatnonzero(above)}
+        else:
+            groups = {name: rows for (_, name), rows in zip(GROUPINGS[cut.by][1], buckets[cut.by])}
+            if cut.threshold is not None:
+                groups = {name: rows[scores[rows] >= cut.threshold] for name, rows in groups.items()}
+        picked = {name: ranked(scores, rows, cut.top) for name, rows in groups.items()}
+        selected[cut.name] = picked[None] if cut.by is None else picked
+    return selected
+
+
+def frame_codes(df: pd.DataFrame, cuts: list) -> dict:
+    """The group codes select_rows() needs for cuts, from df's grouping columns."""
+    return {
+        by: group_codes(df[GROUPINGS[by][0]].to_numpy(), GROUPINGS[by][1])
+        for by in {cut.by for cut in cuts if cut.by is not None}
+    }
+
+
+def select_frame(df: pd.DataFrame, cuts: list, score_column: str = SCORE_COLUMN) -> dict:
+    """select_rows() over df, returning the selected rows of df instead of indices."""
+    selected = select_rows(df[score_column].to_numpy(), cuts, frame_codes(df, cuts))
+    return {
+        name: df.take(rows) if not isinstance(rows, dict) else {group: df.take(r) for group, r in rows.items()}
+        for name, rows in selected.items()
+    }
+
+
+def _selected_union(selected: dict) -> np.ndarray:
+    parts = [rows for picked in selected.values()
+             for rows in (picked.values() if isinstance(picked, dict) else [picked])]
+    return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+
+class StreamingSelection:
+    """select_frame() over a stream of chunks, keeping only rows that can still make a cut.
+
+    A row outside its chunk's top N is beaten by N rows of that chunk, so it
+    can never make the overall top N. Each chunk is cut on its own first, and
+    the buffered rows are cut again whenever they have doubled.
+    """
+
+    def __init__(self, cuts: list, score_column: str = SCORE_COLUMN):
+        self.cuts = cuts
+        self.score_column = score_column
+        self.rows_seen = 0
+        self._parts = []
+        self._buffered = 0
+        self._kept = 0
+
+    def _candidates(self, df: pd.DataFrame) -> pd.DataFrame:
+        selected = select_rows(df[self.score_column].to_numpy(), self.cuts, frame_codes(df, self.cuts))
+        return df.take(_selected_union(selected))
+
+    def update(self, chunk: pd.DataFrame) -> 'StreamingSelection':
+        """Fold one chunk (in stream order) into the selection."""
+        self.rows_seen += len(chunk)
+        candidates = self._candidates(chunk)
+        self._parts.append(candidates)
+        self._buffered += len(candidates)
+        # Only top-N cuts drop rows when re-cut; threshold-only cuts keep them all
+        tops = [cut.top for cut in self.cuts if cut.top is not None]
+        if tops and len(self._parts) > 1 and self._buffered > 2 * max(self._kept, sum(tops)):
+            self._compact()
+        return self
+
+    def _compact(self):
+        combined = self._candidates(pd.concat(self._parts, ignore_index=True))
+        self._parts = [combined.reset_index(drop=True)]
+        self._buffered = self._kept = len(combined)
+
+    def buffered_rows(self) -> int:
+        """Rows held for the cuts right now."""
+        return self._buffered
+
+    def result(self) -> dict:
+        """The cuts over every row seen so far (the same shape as select_frame())."""
+        if not self._parts:
+            raise ValueError("no chunks have been added")
+        return select_frame(pd.concat(self._parts, ignore_index=True), self.cuts, self.score_column)
@@ -0,0 +1,268 @@
+"""
+Stage runner with content-addressed caching of intermediate results.
+
+A pipeline is a set of named Stages. Each stage declares the stages it
+depends on, the raw files it reads and the files it writes. Its cache key is
+the SHA-256 of:
+  - its name and parameters
+  - the source code of its function (and of any helpers or modules it lists)
+  - the fingerprints of its source files
+  - the output digests of the stages it depends on
+
+Results are pickled to data/cache/stages/<name>-<key>.joblib, with a sidecar
+.json recording the output digest and the hashes of the files the stage
+wrote. On the next run a stage whose key is unchanged, and whose written files
+are still intact, is skipped. Its result is only loaded from disk if a stage
+that does run needs it. Because keys chain through output digests, re-running
+a stage that produces identical output does not invalidate what follows.
+
+run_branches() runs independent groups of stages (branches that share no
+stages) in a process pool, with each branch's output in its own log file.
+"""
+import contextlib
+import hashlib
+import inspect
+import json
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable
+
+import joblib
+
+from data_cache import CACHE_DIR, file_sha256, source_fingerprint
+
+STAGE_CACHE_DIR = CACHE_DIR / 'stages'
+LOG_DIR = Path(__file__).parent / 'logs'
+
+# Bump to invalidate every cached stage result
+STAGE_CACHE_VERSION = 1
+
+
+class Stage:
+    """One step of a pipeline.
+
+    func is called with the results of deps (in order) followed by the paths in
+    sources. outputs lists files the stage writes as a side effect; code lists
+    the helpers and modules whose source should invalidate the cache besides
+    func itself. Stages with cache=False run every time.
+    """
+
+    def __init__(self, name: str, func: Callable, deps: list = (), sources: list = (),
+                 outputs: list = (), code: list = (), params: dict = None, cache: bool = True):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.sources = [Path(path) for path in sources]
+        self.outputs = [Path(path) for path in outputs]
+        self.code = list(code)
+        self.params = params or {}
+        self.cache = cache
+
+    def code_digest(self) -> str:
+        """Hash of the stage function's source and that of the functions/modules in code."""
+        digest = hashlib.sha256(inspect.getsource(self.func).encode())
+        for obj in self.code:
+            digest.update(inspect.getsource(obj).encode())
+        return digest.hexdigest()
+
+
+class Pipeline:
+    """Runs Stages in dependency order, reusing cached results."""
+
+    def __init__(self, stages: list, cache_dir: Path = STAGE_CACHE_DIR):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = Path(cache_dir)
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stage(s) {missing}")
+
+    def upstream(self, names: list) -> set:
+        """names plus every stage they depend on, directly or not."""
+        selected, pending = set(), list(names)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name].deps)
+        return selected
+
+    def run(self, targets: list = None, force: list = ()) -> list:
+        """Bring targets (default: every stage) up to date.
+
+        Stages in force are re-run even if cached. Returns one
+        (stage, status, seconds) tuple per stage visited, in run order.
+        """
+        unknown = [name for name in list(targets or []) + list(force) if name not in self.stages]
+        if unknown:
+            raise ValueError(f"unknown stage(s) {unknown}; choose from {', '.join(self.stages)}")
+
+        self._force = set(force)
+        self._digests = {}
+        self._entries = {}
+        self._values = {}
+        self._report = []
+        self._visiting = set()
+        for name in targets or self.stages:
+            self._resolve(name)
+        return self._report
+
+    def _key(self, stage: Stage) -> str:
+        payload = {
+            'stage': stage.name,
+            'cache_version': STAGE_CACHE_VERSION,
+            'params': stage.params,
+            'code': stage.code_digest(),
+            'sources': {str(path): source_fingerprint(path) for path in stage.sources},
+            'deps': {dep: self._digests[dep] for dep in stage.deps},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _cached_meta(self, stage: Stage, entry: Path):
+        """The entry's sidecar, if the entry exists and every written file is unchanged."""
+        meta_path = entry.with_suffix('.json')
+        if not (stage.cache and entry.exists() and meta_path.exists()):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        for path, sha256 in meta['outputs'].items():
+            if not Path(path).exists() or file_sha256(Path(path)) != sha256:
+                return None
+        return meta
+
+    def _resolve(self, name: str):
+        if name in self._digests:
+            return
+        if name in self._visiting:
+            raise ValueError(f"stage {name!r} is part of a dependency cycle")
+        self._visiting.add(name)
+        stage = self.stages[name]
+        for dep in stage.deps:
+            self._resolve(dep)
+        self._visiting.discard(name)
+
+        key = self._key(stage)
+        entry = self.cache_dir / f"{name}-{key[:16]}.joblib"
+        self._entries[name] = entry
+        meta = None if name in self._force else self._cached_meta(stage, entry)
+        if meta is not None:
+            self._digests[name] = meta['digest']
+            self._report.append((name, 'cached', 0.0))
+            return
+
+        print(f"\n[stage] {name}")
+        args = [self._value(dep) for dep in stage.deps] + stage.sources
+        start = time.perf_counter()
+        result = stage.func(*args)
+        seconds = time.perf_counter() - start
+        self._values[name] = result
+
+        if stage.cache:
+            self._store(stage, entry, key, result, seconds)
+        else:
+            self._digests[name] = key
+        self._report.append((name, 'forced' if name in self._force else 'ran', seconds))
+
+    def _store(self, stage: Stage, entry: Path, key: str, result, seconds: float):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.cache_dir.glob(f"{stage.name}-*"):
+            stale.unlink()
+        tmp_path = entry.with_suffix('.joblib.tmp')
+        joblib.dump(result, tmp_path)
+        tmp_path.replace(entry)
+
+        digest = file_sha256(entry)
+        meta = {
+            'stage': stage.name,
+            'key': key,
+            'digest': digest,
+            'seconds': round(seconds, 3),
+            'outputs': {str(path): file_sha256(path) for path in stage.outputs if path.exists()},
+        }
+        with open(entry.with_suffix('.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        self._digests[stage.name] = digest
+
+    def _value(self, name: str):
+        """A stage's result, loading it from the cache if it was skipped."""
+        if name not in self._values:
+            self._values[name] = joblib.load(self._entries[name])
+        return self._values[name]
+
+
+def print_run_report(report: list):
+    """Table of what each stage did and how long it took."""
+    print("\n" + "=" * 60)
+    print("PIPELINE STAGES")
+    print("=" * 60)
+    print(f"{'stage':<14} {'status':>8} {'seconds':>10}")
+    for name, status, seconds in report:
+        print(f"{name:<14} {status:>8} {seconds:>10.2f}")
+    ran = sum(1 for _, status, _ in report if status != 'cached')
+    print(f"{ran} of {len(report)} stages ran, {sum(s for _, _, s in report):.1f}s total")
+
+
+def _run_branch(factory: Callable, name: str, targets: list, force: list, log_dir: Path):
+    """Worker process: run one branch with its output sent to log_dir/<name>.log."""
+    log_path = Path(log_dir) / f"{name}.log"
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            report = factory().run(targets, force)
+        except Exception:
+            traceback.print_exc()
+            raise
+    return name, report, time.perf_counter() - start, log_path
+
+
+def run_branches(factory: Callable, branches: dict, jobs: int, force: list = (),
+                 log_dir: Path = LOG_DIR) -> list:
+    """Run each {name: targets} branch in a pool of jobs processes.
+
+    factory must be a module-level function returning the Pipeline, so worker
+    processes can rebuild it. Branches must not share stages, since each
+    process writes the cache entries of the stages it runs. Returns
+    (name, report, seconds, log_path) per branch, in completion order.
+    """
+    pipeline = factory()
+    seen = {}
+    for name, targets in branches.items():
+        for stage in pipeline.upstream(targets):
+            if stage in seen:
+                raise ValueError(f"stage {stage!r} is in both the {seen[stage]!r} and {name!r} branches")
+            seen[stage] = name
+
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(_run_branch, factory, name, targets, list(force), log_dir): name
+            for name, targets in branches.items()
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                raise RuntimeError(
+                    f"branch {futures[future]!r} failed (see {log_dir / futures[future]}.log)"
+                ) from exc
+            name, report, seconds, log_path = result
+            print(f"  {name} finished in {seconds:.1f}s ({log_path})")
+            results.append(result)
+    return results
+
+
+def print_branch_report(results: list, wall_seconds: float):
+    """Per-branch timings and the speedup over running them back to back."""
+    print("\n" + "=" * 60)
+    print("PARALLEL BRANCHES")
+    print("=" * 60)
+    print(f"{'branch':<14} {'seconds':>8} {'stages run':>11}  log")
+    for name, report, seconds, log_path in results:
+        ran = sum(1 for _, status, _ in report if status != 'cached')
+        print(f"{name:<14} {seconds:>8.1f} {f'{ran}/{len(report)}':>11}  {log_path}")
+    sequential = sum(seconds for _, _, seconds, _ in results)
+    print(f"Wall time {wall_seconds:.1f}s; back to back {sequential:.1f}s")
@@ -0,0 +1,240 @@
+"""
+Synthetic state and hospital readmission data for the v2 dashboard exports.
+
+Each state draws from its own seeded Generator, so a state's values do not
+depend on which other states are generated. All of a state's hospitals are
+drawn in one call. Each row holds a hospital's rate and penalty draws, so a
+larger scale only adds hospitals after the ones a smaller run produced. The
+full CMS hospital count is generated (4,692 at scale 1); scale=100 gives a
+load-testing sized file.
+
+Hospitals also get coordinates for the geographic exports (geo.py). These
+come from a second per-state generator, so they leave the rate and penalty
+draws unchanged. Cities are placed around the state centroid and hospitals
+around their city. The positions are synthetic, not real city locations.
+"""
+import numpy as np
+import pandas as pd
+
+SEED = 42
+AVG_MEDICARE_PER_HOSPITAL = 5_000_000
+
+# (rate above which the tier applies, penalty % range), checked in order.
+# CMS penalizes hospitals with excess readmission ratios > 1.0
+STATE_PENALTY_TIERS = [(15.5, (0.5, 2.0)), (14.5, (0.2, 0.8)), (-np.inf, (0, 0.3))]
+HOSPITAL_PENALTY_TIERS = [(15.5, (0.5, 2.5)), (14.5, (0.1, 1.0)), (-np.inf, (0, 0.4))]
+STATE_RATE_SPREAD = 0.8
+HOSPITAL_RATE_SPREAD = 2.0
+
+# Degrees of latitude; longitude offsets are widened by 1/cos(lat) so the
+# spread is about the same distance everywhere
+CITY_SPREAD_DEG = 1.0
+HOSPITAL_SPREAD_DEG = 0.05
+
+# All 50 states + DC with coordinates and realistic data
+# Based on actual CMS HRRP data patterns
+STATE_DATA = {
+    'AL': {'name': 'Alabama', 'lat': 32.806671, 'lng': -86.791130, 'hospitals': 98, 'base_rate': 16.2},
+    'AK': {'name': 'Alaska', 'lat': 61.370716, 'lng': -152.404419, 'hospitals': 22, 'base_rate': 13.8},
+    'AZ': {'name': 'Arizona', 'lat': 33.729759, 'lng': -111.431221, 'hospitals': 77, 'base_rate': 14.9},
+    'AR': {'name': 'Arkansas', 'lat': 34.969704, 'lng': -92.373123, 'hospitals': 78, 'base_rate': 16.5},
+    'CA': {'name': 'California', 'lat': 36.116203, 'lng': -119.681564, 'hospitals': 341, 'base_rate': 14.2},
+    'CO': {'name': 'Colorado', 'lat': 39.059811, 'lng': -105.311104, 'hospitals': 78, 'base_rate': 13.1},
+    'CT': {'name': 'Connecticut', 'lat': 41.597782, 'lng': -72.755371, 'hospitals': 32, 'base_rate': 14.8},
+    'DE': {'name': 'Delaware', 'lat': 39.318523, 'lng': -75.507141, 'hospitals': 8, 'base_rate': 15.1},
+    'FL': {'name': 'Florida', 'lat': 27.766279, 'lng': -81.686783, 'hospitals': 193, 'base_rate': 15.4},
+    'GA': {'name': 'Georgia', 'lat': 33.040619, 'lng': -83.643074, 'hospitals': 139, 'base_rate': 15.8},
+    'HI': {'name': 'Hawaii', 'lat': 21.094318, 'lng': -157.498337, 'hospitals': 15, 'base_rate': 12.9},
+    'ID': {'name': 'Idaho', 'lat': 44.240459, 'lng': -114.478828, 'hospitals': 38, 'base_rate': 13.4},
+    'IL': {'name': 'Illinois', 'lat': 40.349457, 'lng': -88.986137, 'hospitals': 178, 'base_rate': 15.6},
+    'IN': {'name': 'Indiana', 'lat': 39.849426, 'lng': -86.258278, 'hospitals': 118, 'base_rate': 15.3},
+    'IA': {'name': 'Iowa', 'lat': 42.011539, 'lng': -93.210526, 'hospitals': 116, 'base_rate': 14.1},
+    'KS': {'name': 'Kansas', 'lat': 38.526600, 'lng': -96.726486, 'hospitals': 127, 'base_rate': 14.5},
+    'KY': {'name': 'Kentucky', 'lat': 37.668140, 'lng': -84.670067, 'hospitals': 96, 'base_rate': 16.8},
+    'LA': {'name': 'Louisiana', 'lat': 31.169546, 'lng': -91.867805, 'hospitals': 109, 'base_rate': 17.1},
+    'ME': {'name': 'Maine', 'lat': 44.693947, 'lng': -69.381927, 'hospitals': 36, 'base_rate': 14.2},
+    'MD': {'name': 'Maryland', 'lat': 39.063946, 'lng': -76.802101, 'hospitals': 47, 'base_rate': 15.7},
+    'MA': {'name': 'Massachusetts', 'lat': 42.230171, 'lng': -71.530106, 'hospitals': 68, 'base_rate': 14.5},
+    'MI': {'name': 'Michigan', 'lat': 43.326618, 'lng': -84.536095, 'hospitals': 134, 'base_rate': 15.2},
+    'MN': {'name': 'Minnesota', 'lat': 45.694454, 'lng': -93.900192, 'hospitals': 131, 'base_rate': 12.8},
+    'MS': {'name': 'Mississippi', 'lat': 32.741646, 'lng': -89.678696, 'hospitals': 83, 'base_rate': 17.4},
+    'MO': {'name': 'Missouri', 'lat': 38.456085, 'lng': -92.288368, 'hospitals': 113, 'base_rate': 15.9},
+    'MT': {'name': 'Montana', 'lat': 46.921925, 'lng': -110.454353, 'hospitals': 48, 'base_rate': 13.2},
+    'NE': {'name': 'Nebraska', 'lat': 41.125370, 'lng': -98.268082, 'hospitals': 89, 'base_rate': 13.9},
+    'NV': {'name': 'Nevada', 'lat': 38.313515, 'lng': -117.055374, 'hospitals': 32, 'base_rate': 15.1},
+    'NH': {'name': 'New Hampshire', 'lat': 43.452492, 'lng': -71.563896, 'hospitals': 26, 'base_rate': 13.7},
+    'NJ': {'name': 'New Jersey', 'lat': 40.298904, 'lng': -74.521011, 'hospitals': 71, 'base_rate': 16.1},
+    'NM': {'name': 'New Mexico', 'lat': 34.840515, 'lng': -106.248482, 'hospitals': 40, 'base_rate': 14.3},
+    'NY': {'name': 'New York', 'lat': 42.165726, 'lng': -74.948051, 'hospitals': 183, 'base_rate': 15.4},
+    'NC': {'name': 'North Carolina', 'lat': 35.630066, 'lng': -79.806419, 'hospitals': 112, 'base_rate': 15.1},
+    'ND': {'name': 'North Dakota', 'lat': 47.528912, 'lng': -99.784012, 'hospitals': 42, 'base_rate': 12.6},
+    'OH': {'name': 'Ohio', 'lat': 40.388783, 'lng': -82.764915, 'hospitals': 167, 'base_rate': 15.8},
+    'OK': {'name': 'Oklahoma', 'lat': 35.565342, 'lng': -96.928917, 'hospitals': 112, 'base_rate': 16.4},
+    'OR': {'name': 'Oregon', 'lat': 44.572021, 'lng': -122.070938, 'hospitals': 58, 'base_rate': 13.5},
+    'PA': {'name': 'Pennsylvania', 'lat': 40.590752, 'lng': -77.209755, 'hospitals': 170, 'base_rate': 15.3},
+    'RI': {'name': 'Rhode Island', 'lat': 41.680893, 'lng': -71.511780, 'hospitals': 11, 'base_rate': 14.9},
+    'SC': {'name': 'South Carolina', 'lat': 33.856892, 'lng': -80.945007, 'hospitals': 63, 'base_rate': 15.6},
+    'SD': {'name': 'South Dakota', 'lat': 44.299782, 'lng': -99.438828, 'hospitals': 53, 'base_rate': 12.9},
+    'TN': {'name': 'Tennessee', 'lat': 35.747845, 'lng': -86.692345, 'hospitals': 116, 'base_rate': 16.3},
+    'TX': {'name': 'Texas', 'lat': 31.054487, 'lng': -97.563461, 'hospitals': 378, 'base_rate': 15.2},
+    'UT': {'name': 'Utah', 'lat': 40.150032, 'lng': -111.862434, 'hospitals': 42, 'base_rate': 12.4},
+    'VT': {'name': 'Vermont', 'lat': 44.045876, 'lng': -72.710686, 'hospitals': 14, 'base_rate': 13.1},
+    'VA': {'name': 'Virginia', 'lat': 37.769337, 'lng': -78.169968, 'hospitals': 89, 'base_rate': 14.7},
+    'WA': {'name': 'Washington', 'lat': 47.400902, 'lng': -121.490494, 'hospitals': 88, 'base_rate': 13.3},
+    'WV': {'name': 'West Virginia', 'lat': 38.491226, 'lng': -80.954453, 'hospitals': 55, 'base_rate': 17.2},
+    'WI': {'name': 'Wisconsin', 'lat': 44.268543, 'lng': -89.616508, 'hospitals': 125, 'base_rate': 13.6},
+    'WY': {'name': 'Wyoming', 'lat': 42.755966, 'lng': -107.302490, 'hospitals': 25, 'base_rate': 13.0},
+    'DC': {'name': 'District of Columbia', 'lat': 38.897438, 'lng': -77.026817, 'hospitals': 8, 'base_rate': 16.5},
+}
+
+HOSPITAL_NAMES = [
+    "Regional Medical Center", "Community Hospital", "Memorial Hospital",
+    "University Hospital", "St. Mary's Hospital", "General Hospital",
+    "Medical Center", "Health System", "County Hospital", "Baptist Hospital",
+    "Methodist Hospital", "Presbyterian Hospital", "Mercy Hospital",
+    "Providence Hospital", "Sacred Heart Hospital", "Good Samaritan Hospital"
+]
+
+CITIES_BY_STATE = {
+    'AL': ['Birmingham', 'Montgomery', 'Mobile', 'Huntsville'],
+    'AK': ['Anchorage', 'Fairbanks', 'Juneau'],
+    'AZ': ['Phoenix', 'Tucson', 'Mesa', 'Scottsdale'],
+    'AR': ['Little Rock', 'Fort Smith', 'Fayetteville'],
+    'CA': ['Los Angeles', 'San Francisco', 'San Diego', 'Sacramento', 'San Jose'],
+    'CO': ['Denver', 'Colorado Springs', 'Aurora', 'Boulder'],
+    'CT': ['Hartford', 'New Haven', 'Stamford', 'Bridgeport'],
+    'DE': ['Wilmington', 'Dover', 'Newark'],
+    'FL': ['Miami', 'Orlando', 'Tampa', 'Jacksonville', 'Fort Lauderdale'],
+    'GA': ['Atlanta', 'Savannah', 'Augusta', 'Columbus'],
+    'HI': ['Honolulu', 'Hilo', 'Kailua'],
+    'ID': ['Boise', 'Meridian', 'Nampa'],
+    'IL': ['Chicago', 'Springfield', 'Peoria', 'Rockford'],
+    'IN': ['Indianapolis', 'Fort Wayne', 'Evansville', 'South Bend'],
+    'IA': ['Des Moines', 'Cedar Rapids', 'Davenport'],
+    'KS': ['Wichita', 'Kansas City', 'Topeka', 'Overland Park'],
+    'KY': ['Louisville', 'Lexington', 'Bowling Green'],
+    'LA': ['New Orleans', 'Baton Rouge', 'Shreveport'],
+    'ME': ['Portland', 'Lewiston', 'Bangor'],
+    'MD': ['Baltimore', 'Rockville', 'Frederick', 'Bethesda'],
+    'MA': ['Boston', 'Worcester', 'Springfield', 'Cambridge'],
+    'MI': ['Detroit', 'Grand Rapids', 'Ann Arbor', 'Lansing'],
+    'MN': ['Minneapolis', 'St. Paul', 'Rochester', 'Duluth'],
+    'MS': ['Jackson', 'Gulfport', 'Hattiesburg'],
+    'MO': ['St. Louis', 'Kansas City', 'Springfield', 'Columbia'],
+    'MT': ['Billings', 'Missoula', 'Great Falls'],
+    'NE': ['Omaha', 'Lincoln', 'Bellevue'],
+    'NV': ['Las Vegas', 'Reno', 'Henderson'],
+    'NH': ['Manchester', 'Nashua', 'Concord'],
+    'NJ': ['Newark', 'Jersey City', 'Trenton', 'Camden'],
+    'NM': ['Albuquerque', 'Santa Fe', 'Las Cruces'],
+    'NY': ['New York', 'Buffalo', 'Rochester', 'Albany', 'Syracuse'],
+    'NC': ['Charlotte', 'Raleigh', 'Durham', 'Greensboro'],
+    'ND': ['Fargo', 'Bismarck', 'Grand Forks'],
+    'OH': ['Columbus', 'Cleveland', 'Cincinnati', 'Toledo', 'Akron'],
+    'OK': ['Oklahoma City', 'Tulsa', 'Norman'],
+    'OR': ['Portland', 'Salem', 'Eugene', 'Bend'],
+    'PA': ['Philadelphia', 'Pittsburgh', 'Allentown', 'Erie'],
+    'RI': ['Providence', 'Warwick', 'Cranston'],
+    'SC': ['Charleston', 'Columbia', 'Greenville'],
+    'SD': ['Sioux Falls', 'Rapid City', 'Aberdeen'],
+    'TN': ['Nashville', 'Memphis', 'Knoxville', 'Chattanooga'],
+    'TX': ['Houston', 'Dallas', 'Austin', 'San Antonio', 'Fort Worth'],
+    'UT': ['Salt Lake City', 'Provo', 'Ogden'],
+    'VT': ['Burlington', 'Montpelier', 'Rutland'],
+    'VA': ['Virginia Beach', 'Richmond', 'Norfolk', 'Arlington'],
+    'WA': ['Seattle', 'Spokane', 'Tacoma', 'Vancouver'],
+    'WV': ['Charleston', 'Huntington', 'Morgantown'],
+    'WI': ['Milwaukee', 'Madison', 'Green Bay'],
+    'WY': ['Cheyenne', 'Casper', 'Laramie'],
+    'DC': ['Washington'],
+}
+
+
+def state_generator(state_code: str, seed: int = SEED, stream: int = 0) -> np.random.Generator:
+    """The generator behind one state's draws, keyed on the seed, the state code and stream."""
+    return np.random.default_rng([seed, *state_code.encode(), stream])
+
+
+def penalty_pct(rates: np.ndarray, draws: np.ndarray, tiers: list) -> np.ndarray:
+    """Scale uniform [0, 1) draws into the penalty range of each rate's tier."""
+    above = [rates > bound for bound, _ in tiers]
+    low = np.select(above, [low for _, (low, _) in tiers])
+    high = np.select(above, [high for _, (_, high) in tiers])
+    return low + (high - low) * draws
+
+
+def hospital_names(state_code: str, count: int) -> tuple:
+    """(names, cities) object arrays for count hospitals, cycling cities then names.
+
+    Once every city/name pair is used, repeats get a 2, 3, ... suffix.
+    """
+    cities = CITIES_BY_STATE.get(state_code, ['City'])
+    period = len(cities) * len(HOSPITAL_NAMES)
+    index = np.arange(count)
+    pairs = np.array([f"{cities[i % len(cities)]} {HOSPITAL_NAMES[i // len(cities)]}"
+                      for i in range(period)], dtype=object)
+    suffixes = np.array([''] + [f" {n}" for n in range(2, (count - 1) // period + 2)], dtype=object)
+    names = pairs[index % period] + suffixes[index // period]
+    city = np.array(cities, dtype=object)[index % len(cities)]
+    return names, city
+
+
+def hospital_coordinates(state_code: str, count: int, seed: int = SEED) -> tuple:
+    """(lat, lng) arrays for count hospitals, scattered around their city (same cycle as hospital_names).
+
+    A state with a single city has it at the state centroid.
+    """
+    info = STATE_DATA[state_code]
+    cities = CITIES_BY_STATE.get(state_code, ['City'])
+    rng = state_generator(state_code, seed, stream=1)
+    city_offsets = rng.uniform(-CITY_SPREAD_DEG, CITY_SPREAD_DEG, (len(cities), 2))
+    if len(cities) == 1:
+        city_offsets[:] = 0
+    offsets = city_offsets[np.arange(count) % len(cities)] + rng.normal(0, HOSPITAL_SPREAD_DEG, (count, 2))
+    lat = info['lat'] + offsets[:, 0]
+    return lat, info['lng'] + offsets[:, 1] / np.cos(np.radians(lat))
+
+
+def synthetic_state_data(scale: int = 1, seed: int = SEED):
+    """(states, hospitals) DataFrames; states keep the real hospital counts whatever the scale."""
+    states, hospitals = [], []
+    # Facility ids are the state code plus a 5-digit number
+    numbers = np.array([f"{number:05d}" for number in
+                        range(1, max(info['hospitals'] for info in STATE_DATA.values()) * scale + 1)], dtype=object)
+    for state_code, info in STATE_DATA.items():
+        rng = state_generator(state_code, seed)
+        rate_draw, penalty_draw = rng.random(2).tolist()
+        draws = rng.random((info['hospitals'] * scale, 2))
+
+        avg_rate = info['base_rate'] + STATE_RATE_SPREAD * (2 * rate_draw - 1)
+        state_penalty = float(penalty_pct(np.array([avg_rate]), penalty_draw, STATE_PENALTY_TIERS)[0])
+        states.append({
+            'state': state_code,
+            'name': info['name'],
+            'lat': info['lat'],
+            'lng': info['lng'],
+            'hospital_count': info['hospitals'],
+            'avg_readmission_rate': round(avg_rate, 1),
+            'avg_penalty_pct': round(state_penalty, 2),
+            'total_penalty_estimate': round(info['hospitals'] * AVG_MEDICARE_PER_HOSPITAL * state_penalty / 100, 0),
+        })
+
+        rates = info['base_rate'] + HOSPITAL_RATE_SPREAD * (2 * draws[:, 0] - 1)
+        names, cities = hospital_names(state_code, len(draws))
+        ids = state_code + numbers[:len(draws)]
+        hospitals.append((ids, names, np.full(len(draws), state_code, dtype=object), cities,
+                          *hospital_coordinates(state_code, len(draws), seed),
+                          rates, penalty_pct(rates, draws[:, 1], HOSPITAL_PENALTY_TIERS)))
+
+    ids, names, codes, cities, lat, lng, rates, penalties = (
+        np.concatenate(column) for column in zip(*hospitals))
+    return pd.DataFrame(states), pd.DataFrame({
+        'facility_id': ids,
+        'hospital_name': names,
+        'state': codes,
+        'city': cities,
+        'lat': np.round(lat, 5),
+        'lng': np.round(lng, 5),
+        'readmission_rate': np.round(rates, 1),
+        'penalty_pct': np.round(penalties, 2),
+    })
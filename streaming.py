@@ -0,0 +1,235 @@
+"""
+Chunked scoring for encounter files larger than memory.
+
+The input CSV is read in fixed-size chunks. Each chunk is deduplicated against
+the patients already seen, featurized, encoded with the fitted FeatureEncoder,
+scaled and scored, then written straight to the outputs:
+  - scored_patients.csv   risk_score / estimated_cost for every patient (appended per chunk)
+  - patient_risks.json    all patients at >= 60% risk, sorted by risk
+  - risk_summary.json     risk-bin histogram, age-group means and tier totals
+                          (an aggregation.RiskAggregate updated per chunk)
+
+The input need not have the readmitted column (new, unlabelled encounters).
+Without it the outputs leave out readmitted_30day and readmission_rate_overall.
+
+Each chunk's high-risk rows are sorted and spilled to a Parquet run in a
+temporary directory under the output directory (HighRiskRuns). At the end the
+runs are merged (heapq.merge, one record batch per run in memory) straight
+into patient_risks.json, and the median high-risk score is read off the merge
+at the middle positions. The RiskAggregate keeps only counters and per-tier
+sums, not per-patient arrays.
+
+The one structure that grows with the input is the seen-patient set
+(modeling.SeenPatients): one entry per unique patient_nbr, so memory is
+O(unique patients), not O(encounters). Deduplication keeps the first
+encounter per patient, which matches the in-memory pipeline when the input
+is in encounter_id order (as the UCI extract and claims feeds are).
+
+Usage:
+    python streaming.py --input data/raw/diabetic_data.csv --chunk-size 100000
+"""
+import argparse
+import heapq
+import json
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aggregation import HIGH_RISK_THRESHOLD, RiskAggregate
+from export_formats import write_records_stream
+from features import add_derived_features, fill_missing
+from modeling import (
+    MODEL_COLS, READMISSION_COST, TARGET, EXPORT_COLUMNS, add_target,
+    prepare_patients, encode_features, fit_readmission_model, predict_risk,
+    patient_export_frame, SeenPatients
+)
+from schema import read_uci_csv
+from selection import descending_order
+
+warnings.filterwarnings('ignore')
+
+DATA_DIR = Path(__file__).parent / 'data' / 'raw'
+OUTPUT_DIR = Path(__file__).parent / 'data' / 'processed' / 'streaming'
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Runs are merged into one once there are this many, to bound open files
+MAX_RUNS = 64
+MERGE_BATCH_ROWS = 4096
+# Unrounded risk score stored with each spilled row, for the merge order
+SORT_KEY = '_risk'
+
+
+def _records(df: pd.DataFrame) -> list:
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*(df[column].tolist() for column in columns))]
+
+
+class HighRiskRuns:
+    """The >= 60% export rows of a stream, kept on disk as runs sorted by risk.
+
+    merged() yields every row highest risk first, ties in stream order
+    (patient_id order), which is the order the in-memory export sorts into.
+    """
+
+    def __init__(self, spill_dir: Path):
+        self.spill_dir = Path(spill_dir)
+        self.runs = []
+        self.rows = 0
+        self._schema = None
+        self._next_run = 0
+
+    def add(self, scored: pd.DataFrame):
+        """Spill the high-risk rows of one scored chunk as a sorted run."""
+        risk = scored['risk_score'].to_numpy()
+        rows = np.flatnonzero(risk >= HIGH_RISK_THRESHOLD)
+        if not len(rows):
+            return
+        rows = rows[descending_order(risk[rows])]
+        run = patient_export_frame(scored.take(rows))
+        run[SORT_KEY] = risk[rows]
+        table = pa.Table.from_pandas(run, schema=self._schema, preserve_index=False)
+        self._schema = table.schema
+        path = self._new_run()
+        pq.write_table(table, path)
+        self.runs.append(path)
+        self.rows += len(run)
+        if len(self.runs) >= MAX_RUNS:
+            self._merge_runs()
+
+    def _new_run(self) -> Path:
+        self._next_run += 1
+        return self.spill_dir / f'run-{self._next_run:06d}.parquet'
+
+    def _read(self, path: Path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=MERGE_BATCH_ROWS):
+            frame = batch.to_pandas()
+            keys = frame.pop(SORT_KEY).tolist()
+            for key, patient_id, record in zip(keys, frame['patient_id'].tolist(), _records(frame)):
+                yield -key, patient_id, record
+
+    def _merged(self):
+        # patient_id is unique, so the records themselves are never compared
+        return heapq.merge(*(self._read(path) for path in self.runs))
+
+    def _merge_runs(self):
+        merged = self._merged()
+        path = self._new_run()
+        with pq.ParquetWriter(path, self._schema) as writer:
+            while True:
+                batch = [(key, record) for _, (key, _, record) in zip(range(MERGE_BATCH_ROWS), merged)]
+                if not batch:
+                    break
+                frame = pd.DataFrame([record for _, record in batch])
+                frame[SORT_KEY] = [-key for key, _ in batch]
+                writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        for old in self.runs:
+            old.unlink()
+        self.runs = [path]
+
+    def merged(self):
+        """(risk score, export record) for every spilled row, highest risk first."""
+        for key, _, record in self._merged():
+            yield -key, record
+
+
+def score_stream(source: Path, encoder, scaler, model, output_dir: Path = OUTPUT_DIR,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, model_auc: float = None) -> dict:
+    """Score source chunk by chunk and write the streaming outputs. Returns the risk summary."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    scored_path = output_dir / 'scored_patients.csv'
+    if scored_path.exists():
+        scored_path.unlink()
+
+    stats = RiskAggregate(keep_high_risk=False)
+    seen_patients = SeenPatients()
+    next_patient_id = 1
+
+    with tempfile.TemporaryDirectory(prefix='.high-risk-runs-', dir=output_dir) as spill_dir:
+        high_risk = HighRiskRuns(spill_dir)
+        for chunk_number, chunk in enumerate(read_uci_csv(source, chunksize=chunk_size), start=1):
+            labelled = 'readmitted' in chunk.columns
+            if labelled:
+                chunk = add_target(chunk)
+
+            # First encounter per patient, across chunks as well as within this one
+            chunk = seen_patients.first_encounters(chunk)
+            if chunk.empty:
+                continue
+
+            chunk = add_derived_features(chunk)
+            risk = predict_risk(encoder.transform(chunk), scaler, model)
+
+            scored = chunk[['patient_nbr'] + [col for col in MODEL_COLS if col in chunk.columns]].copy()
+            # Missing ages etc. take the training medians, as in the in-memory pipeline's
+            # fill_missing(), so they count in the age-group means and export filled
+            fill_missing(scored, categorical_features=[], medians=encoder.medians)
+            scored['risk_score'] = risk
+            scored['estimated_cost'] = (risk / 100) * READMISSION_COST
+            scored['patient_id'] = np.arange(next_patient_id, next_patient_id + len(scored))
+            next_patient_id += len(scored)
+
+            stats.update(risk, scored['estimated_cost'].to_numpy(),
+                         scored['age_numeric'].to_numpy(), scored[TARGET].to_numpy() if labelled else None)
+
+            outcome = [TARGET] if labelled else []
+            scored[['patient_id', 'patient_nbr', 'risk_score', 'estimated_cost'] + outcome].to_csv(
+                scored_path, mode='a', header=(stats.total == len(scored)), index=False
+            )
+
+            high_risk.add(scored[[col for col in EXPORT_COLUMNS if col in scored.columns]])
+            print(f"  Chunk {chunk_number}: {stats.total:,} patients scored, "
+                  f"{high_risk.rows:,} high-risk")
+
+        # The median of the high-risk scores sits at the middle of the merge
+        middle = {(high_risk.rows - 1) // 2, high_risk.rows // 2}
+        middle_scores = []
+
+        def records():
+            for position, (risk_score, record) in enumerate(high_risk.merged()):
+                if position in middle:
+                    middle_scores.append(risk_score)
+                yield record
+
+        exported = write_records_stream(records(), output_dir / 'patient_risks.json')
+        print(f"Exported patient_risks.json ({exported} high-risk patients)")
+
+    median_risk = (middle_scores[0] + middle_scores[-1]) / 2 if middle_scores else None
+    risk_summary = stats.summary(model_auc=model_auc, median_risk=median_risk)
+
+    with open(output_dir / 'risk_summary.json', 'w') as f:
+        json.dump(risk_summary, f, indent=2)
+    print(f"Exported risk_summary.json ({stats.total:,} patients)")
+    return risk_summary
+
+
+def train_on_sample(source: Path, train_rows: int):
+    """Fit the encoder, scaler and model on the first train_rows encounters."""
+    df = read_uci_csv(source, nrows=train_rows)
+    print(f"Training on {len(df):,} encounters")
+    df_model = fill_missing(prepare_patients(df)[MODEL_COLS])
+    X, y, encoder = encode_features(df_model)
+    scaler, model, roc_auc, _ = fit_readmission_model(X, y)
+    return encoder, scaler, model, roc_auc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score an encounter file in fixed-size chunks.")
+    parser.add_argument('--input', type=Path, default=DATA_DIR / 'diabetic_data.csv')
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--train-rows', type=int, default=200_000,
+                        help='encounters read from the head of the input to fit the model')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("STREAMING RISK SCORING")
+    print("=" * 60)
+
+    encoder, scaler, model, roc_auc = train_on_sample(args.input, args.train_rows)
+    score_stream(args.input, encoder, scaler, model, args.output_dir, args.chunk_size, roc_auc)
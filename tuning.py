@@ -0,0 +1,161 @@
+"""
+Cross-validated hyperparameter search for the readmission model.
+
+Searches C, penalty/solver and the class-imbalance strategy (SMOTE vs.
+class_weight='balanced') with stratified k-fold CV. Each (fold, strategy) pair
+is one parallel task: it resamples the training fold (SMOTE is applied inside
+the fold only, never to the validation rows), scales it once, then walks
+each penalty/solver along the C path from strongest to weakest regularization
+with warm_start, so every fit starts from the previous solution.
+
+Writes a leaderboard (mean/std ROC-AUC, average precision and fit time per
+config, best first) to models/tuning_leaderboard.csv.
+
+Usage:
+    python tuning.py --folds 5 --jobs -1
+    python tuning.py --c-values 0.01 0.1 1 --strategies smote
+"""
+import argparse
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE
+from joblib import Parallel, delayed
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score, average_precision_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from data_cache import load_uci_encounters, DATA_DIR
+from features import fill_missing
+from model_artifact import MODEL_DIR
+from modeling import MODEL_COLS, prepare_patients, encode_features
+
+# Loose C values hit max_iter
+warnings.filterwarnings('ignore', category=ConvergenceWarning)
+
+LEADERBOARD_PATH = MODEL_DIR / 'tuning_leaderboard.csv'
+
+DEFAULT_C_VALUES = [0.001, 0.01, 0.1, 1.0, 10.0]
+# (penalty, solver) pairs; both solvers support warm_start
+DEFAULT_PENALTIES = [('l2', 'lbfgs'), ('l1', 'saga')]
+# sklearn >= 1.8 sets the penalty through l1_ratio (penalty= is deprecated)
+L1_RATIOS = {'l2': 0.0, 'l1': 1.0}
+STRATEGIES = ['smote', 'class_weight']
+
+# The configuration fit_readmission_model() uses today
+BASELINE = {'strategy': 'smote', 'penalty': 'l2', 'solver': 'lbfgs', 'C': 0.1}
+
+
+def _fold_task(X: np.ndarray, y: np.ndarray, train_idx, val_idx, fold: int, strategy: str,
+               penalties: list, c_values: list, max_iter: int) -> list:
+    """Fit every penalty/C config on one fold with one imbalance strategy."""
+    X_train, y_train = X[train_idx], y[train_idx]
+    start = time.perf_counter()
+    if strategy == 'smote':
+        X_train, y_train = SMOTE(random_state=42).fit_resample(X_train, y_train)
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_val = scaler.transform(X[val_idx])
+    prep_seconds = time.perf_counter() - start
+
+    rows = []
+    for penalty, solver in penalties:
+        model = LogisticRegression(
+            l1_ratio=L1_RATIOS[penalty], solver=solver, max_iter=max_iter, random_state=42, warm_start=True,
+            class_weight='balanced' if strategy == 'class_weight' else None
+        )
+        for C in sorted(c_values):
+            model.set_params(C=C)
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+            proba = model.predict_proba(X_val)[:, 1]
+            rows.append({
+                'strategy': strategy, 'penalty': penalty, 'solver': solver, 'C': C, 'fold': fold,
+                'roc_auc': roc_auc_score(y[val_idx], proba),
+                'avg_precision': average_precision_score(y[val_idx], proba),
+                'fit_seconds': fit_seconds,
+                'prep_seconds': prep_seconds,
+                'n_iter': int(model.n_iter_[0]),
+            })
+    return rows
+
+
+def search(X, y, folds: int = 5, jobs: int = -1, c_values: list = DEFAULT_C_VALUES,
+           penalties: list = DEFAULT_PENALTIES, strategies: list = STRATEGIES,
+           max_iter: int = 1000) -> pd.DataFrame:
+    """Per-fold scores for every config (one row per config per fold)."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    tasks = [
+        delayed(_fold_task)(X, y, train_idx, val_idx, fold, strategy, penalties, c_values, max_iter)
+        for fold, (train_idx, val_idx) in enumerate(splitter.split(X, y))
+        for strategy in strategies
+    ]
+    results = Parallel(n_jobs=jobs)(tasks)
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def leaderboard(fold_scores: pd.DataFrame) -> pd.DataFrame:
+    """Mean and spread over folds per config, best ROC-AUC first."""
+    board = fold_scores.groupby(['strategy', 'penalty', 'solver', 'C']).agg(
+        roc_auc=('roc_auc', 'mean'),
+        roc_auc_std=('roc_auc', 'std'),
+        avg_precision=('avg_precision', 'mean'),
+        fit_seconds=('fit_seconds', 'mean'),
+        prep_seconds=('prep_seconds', 'mean'),
+        n_iter=('n_iter', 'mean'),
+    ).reset_index()
+    board = board.sort_values(['roc_auc', 'avg_precision'], ascending=False).reset_index(drop=True)
+    board.insert(0, 'rank', np.arange(1, len(board) + 1))
+    return board
+
+
+def load_training_matrix():
+    """(X, y) exactly as run_patient_modeling() builds them."""
+    df_model = fill_missing(prepare_patients(load_uci_encounters(DATA_DIR))[MODEL_COLS])
+    X, y, _ = encode_features(df_model)
+    return X, y
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated search over the readmission model's settings.")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1, help='worker processes (-1 = all cores)')
+    parser.add_argument('--c-values', type=float, nargs='+', default=DEFAULT_C_VALUES)
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument('--penalties', nargs='+', choices=[p for p, _ in DEFAULT_PENALTIES],
+                        default=[p for p, _ in DEFAULT_PENALTIES])
+    parser.add_argument('--max-iter', type=int, default=1000)
+    parser.add_argument('--output', type=Path, default=LEADERBOARD_PATH)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("HYPERPARAMETER SEARCH")
+    print("=" * 60)
+    X, y = load_training_matrix()
+    penalties = [(p, solver) for p, solver in DEFAULT_PENALTIES if p in args.penalties]
+    n_configs = len(args.c_values) * len(penalties) * len(args.strategies)
+    print(f"{n_configs} configs x {args.folds} folds on {len(X):,} patients")
+
+    start = time.perf_counter()
+    board = leaderboard(search(X, y, args.folds, args.jobs, args.c_values, penalties,
+                               args.strategies, args.max_iter))
+    print(f"Search took {time.perf_counter() - start:.1f}s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    board.to_csv(args.output, index=False, float_format='%.6g')
+    print(f"Leaderboard written to {args.output}\n")
+    print(board.head(10).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    baseline = board[(board[list(BASELINE)] == pd.Series(BASELINE)).all(axis=1)]
+    if len(baseline):
+        row = baseline.iloc[0]
+        print(f"\nCurrent model (SMOTE, l2, C=0.1): rank {int(row['rank'])}, "
+              f"ROC-AUC {row['roc_auc']:.4f}, AP {row['avg_precision']:.4f}")
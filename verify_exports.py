@@ -0,0 +1,482 @@
+"""
+Streaming verification of the dashboard exports against declared schemas.
+
+The array exports (patient_risks.json, state_summary.json,
+hospital_metrics.json) are read in fixed-size chunks and decoded one record
+at a time, so memory stays constant however large the files grow. Each
+record is checked against its declared fields: type, range, and no missing
+or unexpected keys. The file must also be in the order the dashboard relies
+on (highest risk score / readmission rate first).
+
+While patient_risks.json streams past, its record count, score and cost sums
+and per-tier counts are kept, and risk_summary.json (a fixed-size object) is
+checked against them: the high-risk count, the tier and high-risk bin
+counts, the cost exposure and the average score. Exported scores are rounded
+to 2 decimals, so a score exactly on a tier boundary may belong to either
+tier, and the sums are compared within the rounding error.
+
+Exits non-zero if any file is missing or fails, for use as a deploy gate.
+
+Usage:
+    python verify_exports.py
+    python verify_exports.py --output-dir data/processed/streaming --files patient_risks.json risk_summary.json
+"""
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from aggregation import AGE_LABELS, HIGH_RISK_BINS, HIGH_RISK_LABELS, HIGH_RISK_THRESHOLD, RISK_LABELS, TIER_BOUNDS
+
+OUTPUT_DIR = Path(__file__).parent / 'data' / 'processed'
+EXPORT_FILES = ['patient_risks.json', 'risk_summary.json', 'state_summary.json', 'hospital_metrics.json']
+
+READ_CHUNK_SIZE = 1 << 16
+
+# Problems listed per file; the rest are only counted
+DEFAULT_MAX_PROBLEMS = 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_MISSING = object()
+
+
+class Field:
+    """Declared type and range of one export field."""
+
+    def __init__(self, kind: str, minimum: float = None, maximum: float = None, optional: bool = False):
+        self.kind = kind
+        self.minimum = minimum
+        self.maximum = maximum
+        self.optional = optional
+        # Fast path for the common case: an exact type within finite bounds (NaN and
+        # infinities fail the comparison and take the slow path)
+        self._types = {'str': (str,), 'object': (dict,), 'list': (list,), 'int': (int,)}.get(kind, (int, float))
+        self._numeric = kind in ('int', 'number')
+        self._low = -sys.float_info.max if minimum is None else minimum
+        self._high = sys.float_info.max if maximum is None else maximum
+
+    def problem(self, value):
+        """Why value does not fit the field, or None."""
+        if type(value) in self._types and (not self._numeric or self._low <= value <= self._high):
+            return None
+        if self.kind == 'str':
+            return f"expected a string, got {type(value).__name__}"
+        if self.kind in ('object', 'list'):
+            return f"expected a {self.kind}, got {type(value).__name__}"
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return f"expected a number, got {value!r}"
+        if self.kind == 'int' and not float(value).is_integer():
+            return f"expected a whole number, got {value!r}"
+        if self.minimum is not None and value < self.minimum:
+            return f"{value!r} is below {self.minimum}"
+        if self.maximum is not None and value > self.maximum:
+            return f"{value!r} is above {self.maximum}"
+        return None
+
+
+PATIENT_SCHEMA = {
+    'patient_id': Field('int', 1),
+    'age': Field('int', 0, 100),
+    'time_in_hospital': Field('int', 1, 14),
+    'num_medications': Field('int', 0),
+    'number_diagnoses': Field('int', 0),
+    'number_inpatient': Field('int', 0),
+    'number_emergency': Field('int', 0),
+    'total_visits': Field('int', 0),
+    'num_med_changes': Field('int', 0),
+    'risk_score': Field('number', 0, 100),
+    'estimated_cost': Field('number', 0),
+    # Not known when unlabelled encounters are scored (score.py)
+    'readmitted_30day': Field('int', 0, 1, optional=True),
+}
+
+RISK_SUMMARY_SCHEMA = {
+    'total_patients': Field('int', 0),
+    'high_risk_count': Field('int', 0),
+    'total_cost_exposure': Field('number', 0),
+    'avg_risk_score': Field('number', 0, 100),
+    'median_risk_score': Field('number', 0, 100),
+    'risk_distribution': Field('object'),
+    'high_risk_distribution': Field('object', optional=True),
+    'avg_risk_by_age': Field('object'),
+    'model_auc': Field('number', 0, 1, optional=True),
+    'readmission_rate_overall': Field('number', 0, 100, optional=True),
+    'critical_count': Field('int', 0, optional=True),
+    'very_high_count': Field('int', 0, optional=True),
+    'high_count': Field('int', 0, optional=True),
+    'risk_factors': Field('list', optional=True),
+    'cost_by_tier': Field('list', optional=True),
+}
+
+STATE_SCHEMA = {
+    'state': Field('str'),
+    'name': Field('str'),
+    'lat': Field('number', -90, 90),
+    'lng': Field('number', -180, 180),
+    'hospital_count': Field('int', 0),
+    # run_analysis.py reports CMS excess readmission ratios x 100, which can pass 100
+    'avg_readmission_rate': Field('number', 0),
+    'avg_penalty_pct': Field('number', 0, 3, optional=True),
+    'total_penalty_estimate': Field('number', 0),
+}
+
+# HRRP payment reductions are capped at 3%
+HOSPITAL_SCHEMA = {
+    'name': Field('str'),
+    'state': Field('str'),
+    'city': Field('str'),
+    'readmission_rate': Field('number', 0),
+    'penalty_pct': Field('number', 0, 3),
+}
+
+# Array exports: (schema, field the records are sorted on, highest first)
+ARRAY_EXPORTS = {
+    'patient_risks.json': (PATIENT_SCHEMA, 'risk_score'),
+    'state_summary.json': (STATE_SCHEMA, None),
+    'hospital_metrics.json': (HOSPITAL_SCHEMA, 'readmission_rate'),
+}
+
+# Summary tier fields, lowest tier first (matching TIER_BOUNDS)
+TIER_COUNT_FIELDS = ['high_count', 'very_high_count', 'critical_count']
+
+
+def iter_json_array(path: Path, chunk_size: int = READ_CHUNK_SIZE):
+    """Yield the elements of the top-level JSON array in path one at a time.
+
+    Only the current chunk and the element being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position, eof = '', 0, False
+
+        def next_char():
+            # Skip whitespace, reading more as needed; None at end of file
+            nonlocal buffer, position, eof
+            while True:
+                position = _WHITESPACE.match(buffer, position).end()
+                if position < len(buffer) or eof:
+                    return buffer[position] if position < len(buffer) else None
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+
+        def end_of_array():
+            nonlocal position
+            position += 1
+            if next_char() is not None:
+                raise ValueError("unexpected data after the array")
+
+        if next_char() != '[':
+            raise ValueError("not a JSON array")
+        position += 1
+        if next_char() == ']':
+            end_of_array()
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # A scalar ending at the buffer's edge may continue in the next chunk
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            position = end
+            yield value
+
+            char = next_char()
+            if char == ']':
+                end_of_array()
+                return
+            if char != ',':
+                raise ValueError(f"expected ',' or ']' after element, got {char!r}")
+            position += 1
+            next_char()
+
+
+class FileCheck:
+    """Outcome of verifying one export file."""
+
+    def __init__(self, name: str, max_problems: int = DEFAULT_MAX_PROBLEMS):
+        self.name = name
+        self.max_problems = max_problems
+        self.found = True
+        self.records = None
+        self.keys = None
+        self.problems = []
+        self.problem_count = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.found and self.problem_count == 0
+
+    def add(self, problem: str):
+        self.problem_count += 1
+        if len(self.problems) < self.max_problems:
+            self.problems.append(problem)
+
+
+def check_fields(record, schema: dict, check: FileCheck, where: str):
+    """Report missing, unexpected and out-of-range fields of one record."""
+    if not isinstance(record, dict):
+        check.add(f"{where}: expected an object, got {type(record).__name__}")
+        return
+    present = 0
+    for name, field in schema.items():
+        value = record.get(name, _MISSING)
+        if value is _MISSING:
+            if not field.optional:
+                check.add(f"{where}: missing '{name}'")
+            continue
+        present += 1
+        problem = field.problem(value)
+        if problem is not None:
+            check.add(f"{where}: '{name}' {problem}")
+    if len(record) > present:
+        for name in record:
+            if name not in schema:
+                check.add(f"{where}: unexpected field '{name}'")
+
+
+class BinTally:
+    """Counts of rounded values per bin, keeping values on a bin edge apart.
+
+    A value exactly on an edge (e.g. an exported 70.00 that was 69.996 before
+    rounding) could belong to either neighbouring bin.
+    """
+
+    def __init__(self, edges: list, n_bins: int):
+        self.edges = edges
+        self.exact = [0] * n_bins
+        self.possible = [0] * n_bins
+
+    def add(self, value: float):
+        low, high = bisect_left(self.edges, value), bisect_right(self.edges, value)
+        if low == high:
+            self.exact[low] += 1
+        else:
+            for index in (low, high):
+                if 0 <= index < len(self.exact):
+                    self.possible[index] += 1
+
+    def allows(self, index: int, count: int) -> bool:
+        return self.exact[index] <= count <= self.exact[index] + self.possible[index]
+
+
+class PatientTotals:
+    """Running totals of patient_risks.json for the risk_summary.json cross-checks."""
+
+    def __init__(self):
+        self.count = 0
+        self.risk_sum = 0.0
+        self.cost_sum = 0.0
+        self.min_risk = None
+        # Tiers split at TIER_BOUNDS above the threshold; bins at HIGH_RISK_BINS' inner edges
+        self.tiers = BinTally(TIER_BOUNDS[1:], len(TIER_BOUNDS))
+        self.bins = BinTally(HIGH_RISK_BINS[1:-1], len(HIGH_RISK_LABELS))
+
+    def add(self, record: dict):
+        risk, cost = record.get('risk_score'), record.get('estimated_cost')
+        if not isinstance(risk, (int, float)) or not isinstance(cost, (int, float)):
+            return
+        self.count += 1
+        self.risk_sum += risk
+        self.cost_sum += cost
+        self.min_risk = risk if self.min_risk is None else min(self.min_risk, risk)
+        self.tiers.add(risk)
+        self.bins.add(risk)
+
+
+def check_array(path: Path, schema: dict, sort_field: str, check: FileCheck, chunk_size: int,
+                totals: PatientTotals = None):
+    """Stream the records of an array export through the field and order checks."""
+    previous = None
+    check.records = 0
+    try:
+        for index, record in enumerate(iter_json_array(path, chunk_size)):
+            check.records += 1
+            check_fields(record, schema, check, f"record {index}")
+            if totals is not None and isinstance(record, dict):
+                totals.add(record)
+            if sort_field is None or not isinstance(record, dict):
+                continue
+            value = record.get(sort_field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if previous is not None and value > previous:
+                    check.add(f"record {index}: '{sort_field}' {value} is above the previous {previous}; "
+                              f"expected highest first")
+                previous = value
+    except ValueError as e:
+        # Decoder positions are relative to the current chunk, so only the message is kept
+        check.add(f"invalid JSON after record {check.records}: {getattr(e, 'msg', e)}")
+
+
+def _close(a: float, b: float, tolerance: float) -> bool:
+    return abs(a - b) <= tolerance + 1e-9 * max(abs(a), abs(b))
+
+
+def check_risk_summary(path: Path, check: FileCheck, totals: PatientTotals = None):
+    """Schema and internal consistency of risk_summary.json, plus agreement with patient_risks.json."""
+    try:
+        with open(path, 'r') as f:
+            summary = json.load(f)
+    except ValueError as e:
+        check.add(f"invalid JSON: {e}")
+        return
+    check_fields(summary, RISK_SUMMARY_SCHEMA, check, 'summary')
+    if not isinstance(summary, dict):
+        return
+    check.keys = len(summary)
+
+    def counts(name: str, labels: list):
+        value = summary.get(name)
+        if not isinstance(value, dict):
+            return None
+        if list(value) != labels:
+            check.add(f"'{name}' has bins {list(value)}, expected {labels}")
+            return None
+        for label, count in value.items():
+            problem = Field('int', 0).problem(count)
+            if problem is not None:
+                check.add(f"'{name}' {label}: {problem}")
+                return None
+        return list(value.values())
+
+    total = summary.get('total_patients')
+    high_risk_count = summary.get('high_risk_count')
+    if not isinstance(total, int) or not isinstance(high_risk_count, int):
+        return
+    risk_counts = counts('risk_distribution', RISK_LABELS)
+    if risk_counts is not None and sum(risk_counts) != total:
+        check.add(f"risk_distribution sums to {sum(risk_counts):,}, not total_patients {total:,}")
+    if high_risk_count > total:
+        check.add(f"high_risk_count {high_risk_count:,} exceeds total_patients {total:,}")
+
+    ages = summary.get('avg_risk_by_age')
+    if isinstance(ages, dict):
+        for label, value in ages.items():
+            if label not in AGE_LABELS:
+                check.add(f"avg_risk_by_age has unknown group '{label}'")
+            problem = Field('number', 0, 100).problem(value)
+            if problem is not None:
+                check.add(f"avg_risk_by_age {label}: {problem}")
+
+    high_risk_bins = counts('high_risk_distribution', HIGH_RISK_LABELS)
+    if high_risk_bins is not None and sum(high_risk_bins) != high_risk_count:
+        check.add(f"high_risk_distribution sums to {sum(high_risk_bins):,}, not high_risk_count {high_risk_count:,}")
+
+    tier_counts = [summary.get(name) for name in TIER_COUNT_FIELDS]
+    has_tiers = all(isinstance(count, int) for count in tier_counts)
+    if has_tiers and sum(tier_counts) != high_risk_count:
+        check.add(f"tier counts sum to {sum(tier_counts):,}, not high_risk_count {high_risk_count:,}")
+    cost_by_tier = summary.get('cost_by_tier')
+    if has_tiers and isinstance(cost_by_tier, list):
+        # cost_by_tier lists the tiers highest first
+        listed = [tier.get('count') if isinstance(tier, dict) else None for tier in cost_by_tier]
+        if listed != tier_counts[::-1]:
+            check.add(f"cost_by_tier counts {listed} do not match the tier counts {tier_counts[::-1]}")
+
+    if totals is None:
+        return
+    if high_risk_count != totals.count:
+        check.add(f"high_risk_count is {high_risk_count:,} but patient_risks.json has {totals.count:,} records")
+    if totals.count == 0:
+        return
+    # Each exported score and cost is rounded to 2 decimals
+    rounding = 0.005 * totals.count + 0.01
+    exposure = summary.get('total_cost_exposure')
+    if isinstance(exposure, (int, float)) and not _close(exposure, totals.cost_sum, rounding):
+        check.add(f"total_cost_exposure {exposure:,.2f} differs from the exported costs' sum {totals.cost_sum:,.2f}")
+    average = summary.get('avg_risk_score')
+    if isinstance(average, (int, float)) and not _close(average, totals.risk_sum / totals.count, 0.005):
+        check.add(f"avg_risk_score {average:.4f} differs from the exported scores' mean "
+                  f"{totals.risk_sum / totals.count:.4f}")
+
+    if high_risk_bins is None and not has_tiers:
+        return
+    # Summaries with high-risk breakdowns export every patient at or above the threshold
+    if totals.min_risk < HIGH_RISK_THRESHOLD:
+        check.add(f"patient_risks.json has a score of {totals.min_risk} below the {HIGH_RISK_THRESHOLD}% threshold")
+    if has_tiers:
+        for index, (name, count) in enumerate(zip(TIER_COUNT_FIELDS, tier_counts)):
+            if not totals.tiers.allows(index, count):
+                check.add(f"{name} is {count:,} but patient_risks.json has {totals.tiers.exact[index]:,} "
+                          f"(+{totals.tiers.possible[index]:,} on a boundary) in that tier")
+    if high_risk_bins is not None:
+        for index, (label, count) in enumerate(zip(HIGH_RISK_LABELS, high_risk_bins)):
+            if not totals.bins.allows(index, count):
+                check.add(f"high_risk_distribution {label} is {count:,} but patient_risks.json has "
+                          f"{totals.bins.exact[index]:,} (+{totals.bins.possible[index]:,} on a boundary)")
+
+
+def verify_output_dir(output_dir: Path = OUTPUT_DIR, files: list = EXPORT_FILES,
+                      chunk_size: int = READ_CHUNK_SIZE, max_problems: int = DEFAULT_MAX_PROBLEMS) -> list:
+    """Verify the given export files in output_dir; returns one FileCheck per file."""
+    checks = []
+    totals = None
+    # patient_risks.json goes first so risk_summary.json can be checked against its totals
+    for name in sorted(files, key=lambda name: name != 'patient_risks.json'):
+        check = FileCheck(name, max_problems)
+        path = Path(output_dir) / name
+        if not path.exists():
+            check.found = False
+        elif name == 'risk_summary.json':
+            check_risk_summary(path, check, totals)
+        elif name in ARRAY_EXPORTS:
+            schema, sort_field = ARRAY_EXPORTS[name]
+            if name == 'patient_risks.json':
+                totals = PatientTotals()
+                check_array(path, schema, sort_field, check, chunk_size, totals)
+            else:
+                check_array(path, schema, sort_field, check, chunk_size)
+        else:
+            raise ValueError(f"no schema for {name}; choose from {', '.join(EXPORT_FILES)}")
+        checks.append(check)
+    order = {name: index for index, name in enumerate(files)}
+    return sorted(checks, key=lambda check: order[check.name])
+
+
+def print_checks(checks: list):
+    """One line per file, followed by its listed problems."""
+    for check in checks:
+        if not check.found:
+            print(f"  {check.name}: NOT FOUND")
+            continue
+        size = f"{check.records:,} records" if check.records is not None else f"{check.keys or 0} keys"
+        plural = 's' if check.problem_count != 1 else ''
+        status = 'OK' if check.ok else f"FAILED ({check.problem_count:,} problem{plural})"
+        print(f"  {check.name}: {size} {status}")
+        for problem in check.problems:
+            print(f"    {problem}")
+        if check.problem_count > len(check.problems):
+            print(f"    ... and {check.problem_count - len(check.problems):,} more")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the dashboard exports against their schemas, streaming each file.")
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR)
+    parser.add_argument('--files', nargs='+', choices=EXPORT_FILES, default=EXPORT_FILES)
+    parser.add_argument('--chunk-size', type=int, default=READ_CHUNK_SIZE, help='characters read at a time')
+    parser.add_argument('--max-problems', type=int, default=DEFAULT_MAX_PROBLEMS,
+                        help='problems listed per file (all are counted)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("EXPORT VERIFICATION")
+    print("=" * 60)
+    start = time.perf_counter()
+    checks = verify_output_dir(args.output_dir, args.files, args.chunk_size, args.max_problems)
+    print_checks(checks)
+    failed = [check.name for check in checks if not check.ok]
+    print(f"\nVerified {len(checks)} files in {time.perf_counter() - start:.2f}s"
+          + (f"; FAILED: {', '.join(failed)}" if failed else ''))
+    sys.exit(1 if failed else 0)